@@ -3,6 +3,7 @@ import copy
 import json
 import logging
 import os
+import threading
 
 import pkg_resources
 import toml
@@ -13,6 +14,11 @@ from shakedown.errors import DCOSException
 
 logger = logging.getLogger(__name__)
 
+# Immutable configs by file path, together with the modification time, size
+# and mode of the file when it was parsed.
+_cache = {}
+_cache_lock = threading.Lock()
+
 
 def uses_deprecated_config():
     """Returns True if the configuration for the user's CLI
@@ -283,7 +289,9 @@ def set_val(name, value, config_path=None):
 
 
 def load_from_path(path, mutable=False):
-    """Loads a TOML file from the path
+    """Loads a TOML file from the path. Immutable configs are cached until
+    the file changes or `invalidate_cache` is called, mutable ones are
+    parsed on every call.
 
     :param path: Path to the TOML file
     :type path: str
@@ -293,16 +301,83 @@ def load_from_path(path, mutable=False):
     :rtype: Toml | MutableToml
     """
 
+    if not mutable:
+        cached = _cached_config(path)
+        if cached is not None:
+            return cached
+
     util.ensure_dir_exists(os.path.dirname(path))
     util.ensure_file_exists(path)
     util.enforce_file_permissions(path)
+    # Stat before reading, a change while reading invalidates the entry.
+    stamp = _file_stamp(path)
     with util.open_file(path, 'r') as config_file:
         try:
             toml_obj = toml.loads(config_file.read())
         except Exception as e:
             raise DCOSException(
                 'Error parsing config file at [{}]: {}'.format(path, e))
-        return (MutableToml if mutable else Toml)(toml_obj)
+
+    if mutable:
+        return MutableToml(toml_obj)
+
+    toml_config = Toml(toml_obj)
+    if stamp is not None:
+        with _cache_lock:
+            _cache[path] = (stamp, toml_config)
+    return toml_config
+
+
+def _file_stamp(path):
+    """
+    :param path: path of a file
+    :type path: str
+    :returns: modification time, size and mode of the file, None if it
+              can't be read
+    :rtype: (int, int, int) | None
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_mode)
+
+
+def _cached_config(path):
+    """
+    :param path: path of a config file
+    :type path: str
+    :returns: the cached config if the file did not change since it was
+              parsed
+    :rtype: Toml | None
+    """
+
+    with _cache_lock:
+        entry = _cache.get(path)
+    if entry is None:
+        return None
+
+    stamp, toml_config = entry
+    if _file_stamp(path) != stamp:
+        return None
+    return toml_config
+
+
+def invalidate_cache(path=None):
+    """Drops cached configs. `save`, and thereby `set_val` and `unset`, do
+    this for the file they write. Call it after changing a config file in
+    place within the resolution of the file system timestamps.
+
+    :param path: path of the config file, all files if None
+    :type path: str | None
+    """
+
+    with _cache_lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(path, None)
 
 
 def save(toml_config, config_path=None):
@@ -319,8 +394,11 @@ def save(toml_config, config_path=None):
 
     util.ensure_file_exists(config_path)
     util.enforce_file_permissions(config_path)
-    with util.open_file(config_path, 'w') as config_file:
-        config_file.write(serial)
+    try:
+        with util.open_file(config_path, 'w') as config_file:
+            config_file.write(serial)
+    finally:
+        invalidate_cache(config_path)
 
 
 def _get_path(toml_config, path):
@@ -560,6 +638,7 @@ class Toml(collections.Mapping):
 
     def __init__(self, dictionary):
         self._dictionary = dictionary
+        self._paths = None
 
     def __getitem__(self, path):
         """
@@ -569,11 +648,29 @@ class Toml(collections.Mapping):
         :rtype: double, int, str, list or dict
         """
 
-        toml_config = _get_path(self._dictionary, path)
-        if isinstance(toml_config, collections.Mapping):
-            return Toml(toml_config)
-        else:
-            return toml_config
+        # The dictionary is not changed through a Toml, so all paths are
+        # resolved once.
+        if self._paths is None:
+            self._paths = self._flatten()
+        return self._paths[path]
+
+    def _flatten(self):
+        """
+        :returns: the values of all paths, sections as Toml
+        :rtype: dict
+        """
+
+        paths = {}
+        for key, value in self._dictionary.items():
+            if isinstance(value, collections.Mapping):
+                section = Toml(value)
+                section._paths = section._flatten()
+                paths[key] = section
+                for subpath, subvalue in section._paths.items():
+                    paths['{}.{}'.format(key, subpath)] = subvalue
+            else:
+                paths[key] = value
+        return paths
 
     def __iter__(self):
         """
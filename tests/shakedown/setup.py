@@ -50,6 +50,9 @@ setup(name='dcos-shakedown',
           'retrying==1.3.3',
           'toml>=0.9, <1.0',
       ],
+      extras_require={
+          'async': ['aiohttp>=3.3'],
+      },
       package_data={
           'dcos': [
               'data/config-schema/*.json',
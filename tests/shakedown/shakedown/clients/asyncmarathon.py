@@ -0,0 +1,558 @@
+"""Asyncio variant of the Marathon client.
+
+All requests of an `AsyncClient` share one `aiohttp.ClientSession`, so many
+requests can be in flight over a bounded number of connections::
+
+    async with asyncmarathon.create_client() as client:
+        await asyncio.gather(*[client.add_app(app) for app in apps])
+
+Errors are mapped to `DCOSException` with the same messages as the
+synchronous `shakedown.clients.marathon.Client`.
+
+aiohttp is an optional dependency: `pip install dcos-shakedown[async]`.
+"""
+import asyncio
+import json
+import logging
+import os
+
+import aiohttp
+
+from . import dcos_service_url, rpcclient
+from .authentication import dcos_acs_token
+from .marathon import Client, get_app_or_pod_id
+from .. import http, util
+from ..errors import DCOSConnectionError, DCOSException
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent connections of a client.
+DEFAULT_CONNECTION_LIMIT = int(os.environ.get('SHAKEDOWN_ASYNC_HTTP_LIMIT', 100))
+
+
+def create_client(marathon_service_name='marathon', auth_token=None, session=None):
+    """Creates an async Marathon client with the supplied configuration.
+
+    :param marathon_service_name: Marathon service name
+    :type marathon_service_name: str
+    :param auth_token: DC/OS acs auth token
+    :type auth_token: str
+    :param session: session to share with other clients, a new one is created if None
+    :type session: aiohttp.ClientSession
+    :returns: async Marathon client
+    :rtype: shakedown.clients.asyncmarathon.AsyncClient
+    """
+
+    marathon_url = dcos_service_url(marathon_service_name)
+    rpc_client = AsyncRpcClient(marathon_url, http.DEFAULT_TIMEOUT, auth_token=auth_token, session=session)
+
+    logger.info('Creating async marathon client with: %r', marathon_url)
+    return AsyncClient(rpc_client)
+
+
+class Response(object):
+    """Body and status of a completed response.
+
+    :param status_code: HTTP status code
+    :type status_code: int
+    :param reason: HTTP reason phrase
+    :type reason: str
+    :param headers: response headers
+    :type headers: multidict.CIMultiDictProxy
+    :param text: response body
+    :type text: str
+    """
+
+    def __init__(self, status_code, reason, headers, text):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncRpcClient(object):
+    """Makes HTTP requests against a base URL on a shared aiohttp session.
+
+    :param base_url: base URL of all requests
+    :type base_url: str
+    :param timeout: timeout in seconds of a request
+    :type timeout: int
+    :param auth_token: DC/OS acs auth token
+    :type auth_token: str
+    :param session: session to use, a new one is created on the first request if None
+    :type session: aiohttp.ClientSession
+    :param ssl: SSL validation mode passed to aiohttp, requests to the cluster are not
+                verified by default as with `shakedown.http`
+    :type ssl: ssl.SSLContext | bool
+    """
+
+    def __init__(self, base_url, timeout=http.DEFAULT_TIMEOUT, auth_token=None, session=None, ssl=False):
+        if not base_url.endswith('/'):
+            base_url += '/'
+        self._base_url = base_url
+        self._timeout = timeout
+        self._auth_token = auth_token or dcos_acs_token()
+        self._session = session
+        self._owns_session = session is None
+        self._ssl = ssl
+
+    def session(self):
+        """:returns: the shared session, created in the running event loop on first use
+           :rtype: aiohttp.ClientSession
+        """
+
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=DEFAULT_CONNECTION_LIMIT, ssl=self._ssl)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """Closes the session if this client created it."""
+
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def http_req(self, method, path, not_found_as_none=False, **kwargs):
+        """Make an HTTP request, and raise a DCOS-specific exception for
+        HTTP error codes.
+
+        :param method: HTTP method, e.g. `GET`
+        :type method: str
+        :param path: the endpoint path to append to this object's base URL
+        :type path: str
+        :param not_found_as_none: whether to return None on status 404 instead of raising
+        :type not_found_as_none: bool
+        :param kwargs: kwargs to pass to `aiohttp.ClientSession.request`
+        :type kwargs: dict
+        :returns: the response
+        :rtype: Response | None
+        """
+
+        url = self._base_url + path.lstrip('/')
+        headers = {'Accept': 'application/json', 'Authorization': 'token={}'.format(self._auth_token)}
+        timeout = aiohttp.ClientTimeout(total=self._timeout)
+
+        logger.debug('Sending HTTP [%r] to [%r]', method, url)
+        try:
+            async with self.session().request(method, url, headers=headers, timeout=timeout, **kwargs) as r:
+                response = Response(r.status, r.reason, r.headers, await r.text())
+        except aiohttp.ClientConnectionError:
+            logger.exception("HTTP Connection Error")
+            raise DCOSConnectionError(url)
+        except asyncio.TimeoutError:
+            logger.exception("HTTP Timeout")
+            raise DCOSException('Request to URL [{0}] timed out.'.format(url))
+        except aiohttp.ClientError as e:
+            logger.exception("HTTP Exception")
+            raise DCOSException('HTTP Exception: {}'.format(e))
+
+        if 200 <= response.status_code < 300:
+            return response
+        if response.status_code == 404 and not_found_as_none:
+            return None
+
+        logger.error('DCOS Error: %s\n%s', response.reason, response.text)
+        try:
+            json_body = response.json()
+        except Exception:
+            logger.exception('Unable to decode response body as a JSON value: %r', response.text)
+            json_body = None
+
+        message = rpcclient.RpcClient.response_error_message(
+            status_code=response.status_code,
+            reason=response.reason,
+            request_method=method,
+            request_url=url,
+            json_body=json_body)
+        raise DCOSException(message)
+
+
+class AsyncClient(object):
+    """Class for talking to the Marathon server from asyncio code.
+
+    The methods mirror the ones of `shakedown.clients.marathon.Client`.
+
+    :param rpc_client: provides a method for making HTTP requests
+    :type rpc_client: AsyncRpcClient
+    """
+
+    def __init__(self, rpc_client):
+        self._rpc = rpc_client
+
+    async def close(self):
+        await self._rpc.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def get_app(self, app_id, version=None):
+        """Returns a representation of the requested application version. If
+        version is None the return the latest version.
+
+        :param app_id: the ID of the application
+        :type app_id: str
+        :param version: application version as a ISO8601 datetime
+        :type version: str
+        :returns: the requested Marathon application
+        :rtype: dict
+        """
+
+        app_id = util.normalize_marathon_id_path(app_id)
+        if version is None:
+            path = 'v2/apps{}'.format(app_id)
+        else:
+            path = 'v2/apps{}/versions/{}'.format(app_id, version)
+
+        response = await self._rpc.http_req('GET', path)
+
+        # Looks like Marathon return different JSON for versions
+        if version is None:
+            return response.json().get('app')
+        else:
+            return response.json()
+
+    async def get_apps(self):
+        """Get a list of known applications.
+
+        :returns: list of known applications
+        :rtype: [dict]
+        """
+
+        response = await self._rpc.http_req('GET', 'v2/apps')
+        return response.json()['apps']
+
+    async def add_app(self, app_resource):
+        """Add a new application.
+
+        :param app_resource: application resource
+        :type app_resource: dict
+        :returns: the ID of the deployment
+        :rtype: str
+        """
+
+        response = await self._rpc.http_req('POST', 'v2/apps', json=app_resource)
+        return response.json().get('deployments', {})[0].get('id')
+
+    async def _update(self, resource_type, resource_id, resource_json, force=False):
+        """Update an application or group.
+
+        :returns: the resulting deployment ID
+        :rtype: str
+        """
+
+        path = self._marathon_id_path_format('v2/{}/{{}}'.format(resource_type), resource_id)
+        response = await self._rpc.http_req('PUT', path, params=self._force_params(force), json=resource_json)
+        return self._parse_json(response).get('deploymentId')
+
+    async def update_app(self, app_id, payload, force=False):
+        """Update an application.
+
+        :param app_id: the application id
+        :type app_id: str
+        :param payload: the json payload
+        :type payload: dict
+        :param force: whether to override running deployments
+        :type force: bool
+        :returns: the resulting deployment ID
+        :rtype: str
+        """
+
+        return await self._update('apps', app_id, payload, force)
+
+    async def update_group(self, group_id, payload, force=False):
+        """Update a group.
+
+        :param group_id: the group id
+        :type group_id: str
+        :param payload: the json payload
+        :type payload: dict
+        :param force: whether to override running deployments
+        :type force: bool
+        :returns: the resulting deployment ID
+        :rtype: str
+        """
+
+        return await self._update('groups', group_id, payload, force)
+
+    async def scale_app(self, app_id, instances, force=False):
+        """Scales an application to the requested number of instances.
+
+        :param app_id: the ID of the application to scale
+        :type app_id: str
+        :param instances: the requested number of instances
+        :type instances: int
+        :param force: whether to override running deployments
+        :type force: bool
+        :returns: the resulting deployment ID
+        :rtype: str
+        """
+
+        return await self.update_app(app_id, {'instances': int(instances)}, force)
+
+    async def stop_app(self, app_id, force=False):
+        """Scales an application to zero instances.
+
+        :param app_id: the ID of the application to stop
+        :type app_id: str
+        :param force: whether to override running deployments
+        :type force: bool
+        :returns: the resulting deployment ID
+        :rtype: str
+        """
+
+        return await self.scale_app(app_id, 0, force)
+
+    async def remove_app(self, app_id, force=False):
+        """Completely removes the requested application.
+
+        :param app_id: the ID of the application to remove
+        :type app_id: str
+        :param force: whether to override running deployments
+        :type force: bool
+        :rtype: None
+        """
+
+        app_id = util.normalize_marathon_id_path(app_id)
+        path = 'v2/apps{}'.format(app_id)
+        await self._rpc.http_req('DELETE', path, params=self._force_params(force))
+
+    async def create_group(self, group_resource):
+        """Add a new group.
+
+        :param group_resource: grouplication resource
+        :type group_resource: dict
+        :returns: the deployment ID
+        :rtype: str
+        """
+
+        response = await self._rpc.http_req('POST', 'v2/groups', json=group_resource)
+        return response.json().get('deploymentId')
+
+    async def remove_group(self, group_id, force=False):
+        """Completely removes the requested application.
+
+        :param group_id: the ID of the group to remove
+        :type group_id: str
+        :param force: whether to override running deployments
+        :type force: bool
+        :returns: the deployment ID and version
+        :rtype: dict
+        """
+
+        group_id = util.normalize_marathon_id_path(group_id)
+        path = 'v2/groups{}'.format(group_id)
+        response = await self._rpc.http_req('DELETE', path, params=self._force_params(force))
+        return response.json()
+
+    async def get_deployment(self, deployment_id):
+        """Returns a deployment.
+
+        :param deployment_id: the deployment id
+        :type deployment_id: str
+        :returns: a deployment
+        :rtype: dict
+        """
+
+        deployments = await self.get_deployments()
+        return next((deployment for deployment in deployments if deployment_id == deployment['id']), None)
+
+    async def get_deployments(self, app_id=None):
+        """Returns a list of deployments, optionally limited to an app.
+
+        :param app_id: the id of the application
+        :type app_id: str
+        :returns: a list of deployments
+        :rtype: list of dict
+        """
+
+        response = await self._rpc.http_req('GET', 'v2/deployments')
+
+        if app_id is not None:
+            app_id = util.normalize_marathon_id_path(app_id)
+            return [deployment for deployment in response.json() if app_id in deployment['affectedApps']]
+        return response.json()
+
+    async def get_tasks(self, app_id=None):
+        """Returns a list of tasks, optionally limited to an app.
+
+        :param app_id: the id of the application
+        :type app_id: str
+        :returns: a list of tasks
+        :rtype: [dict]
+        """
+
+        if app_id is None:
+            response = await self._rpc.http_req('GET', 'v2/tasks')
+            return response.json()['tasks']
+
+        app_id = util.normalize_marathon_id_path(app_id)
+        response = await self._rpc.http_req('GET', 'v2/apps{}/tasks'.format(app_id), not_found_as_none=True)
+        if response is None:
+            return []
+        return [task for task in response.json()['tasks'] if app_id == task['appId']]
+
+    async def kill_tasks(self, app_id, scale=None, host=None):
+        """Kills the tasks for a given application,
+        and can target a given agent, with a future target scale
+
+        :param app_id: the id of the application
+        :type app_id: str
+        :param scale: Scale the app down after killing the specified tasks
+        :type scale: bool
+        :param host: host to target restarts on
+        :type host: string
+        """
+
+        params = {}
+        app_id = util.normalize_marathon_id_path(app_id)
+        if host:
+            params['host'] = host
+        if scale:
+            params['scale'] = 'true'
+        path = 'v2/apps{}/tasks'.format(app_id)
+        response = await self._rpc.http_req('DELETE', path, params=params)
+        return response.json()
+
+    async def kill_and_scale_tasks(self, task_ids, scale=None, wipe=None):
+        """Kills the given tasks, with a future target scale
+
+        :param task_ids: a list of task ids to kill
+        :type task_ids: list
+        :param scale: Scale the app down after killing the specified tasks
+        :type scale: bool
+        :param wipe: whether remove reservations and persistent volumes.
+        :type wipe: bool
+        :returns: If scale=false, all tasks that were killed are returned.
+                  If scale=true, than a deployment is triggered and the
+                  deployment id and version returned.
+        :rtype: list | dict
+        """
+
+        params = {}
+        if scale:
+            params['scale'] = 'true'
+        if wipe:
+            params['wipe'] = 'true'
+
+        response = await self._rpc.http_req('POST', 'v2/tasks/delete', params=params, json={'ids': task_ids})
+        return response.json()
+
+    async def add_pod(self, pod_json):
+        """Add a new pod.
+
+        :param pod_json: JSON pod definition
+        :type pod_json: dict
+        :returns: the deployment ID
+        :rtype: str
+        """
+
+        response = await self._rpc.http_req('POST', 'v2/pods', json=pod_json)
+        return response.headers.get('Marathon-Deployment-Id')
+
+    async def remove_pod(self, pod_id, force=False):
+        """Completely removes the requested pod.
+
+        :param pod_id: the ID of the pod to remove
+        :type pod_id: str
+        :param force: whether to override running deployments
+        :type force: bool
+        :rtype: None
+        """
+
+        path = self._marathon_id_path_format('v2/pods/{}', pod_id)
+        await self._rpc.http_req('DELETE', path, params=self._force_params(force))
+
+    async def show_pod(self, pod_id):
+        """Returns a representation of the requested pod.
+
+        :param pod_id: the ID of the pod
+        :type pod_id: str
+        :returns: the requested Marathon pod
+        :rtype: dict
+        """
+
+        path = self._marathon_id_path_format('v2/pods/{}::status', pod_id)
+        response = await self._rpc.http_req('GET', path)
+        return self._parse_json(response)
+
+    async def list_pod(self):
+        """Get a list of known pods.
+
+        :returns: list of known pods
+        :rtype: [dict]
+        """
+
+        response = await self._rpc.http_req('GET', 'v2/pods/::status')
+        return self._parse_json(response)
+
+    async def update_pod(self, pod_id, pod_json, force=False):
+        """Update a pod.
+
+        :param pod_id: the pod ID
+        :type pod_id: str
+        :param pod_json: JSON pod definition
+        :type pod_json: {}
+        :param force: whether to override running deployments
+        :type force: bool
+        :returns: the resulting deployment ID
+        :rtype: str
+        """
+
+        path = self._marathon_id_path_format('v2/pods/{}', pod_id)
+        response = await self._rpc.http_req('PUT', path, params=self._force_params(force), json=pod_json)
+
+        deployment_id_header_name = 'Marathon-Deployment-Id'
+        deployment_id = response.headers.get(deployment_id_header_name)
+        if deployment_id is None:
+            template = 'Error: missing "{}" header from Marathon response'
+            raise DCOSException(template.format(deployment_id_header_name))
+        return deployment_id
+
+    async def kill_pod_instances(self, pod_id, instance_ids):
+        """Kills the given instances of the specified pod.
+
+        :param pod_id: the pod to delete instances from
+        :type pod_id: str
+        :param instance_ids: the IDs of the instances to kill
+        :type instance_ids: [str]
+        :returns: the status JSON objects for the killed instances
+        :rtype: [{}]
+        """
+
+        path = self._marathon_id_path_format('v2/pods/{}::instances', pod_id)
+        response = await self._rpc.http_req('DELETE', path, json=instance_ids)
+        return self._parse_json(response)
+
+    async def get_queued_app(self, app_id):
+        """Returns app information inside the launch queue.
+
+        :param app_id: the app id
+        :type app_id: str
+        :returns: app information inside the launch queue
+        :rtype: dict
+        """
+
+        response = await self._rpc.http_req('GET', 'v2/queue', params={'embed': 'lastUnusedOffers'})
+        return next((app for app in response.json().get('queue') if app_id == get_app_or_pod_id(app)), None)
+
+    async def get_queued_apps(self):
+        """Returns the content of the launch queue,
+        including the apps which should be scheduled.
+
+        :returns: a list of to be scheduled apps, including debug information
+        :rtype: list of dict
+        """
+
+        response = await self._rpc.http_req('GET', 'v2/queue')
+        return response.json().get('queue')
+
+    _force_params = staticmethod(Client._force_params)
+    _marathon_id_path_format = staticmethod(Client._marathon_id_path_format)
+    _parse_json = staticmethod(Client._parse_json)
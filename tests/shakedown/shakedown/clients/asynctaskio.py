@@ -0,0 +1,445 @@
+"""Asyncio variant of `shakedown.clients.mesos.TaskIO`.
+
+All sessions of a process run on one event loop, so commands can be executed
+in dozens of containers at once without a thread per stream::
+
+    outputs = asyncio.get_event_loop().run_until_complete(
+        asynctaskio.exec_many(task_ids, 'cat', ['/etc/resolv.conf']))
+
+The output of a session is decoded from the RecordIO stream of the agent as
+it arrives. All data of one received chunk is written to stdout and stderr
+at once. Heartbeats of interactive sessions are sent from a loop timer.
+
+aiohttp is an optional dependency: `pip install dcos-shakedown[async]`.
+"""
+import asyncio
+import base64
+import collections
+import json
+import logging
+import os
+import signal
+import sys
+import uuid
+
+import aiohttp
+
+from . import recordio
+from .asyncmarathon import DEFAULT_CONNECTION_LIMIT
+from .authentication import dcos_acs_token
+from .mesos import TaskIO, task_container_target
+from .. import util
+from ..errors import DCOSException
+
+if not util.is_windows_platform():
+    import termios
+    import tty as terminal
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of sessions exec_many() runs at the same time.
+DEFAULT_EXEC_CONCURRENCY = int(os.environ.get('SHAKEDOWN_TASK_EXEC_CONCURRENCY', 32))
+
+# Bytes read from stdin at once in interactive sessions.
+STDIN_CHUNK_SIZE = 1024
+
+ExecOutput = collections.namedtuple('ExecOutput', ['stdout', 'stderr', 'error'])
+
+
+async def exec_many(task_ids, cmd, args=None, concurrency=DEFAULT_EXEC_CONCURRENCY, session=None, auth_token=None):
+    """Runs a command in the containers of many tasks and collects its output.
+
+    :param task_ids: IDs of the tasks
+    :type task_ids: [str]
+    :param cmd: command to launch inside each task's container
+    :type cmd: str
+    :param args: arguments of the command
+    :type args: [str]
+    :param concurrency: maximum number of sessions at the same time
+    :type concurrency: int
+    :param session: session to use, a new one is created if None
+    :type session: aiohttp.ClientSession
+    :param auth_token: DC/OS acs auth token
+    :type auth_token: str
+    :returns: the output or the error of each task
+    :rtype: {str: ExecOutput}
+    """
+
+    auth_token = auth_token or dcos_acs_token()
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=DEFAULT_CONNECTION_LIMIT, ssl=False))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def exec_one(task_id):
+        async with semaphore:
+            stdout, stderr = _Capture(), _Capture()
+            try:
+                task_io = await AsyncTaskIO.for_task(task_id, cmd, args, stdout=stdout, stderr=stderr,
+                                                     session=session, auth_token=auth_token)
+                await task_io.run()
+            except Exception as e:
+                logger.exception('Failed to exec %s in task %s', cmd, task_id)
+                return ExecOutput(stdout.getvalue(), stderr.getvalue(), e)
+            return ExecOutput(stdout.getvalue(), stderr.getvalue(), None)
+
+    try:
+        outputs = await asyncio.gather(*[exec_one(task_id) for task_id in task_ids])
+    finally:
+        if owns_session:
+            await session.close()
+    return dict(zip(task_ids, outputs))
+
+
+class _Capture(bytearray):
+    """Binary output stream collecting everything written to it."""
+
+    def write(self, data):
+        self.extend(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return bytes(self)
+
+
+class AsyncTaskIO(object):
+    """Streams I/O between a nested container session in a running task
+    and local streams.
+
+    :param agent_url: URL of the v1 API of the agent running the task
+    :type agent_url: str
+    :param parent_id: container ID of the task
+    :type parent_id: dict
+    :param cmd: a command to launch inside the task's container
+    :type cmd: str
+    :param args: additional arguments for the command
+    :type args: [str]
+    :param interactive: whether to attach `stdin` to the new command
+    :type interactive: bool
+    :param tty: whether to allocate a tty for this command and attach
+                the local terminal to it
+    :type tty: bool
+    :param stdin: input of interactive sessions, the process' stdin if None
+    :type stdin: asyncio.StreamReader | None
+    :param stdout: binary stream for the command's stdout, the process' stdout if None
+    :type stdout: io.BufferedIOBase | None
+    :param stderr: binary stream for the command's stderr, the process' stderr if None
+    :type stderr: io.BufferedIOBase | None
+    :param session: session to use, a new one is created if None
+    :type session: aiohttp.ClientSession | None
+    :param auth_token: DC/OS acs auth token
+    :type auth_token: str
+    """
+
+    HEARTBEAT_INTERVAL = TaskIO.HEARTBEAT_INTERVAL
+    HEARTBEAT_INTERVAL_NANOSECONDS = TaskIO.HEARTBEAT_INTERVAL_NANOSECONDS
+
+    def __init__(self, agent_url, parent_id, cmd, args=None, interactive=False, tty=False,
+                 stdin=None, stdout=None, stderr=None, session=None, auth_token=None):
+        self.agent_url = agent_url
+        self.parent_id = parent_id
+        self.cmd = cmd
+        self.args = args or []
+        self.interactive = interactive
+        self.tty = tty
+        self.container_id = str(uuid.uuid4())
+
+        self._stdin = stdin
+        self._stdout = sys.stdout.buffer if stdout is None else stdout
+        self._stderr = sys.stderr.buffer if stderr is None else stderr
+        self._session = session
+        self._owns_session = session is None
+        self._auth_token = auth_token or dcos_acs_token()
+
+        self.encoder = recordio.Encoder(lambda s: bytes(json.dumps(s, ensure_ascii=False), "UTF-8"))
+        self.decoder = recordio.Decoder(lambda s: json.loads(s.decode("UTF-8")))
+
+        self._input_queue = None
+        self._heartbeat_timer = None
+
+    @classmethod
+    async def for_task(cls, task_id, cmd, args=None, **kwargs):
+        """Creates a session for the container of a task.
+
+        The task is looked up in the master state on an executor thread.
+
+        :param task_id: task ID
+        :type task_id: str
+        :param cmd: a command to launch inside the task's container
+        :type cmd: str
+        :param args: additional arguments for the command
+        :type args: [str]
+        :param kwargs: further arguments of `AsyncTaskIO`
+        :type kwargs: dict
+        :rtype: AsyncTaskIO
+        """
+
+        loop = asyncio.get_event_loop()
+        agent_url, parent_id = await loop.run_in_executor(None, task_container_target, task_id)
+        return cls(agent_url, parent_id, cmd, args, **kwargs)
+
+    def session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=DEFAULT_CONNECTION_LIMIT, ssl=False)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def run(self):
+        """Launches the command and streams its I/O until its output ends.
+
+        If a tty is requested, the current terminal is put into raw mode
+        and reset to its original settings before returning.
+        """
+
+        if not self.tty:
+            await self._run()
+            return
+
+        if util.is_windows_platform():
+            raise DCOSException("Running with the '--tty' flag is not supported on windows.")
+        if not sys.stdin.isatty():
+            raise DCOSException("Must be running in a tty to pass the '--tty flag'.")
+
+        fd = sys.stdin.fileno()
+        oldtermios = termios.tcgetattr(fd)
+        loop = asyncio.get_event_loop()
+        try:
+            if self.interactive:
+                self._input_queue = asyncio.Queue()
+                terminal.setraw(fd, when=termios.TCSANOW)
+                self._window_resize()
+                loop.add_signal_handler(signal.SIGWINCH, self._window_resize)
+            await self._run()
+        finally:
+            if self.interactive:
+                loop.remove_signal_handler(signal.SIGWINCH)
+            termios.tcsetattr(fd, termios.TCSAFLUSH, oldtermios)
+
+    async def _run(self):
+        output_connected = asyncio.Event()
+        input_attached = asyncio.Event()
+        input_task = None
+        if self.interactive:
+            if self._input_queue is None:
+                self._input_queue = asyncio.Queue()
+            input_task = asyncio.ensure_future(self._attach_container_input(output_connected, input_attached))
+        else:
+            input_attached.set()
+
+        try:
+            output = asyncio.ensure_future(self._launch_nested_container_session(output_connected, input_attached))
+            if input_task is None:
+                await output
+            else:
+                # The session ends with its output. The input stream is then
+                # cancelled, it only ends by itself once stdin reached EOF.
+                done, _ = await asyncio.wait([output, input_task], return_when=asyncio.FIRST_COMPLETED)
+                if output not in done and input_task.exception():
+                    # A failing input stream ends the session as well.
+                    output.cancel()
+                    raise input_task.exception()
+                await output
+        finally:
+            self._stop_heartbeat()
+            if input_task is not None and not input_task.done():
+                input_task.cancel()
+                await asyncio.wait([input_task])
+            if self._owns_session and self._session is not None:
+                await self._session.close()
+                self._session = None
+
+    def _headers(self, headers):
+        headers['Authorization'] = 'token={}'.format(self._auth_token)
+        return headers
+
+    async def _launch_nested_container_session(self, output_connected, input_attached):
+        """Launches a new nested container and writes its output stream."""
+
+        message = {
+            'type': "LAUNCH_NESTED_CONTAINER_SESSION",
+            'launch_nested_container_session': {
+                'container_id': {
+                    'parent': self.parent_id,
+                    'value': self.container_id
+                },
+                'command': {
+                    'value': self.cmd,
+                    'arguments': [self.cmd] + self.args,
+                    'shell': False}}}
+
+        if self.tty:
+            message['launch_nested_container_session']['container'] = {'type': 'MESOS', 'tty_info': {}}
+
+        headers = self._headers({
+            'Content-Type': 'application/json',
+            'Accept': 'application/recordio',
+            'Message-Accept': 'application/json'})
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+        async with self.session().post(self.agent_url, data=json.dumps(message), headers=headers,
+                                       timeout=timeout) as response:
+            await self._raise_for_status(response)
+
+            # The input stream can be attached now. In interactive mode the
+            # output is only written once it is.
+            output_connected.set()
+            await input_attached.wait()
+
+            try:
+                async for chunk in response.content.iter_any():
+                    self._write_output(self.decoder.decode(chunk))
+            except DCOSException as e:
+                raise DCOSException("Error parsing output stream: {error}".format(error=e))
+
+    def _write_output(self, records):
+        """Writes the data of all records received at once with one write and
+        one flush per stream.
+
+        :param records: decoded agent messages
+        :type records: [dict]
+        """
+
+        stdout = bytearray()
+        stderr = bytearray()
+        for record in records:
+            if record.get('type') != 'DATA':
+                continue
+            output = record['data']
+            if not output.get('data'):
+                raise DCOSException("Error no 'data' field in output message")
+
+            data = base64.b64decode(output['data'])
+            if output.get('type') == 'STDOUT':
+                stdout += data
+            elif output.get('type') == 'STDERR':
+                stderr += data
+            else:
+                raise DCOSException("Unsupported data type in output stream")
+
+        for stream, data in ((self._stdout, stdout), (self._stderr, stderr)):
+            if data:
+                stream.write(data)
+                stream.flush()
+
+    async def _attach_container_input(self, output_connected, input_attached):
+        """Streams input and control messages from the input queue to the agent."""
+
+        attach_message = self.encoder.encode({
+            'type': 'ATTACH_CONTAINER_INPUT',
+            'attach_container_input': {
+                'type': 'CONTAINER_ID',
+                'container_id': {
+                    'parent': self.parent_id,
+                    'value': self.container_id}}})
+
+        async def input_streamer():
+            yield attach_message
+            while True:
+                record = await self._input_queue.get()
+                if record is None:
+                    break
+                yield record
+
+        headers = self._headers({
+            'Content-Type': 'application/recordio',
+            'Message-Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Connection': 'close'})
+
+        # Don't attach to a container that isn't fully up and running.
+        await output_connected.wait()
+
+        # Check that the input can be attached before streaming. A 500
+        # response means the container already finished running, its output
+        # is still written then.
+        async with self.session().post(self.agent_url, data=attach_message, headers=headers) as response:
+            if response.status != 500:
+                await self._raise_for_status(response)
+        input_attached.set()
+
+        self._heartbeat()
+        stdin_task = asyncio.ensure_future(self._read_stdin())
+        try:
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+            async with self.session().post(self.agent_url, data=input_streamer(), headers=headers,
+                                           timeout=timeout) as response:
+                await self._raise_for_status(response)
+        finally:
+            stdin_task.cancel()
+
+    async def _read_stdin(self):
+        """Puts the data read from stdin onto the input queue as messages."""
+
+        reader = self._stdin
+        if reader is None:
+            loop = asyncio.get_event_loop()
+            reader = asyncio.StreamReader()
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        while True:
+            chunk = await reader.read(STDIN_CHUNK_SIZE)
+            # An empty string signals EOF to the agent.
+            self._input_queue.put_nowait(self._stdin_message(chunk))
+            if not chunk:
+                break
+        self._input_queue.put_nowait(None)
+
+    def _stdin_message(self, data):
+        return self.encoder.encode({
+            'type': 'ATTACH_CONTAINER_INPUT',
+            'attach_container_input': {
+                'type': 'PROCESS_IO',
+                'process_io': {
+                    'type': 'DATA',
+                    'data': {
+                        'type': 'STDIN',
+                        'data': base64.b64encode(data).decode('utf-8')}}}})
+
+    def _heartbeat(self):
+        """Queues a heartbeat message and schedules the next one."""
+
+        self._input_queue.put_nowait(self.encoder.encode({
+            'type': 'ATTACH_CONTAINER_INPUT',
+            'attach_container_input': {
+                'type': 'PROCESS_IO',
+                'process_io': {
+                    'type': 'CONTROL',
+                    'control': {
+                        'type': 'HEARTBEAT',
+                        'heartbeat': {
+                            'interval': {
+                                'nanoseconds': self.HEARTBEAT_INTERVAL_NANOSECONDS}}}}}}))
+        loop = asyncio.get_event_loop()
+        self._heartbeat_timer = loop.call_later(self.HEARTBEAT_INTERVAL, self._heartbeat)
+
+    def _stop_heartbeat(self):
+        if self._heartbeat_timer is not None:
+            self._heartbeat_timer.cancel()
+            self._heartbeat_timer = None
+
+    def _window_resize(self):
+        """Queues a message with the current dimensions of the terminal."""
+
+        rows, columns = os.popen('stty size', 'r').read().split()
+        self._input_queue.put_nowait(self.encoder.encode({
+            'type': 'ATTACH_CONTAINER_INPUT',
+            'attach_container_input': {
+                'type': 'PROCESS_IO',
+                'process_io': {
+                    'type': 'CONTROL',
+                    'control': {
+                        'type': 'TTY_INFO',
+                        'tty_info': {
+                            'window_size': {
+                                'rows': int(rows),
+                                'columns': int(columns)}}}}}}))
+
+    @staticmethod
+    async def _raise_for_status(response):
+        if 200 <= response.status < 300:
+            return
+        text = await response.text()
+        logger.error('Agent error: %s\n%s', response.reason, text)
+        raise DCOSException('Error while calling [{}]: {} {}'.format(response.url, response.status, text))
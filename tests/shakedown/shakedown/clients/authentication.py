@@ -1,16 +1,33 @@
+import base64
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from os import environ, path
+
 import requests
 import toml
 
-from functools import lru_cache
-from os import environ, path
-from . import dcos_url_path
-from ..errors import DCOSAuthenticationException
+from . import dcos_url, dcos_url_path
 from ..dcos.command import run_dcos_command
+from ..errors import DCOSAuthenticationException
 
 
 logger = logging.getLogger(__name__)
 
+# File the ACS tokens are persisted to per cluster URL, so that parallel
+# workers and new processes don't authenticate again. Empty disables it.
+TOKEN_CACHE_FILE = environ.get('SHAKEDOWN_TOKEN_CACHE_FILE', path.expanduser('~/.shakedown-tokens.json'))
+
+# Seconds before the expiry of a token at which it is refreshed.
+TOKEN_REFRESH_MARGIN = float(environ.get('SHAKEDOWN_TOKEN_REFRESH_MARGIN', 300))
+
+# Seconds after which a token which was due already on login is refreshed.
+TOKEN_RETRY_INTERVAL = 30
+
 
 @lru_cache()
 def read_config():
@@ -37,6 +54,20 @@ def dcos_password():
     return environ.get('DCOS_PASSWORD') or read_config().get('password')
 
 
+def dcos_oauth_token():
+    return environ.get('SHAKEDOWN_OAUTH_TOKEN') or read_config().get('oauth_token')
+
+
+def has_credentials():
+    """Whether an OAuth token or username and password are configured. A
+    token is only refreshed before it expires with them, the DC/OS CLI
+    session hands out the same token until it expired.
+
+    :rtype: bool
+    """
+    return dcos_oauth_token() is not None or (dcos_username() is not None and dcos_password() is not None)
+
+
 def authenticate(username, password):
     """Authenticate with a DC/OS cluster and return an ACS token.
     return: ACS token
@@ -66,27 +97,55 @@ def authenticate_oauth(oauth_token):
     return response.json()['token']
 
 
-@lru_cache(1)
-def dcos_acs_token():
-    """Return the DC/OS ACS token as configured in the DC/OS library.
+def token_expiry(token):
+    """Reads the expiry of a JWT without verifying its signature.
+
+    :param token: the token
+    :type token: str
+    :returns: the expiry in seconds since the epoch, None if the token is no
+              JWT or does not expire
+    :rtype: float | None
+    """
+    try:
+        payload = token.split('.')[1]
+        # JWTs use base64url without padding.
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)).decode('utf-8'))
+        return float(claims['exp'])
+    except Exception:
+        return None
+
+
+def login(current_token=None):
+    """Authenticates with the DC/OS cluster through the DC/OS CLI session,
+    an OAuth token or username and password, whichever works first.
+
+    The DC/OS CLI session is skipped when a `current_token` is refreshed
+    before it expires: the session hands out the same token until then.
+
+    :param current_token: the token which is refreshed, None for a new login
+    :type current_token: str | None
     :return: DC/OS ACS token as a string
     """
     logger.info('Authenticating with DC/OS cluster...')
 
     # Try token from dcos cli session
-    try:
-        token, _, _ = run_dcos_command('config show core.dcos_acs_token', raise_on_error=True, print_output=False)
-        token = token.rstrip()
+    if current_token is None:
+        try:
+            token, _, _ = run_dcos_command('config show core.dcos_acs_token', raise_on_error=True,
+                                           print_output=False)
+            token = token.rstrip()
 
-        url = dcos_url_path('/system/health/v1')
-        requests.get(url, auth=DCOSAcsAuth(token), verify=False).raise_for_status()
-        logger.info('Authentication using DC/OS CLI session ✓')
-        return token
-    except Exception:
-        logger.exception('Authentication using DC/OS CLI session ✕')
+            url = dcos_url_path('/system/health/v1')
+            requests.get(url, auth=DCOSAcsAuth(token), verify=False).raise_for_status()
+            logger.info('Authentication using DC/OS CLI session ✓')
+            return token
+        except Exception:
+            logger.exception('Authentication using DC/OS CLI session ✕')
+    else:
+        logger.info('Skipping the DC/OS CLI session while refreshing the token.')
 
     # Try OAuth authentication
-    oauth_token = environ.get('SHAKEDOWN_OAUTH_TOKEN') or read_config().get('oauth_token')
+    oauth_token = dcos_oauth_token()
     if oauth_token is not None:
         try:
             token = authenticate_oauth(oauth_token)
@@ -115,6 +174,220 @@ def dcos_acs_token():
     raise DCOSAuthenticationException(response=None, message=msg)
 
 
+class TokenProvider(object):
+    """Hands out an ACS token and refreshes it before it expires.
+
+    The expiry is read from the token. If `can_refresh`, a timer refreshes
+    the token `refresh_margin` seconds before it, once. A token which expired
+    anyway is refreshed on the next call. Concurrent callers share a single
+    login.
+    Tokens with an expiry are persisted to `cache_file`.
+
+    :param login: function returning a new token, called with the token
+                  which is refreshed before its expiry or None
+    :type login: (str | None) -> str
+    :param cache_file: file to persist tokens to, None disables it
+    :type cache_file: str | None
+    :param refresh_margin: seconds before the expiry to refresh at
+    :type refresh_margin: float
+    :param cluster_url: key of the tokens in the cache file, the DC/OS URL if None
+    :type cluster_url: str | None
+    :param can_refresh: whether a token can be refreshed before it expires,
+                        always if None
+    :type can_refresh: () -> bool
+    """
+
+    def __init__(self, login=login, cache_file=TOKEN_CACHE_FILE or None, refresh_margin=TOKEN_REFRESH_MARGIN,
+                 cluster_url=None, can_refresh=None):
+        self._login = login
+        self._can_refresh = can_refresh or (lambda: True)
+        self.cache_file = cache_file
+        self.refresh_margin = refresh_margin
+        self._cluster_url = cluster_url
+        self._token = None
+        self._expiry = None
+        self._lock = threading.Condition()
+        self._refreshing = False
+        self._timer = None
+
+    @property
+    def cluster_url(self):
+        return self._cluster_url or dcos_url()
+
+    def token(self):
+        """:returns: a token which has not expired
+           :rtype: str
+        """
+        with self._lock:
+            if self._token is not None and not self._expired(self._expiry):
+                return self._token
+            if self._token is None and not self._refreshing and self._load():
+                return self._token
+        return self.refresh()
+
+    def refresh(self):
+        """Logs in again. A caller which finds a login in flight waits for
+        its result.
+
+        :returns: the new token
+        :rtype: str
+        """
+        with self._lock:
+            if self._refreshing:
+                while self._refreshing:
+                    self._lock.wait()
+                if self._token is None:
+                    raise DCOSAuthenticationException(response=None, message='Authentication failed.')
+                return self._token
+            self._refreshing = True
+            # An expired token is not refreshed but replaced by any new one.
+            current_token = None if self._expired(self._expiry) else self._token
+
+        token = None
+        try:
+            token = self._login(current_token)
+        finally:
+            with self._lock:
+                if token is not None:
+                    self._set(token)
+                self._refreshing = False
+                self._lock.notify_all()
+        self._store(token)
+        return token
+
+    def invalidate(self, token=None):
+        """Drops the current token and its persisted copy, e.g. after the
+        cluster rejected it.
+
+        :param token: the rejected token, a newer one is kept; None drops any
+        :type token: str | None
+        """
+        with self._lock:
+            if token is not None and token != self._token:
+                return
+            self._token = None
+            self._expiry = None
+            self._cancel_timer()
+            # Under the lock, or another caller could load it again.
+            self._discard(token)
+
+    def _expired(self, expiry):
+        return expiry is not None and expiry <= time.time()
+
+    def _set(self, token):
+        """Takes a token and schedules its refresh. Requires the lock."""
+        self._token = token
+        self._expiry = token_expiry(token)
+        self._cancel_timer()
+        if self._expiry is not None and self._can_refresh():
+            delay = self._expiry - self.refresh_margin - time.time()
+            # A login may return a token which is due already, e.g. the
+            # one of the DC/OS CLI session. Don't try again right away.
+            self._schedule(delay if delay > 0 else TOKEN_RETRY_INTERVAL)
+
+    def _schedule(self, delay):
+        self._timer = threading.Timer(delay, self._refresh_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # The token is refreshed on the first call after it expired.
+            logger.warning('Background refresh of the ACS token failed: %s', e)
+
+    def _load(self):
+        """Takes the persisted token of the cluster if it does not need a
+        refresh yet. Requires the lock.
+
+        :rtype: bool
+        """
+        if self.cache_file is None or not path.isfile(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file) as f:
+                token = json.load(f).get(self.cluster_url)
+        except Exception:
+            logger.exception('Could not read the ACS token cache %s', self.cache_file)
+            return False
+
+        expiry = token_expiry(token) if token else None
+        if expiry is None or expiry - self.refresh_margin <= time.time():
+            return False
+        logger.info('Using the ACS token of %s from %s', self.cluster_url, self.cache_file)
+        self._set(token)
+        return True
+
+    def _store(self, token):
+        """Persists a token with an expiry. The file is only accessible by
+        its owner and replaced atomically.
+        """
+        if self.cache_file is None or token_expiry(token) is None:
+            return
+        try:
+            tokens = {}
+            if path.isfile(self.cache_file):
+                with open(self.cache_file) as f:
+                    tokens = json.load(f)
+            tokens[self.cluster_url] = token
+            self._write(tokens)
+        except Exception:
+            logger.exception('Could not write the ACS token cache %s', self.cache_file)
+
+    def _discard(self, token):
+        """Removes the persisted token of the cluster if it is `token` or
+        `token` is None.
+        """
+        if self.cache_file is None or not path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                tokens = json.load(f)
+            if self.cluster_url in tokens and token in (None, tokens[self.cluster_url]):
+                del tokens[self.cluster_url]
+                self._write(tokens)
+        except Exception:
+            logger.exception('Could not write the ACS token cache %s', self.cache_file)
+
+    def _write(self, tokens):
+        directory = path.dirname(path.abspath(self.cache_file))
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.shakedown-tokens')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(tokens, f)
+            os.replace(temporary, self.cache_file)
+        except Exception:
+            os.remove(temporary)
+            raise
+
+
+_provider = TokenProvider(can_refresh=has_credentials)
+
+
+def dcos_acs_token():
+    """Return the DC/OS ACS token as configured in the DC/OS library. The
+    token is refreshed before it expires.
+    :return: DC/OS ACS token as a string
+    """
+    return _provider.token()
+
+
+def invalidate_dcos_acs_token(token):
+    """Drops a DC/OS ACS token which the cluster rejected. The next call of
+    `dcos_acs_token` logs in again.
+
+    :param token: the rejected token
+    :type token: str
+    """
+    _provider.invalidate(token)
+
+
 class DCOSAcsAuth(requests.auth.AuthBase):
     """Invokes DCOS Authentication flow for given Request object."""
     def __init__(self, token):
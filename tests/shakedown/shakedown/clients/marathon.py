@@ -1,5 +1,8 @@
 import json
 import logging
+import re
+import threading
+import time
 
 from six.moves import urllib
 
@@ -9,6 +12,16 @@ from ..errors import DCOSException, DCOSHTTPException
 
 logger = logging.getLogger(__name__)
 
+# Maximum age in seconds of the cached /v2/tasks list used for lookups across all apps.
+TASKS_CACHE_TTL = 1.0
+
+# Number of apps and pods bulk_create deploys at once.
+BULK_CREATE_BATCH_SIZE = 50
+
+# Matches the ids of app tasks, e.g. `group_app.instance-<uuid>._app.1` or `app.<uuid>`.
+_APP_TASK_ID = re.compile(r'^(?P<app>[^.][^/]*?)\.(?:instance-|marathon-)?'
+                          r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(?:\..*)?$')
+
 
 def create_client(marathon_service_name='marathon', auth_token=None):
     """Creates a Marathon client with the supplied configuration.
@@ -36,6 +49,8 @@ class Client(object):
 
     def __init__(self, rpc_client):
         self._rpc = rpc_client
+        self._tasks_cache = None
+        self._tasks_cache_lock = threading.Lock()
 
     def get_about(self):
         """Returns info about Marathon instance
@@ -183,6 +198,87 @@ class Client(object):
         response = self._rpc.http_req(http.post, 'v2/apps', json=app_json)
         return response.json().get('deployments', {})[0].get('id')
 
+    def add_apps(self, app_resources, force=False):
+        """Creates or replaces several applications with a single deployment.
+
+        :param app_resources: application resources
+        :type app_resources: [dict]
+        :param force: whether to override running deployments
+        :type force: bool
+        :returns: the ID of the deployment
+        :rtype: str
+        """
+
+        params = self._force_params(force)
+        response = self._rpc.http_req(http.put, 'v2/apps', params=params, json=list(app_resources))
+        return response.json().get('deploymentId')
+
+    def bulk_create(self, apps=(), pods=(), batch_size=BULK_CREATE_BATCH_SIZE, wait=True, timeout=600):
+        """Creates many apps and pods in batches of `batch_size` definitions.
+
+        The apps of a batch are created with one `PUT v2/apps` and thus one
+        deployment. Marathon has no bulk endpoint for pods, so each pod of a
+        batch is its own deployment. If `wait` is set, the deployments of a
+        batch finish before the next batch is sent.
+
+        `PUT v2/groups` is not used: it replaces all apps of a group with the
+        ones in the payload and would remove apps created outside the batch.
+
+        :param apps: application definitions
+        :type apps: [dict]
+        :param pods: pod definitions
+        :type pods: [dict]
+        :param batch_size: maximum number of apps and pods per batch
+        :type batch_size: int
+        :param wait: whether to wait for the deployments of each batch
+        :type wait: bool
+        :param timeout: seconds to wait for the deployments of a batch
+        :type timeout: int
+        :returns: per batch the `apps` and `pods` ids, the `deployments` ids, the
+                  `submit_seconds` to create them and the `deploy_seconds` until
+                  they finished
+        :rtype: [dict]
+        """
+
+        # Imported here because shakedown.dcos imports the clients.
+        from ..dcos.spinner import time_wait
+
+        resources = [('app', app) for app in apps] + [('pod', pod) for pod in pods]
+        reports = []
+        for offset in range(0, len(resources), batch_size):
+            batch = resources[offset:offset + batch_size]
+            batch_apps = [resource for kind, resource in batch if kind == 'app']
+            batch_pods = [resource for kind, resource in batch if kind == 'pod']
+
+            start = time.monotonic()
+            deployments = []
+            if batch_apps:
+                deployments.append(self.add_apps(batch_apps))
+            deployments.extend(self.add_pod(pod) for pod in batch_pods)
+            deployments = [deployment for deployment in deployments if deployment is not None]
+            report = {'apps': [app['id'] for app in batch_apps],
+                      'pods': [pod['id'] for pod in batch_pods],
+                      'deployments': deployments,
+                      'submit_seconds': time.monotonic() - start,
+                      'deploy_seconds': None}
+
+            if wait and deployments:
+                pending = set(deployments)
+
+                def batch_deployed():
+                    running = {deployment['id'] for deployment in self.get_deployments()}
+                    return not (pending & running)
+
+                time_wait(batch_deployed, timeout_seconds=timeout, noisy=False)
+                report['deploy_seconds'] = time.monotonic() - start
+
+            logger.info('Batch %d: %d apps and %d pods submitted in %.2fs, deployed in %s',
+                        len(reports) + 1, len(batch_apps), len(batch_pods), report['submit_seconds'],
+                        '-' if report['deploy_seconds'] is None else '{:.2f}s'.format(report['deploy_seconds']))
+            reports.append(report)
+
+        return reports
+
     def _update_req(
             self, resource_type, resource_id, resource_json, force=False):
         """Send an HTTP request to update an application, group, or pod.
@@ -377,6 +473,7 @@ class Client(object):
             params['scale'] = scale
         path = 'v2/apps{}/tasks'.format(app_id)
         response = self._rpc.http_req(http.delete, path, params=params)
+        self.invalidate_tasks_cache()
         return response.json()
 
     def kill_and_scale_tasks(self, task_ids, scale=None, wipe=None):
@@ -407,6 +504,7 @@ class Client(object):
                                       path,
                                       params=params,
                                       json={'ids': task_ids})
+        self.invalidate_tasks_cache()
 
         return response.json()
 
@@ -512,45 +610,75 @@ class Client(object):
 
         self._cancel_deployment(deployment_id, True)
 
-    def get_tasks(self, app_id):
+    def get_tasks(self, app_id=None, max_age=TASKS_CACHE_TTL):
         """Returns a list of tasks, optionally limited to an app.
 
-        :param app_id: the id of the application to restart
+        The tasks of an app are fetched from `v2/apps/{app_id}/tasks`. All
+        tasks are taken from a cached `v2/tasks` list which is refreshed once
+        it is older than `max_age` seconds.
+
+        :param app_id: the id of the application
         :type app_id: str
+        :param max_age: maximum age in seconds of the cached list of all tasks
+        :type max_age: float
         :returns: a list of tasks
         :rtype: [dict]
         """
 
-        response = self._rpc.http_req(http.get, 'v2/tasks')
+        if app_id is None:
+            return list(self._all_tasks(max_age).tasks)
 
-        if app_id is not None:
-            app_id = util.normalize_marathon_id_path(app_id)
-            tasks = [
-                task for task in response.json()['tasks']
-                if app_id == task['appId']
-            ]
-        else:
-            tasks = response.json()['tasks']
-
-        return tasks
+        app_id = util.normalize_marathon_id_path(app_id)
+        path = 'v2/apps{}/tasks'.format(app_id)
+        response = self._rpc.http_req(self._not_found_as_none(http.get), path)
+        if response is None:
+            return []
+        # Marathon expands ids ending with `*` to all apps of a group.
+        return [task for task in response.json()['tasks'] if app_id == task['appId']]
 
-    def get_task(self, task_id):
+    def get_task(self, task_id, max_age=TASKS_CACHE_TTL):
         """Returns a task
 
+        The task is looked up among the tasks of the app derived from its id
+        and in the cached list of all tasks otherwise.
+
         :param task_id: the id of the task
         :type task_id: str
+        :param max_age: maximum age in seconds of the cached list of all tasks
+        :type max_age: float
         :returns: a tasks
         :rtype: dict
         """
 
-        response = self._rpc.http_req(http.get, 'v2/tasks')
+        app_id = app_id_of_task(task_id)
+        if app_id is not None:
+            task = next((task for task in self.get_tasks(app_id) if task_id == task['id']), None)
+            if task is not None:
+                return task
 
-        task = next(
-            (task for task in response.json()['tasks']
-             if task_id == task['id']),
-            None)
+        return self._all_tasks(max_age).tasks_by_id.get(task_id)
 
-        return task
+    def _all_tasks(self, max_age):
+        """Returns the indexed list of all tasks, fetching it if the cached
+        one is older than `max_age` seconds.
+
+        :rtype: TaskIndex
+        """
+
+        with self._tasks_cache_lock:
+            cached = self._tasks_cache
+            if cached is not None and time.monotonic() - cached.fetched_at <= max_age:
+                return cached
+
+            response = self._rpc.http_req(http.get, 'v2/tasks')
+            self._tasks_cache = TaskIndex(response.json()['tasks'])
+            return self._tasks_cache
+
+    def invalidate_tasks_cache(self):
+        """Drops the cached list of all tasks."""
+
+        with self._tasks_cache_lock:
+            self._tasks_cache = None
 
     def stop_task(self, task_id, wipe=None):
         """Stops a task.
@@ -572,6 +700,7 @@ class Client(object):
                                       'v2/tasks/delete',
                                       params=params,
                                       json={'ids': [task_id]})
+        self.invalidate_tasks_cache()
 
         task = next(
             (task for task in response.json()['tasks']
@@ -720,6 +849,25 @@ class Client(object):
         response = self._rpc.http_req(test_for_pods, 'v2/pods')
         return response.status_code // 100 == 2
 
+    @staticmethod
+    def _not_found_as_none(method_fn):
+        """Wraps `method_fn` to return None on status 404 instead of raising.
+
+        :param method_fn: function that invokes a specific HTTP method
+        :type method_fn: function
+        :rtype: function
+        """
+
+        def wrapper(url, **kwargs):
+            try:
+                return method_fn(url, **kwargs)
+            except DCOSHTTPException as e:
+                if e.status() == 404:
+                    return None
+                raise
+
+        return wrapper
+
     def get_queued_app(self, app_id):
         """Returns app information inside the launch queue.
 
@@ -813,6 +961,37 @@ class Client(object):
             raise DCOSException(template.format(response.text))
 
 
+class TaskIndex(object):
+    """List of all tasks indexed by task and app id.
+
+    :param tasks: tasks as returned by `v2/tasks`
+    :type tasks: [dict]
+    """
+
+    def __init__(self, tasks):
+        self.fetched_at = time.monotonic()
+        self.tasks = tasks
+        self.tasks_by_id = {task['id']: task for task in tasks}
+        self.tasks_by_app = dict()
+        for task in tasks:
+            self.tasks_by_app.setdefault(task['appId'], []).append(task)
+
+
+def app_id_of_task(task_id):
+    """Derives the app id from the id of one of its tasks.
+
+    :param task_id: the id of an app task, e.g. `group_app.instance-<uuid>._app.1`
+    :type task_id: str
+    :returns: the app id, e.g. `/group/app`, or None if `task_id` does not look like an app task id
+    :rtype: str | None
+    """
+
+    match = _APP_TASK_ID.match(task_id)
+    if match is None:
+        return None
+    return '/' + match.group('app').replace('_', '/')
+
+
 def get_app_or_pod_id(app_or_pod):
     """Gets the app or pod ID from the given app or pod
 
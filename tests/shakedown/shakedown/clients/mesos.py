@@ -1,5 +1,8 @@
 import base64
+import bisect
+import collections
 import fnmatch
+import heapq
 import itertools
 import json
 import logging
@@ -10,6 +13,7 @@ import threading
 import time
 import uuid
 
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from queue import Queue
 
@@ -32,20 +36,117 @@ COMPLETED_TASK_STATES = [
     "TASK_UNKNOWN"
 ]
 
+# Maximum age in seconds of a cached master state returned by get_master().
+# It is shorter than the default spin interval so that every tick of a wait
+# sees fresh state while repeated lookups within one tick share a fetch.
+MASTER_STATE_TTL = 0.5
 
-def get_master(dcos_client=None):
+# Bytes requested per files/read.json call of a MesosFile. Mesos returns at
+# most 16 pages per call.
+FILE_READ_CHUNK_SIZE = int(os.environ.get('SHAKEDOWN_FILE_READ_CHUNK_SIZE', 16 * 4096))
+
+# Number of files/read.json calls a MesosFile has in flight.
+FILE_READ_CONCURRENCY = int(os.environ.get('SHAKEDOWN_FILE_READ_CONCURRENCY', 8))
+
+# Bounds in seconds of the delay between two polls of a followed file. The
+# delay drops to the minimum when new data arrived and doubles while the file
+# is idle.
+FOLLOW_MIN_INTERVAL = float(os.environ.get('SHAKEDOWN_FOLLOW_MIN_INTERVAL', 0.1))
+FOLLOW_MAX_INTERVAL = float(os.environ.get('SHAKEDOWN_FOLLOW_MAX_INTERVAL', 5))
+
+# Number of agent state.json fetches Master.prefetch_agent_states() has in
+# flight, and the timeout in seconds of each of them.
+AGENT_STATE_CONCURRENCY = int(os.environ.get('SHAKEDOWN_AGENT_STATE_CONCURRENCY', 16))
+AGENT_STATE_TIMEOUT = float(os.environ.get('SHAKEDOWN_AGENT_STATE_TIMEOUT', 10))
+
+
+def get_master(dcos_client=None, max_age=MASTER_STATE_TTL):
     """Create a Master object using the url stored in the
     'core.mesos_master_url' property if it exists.  Otherwise, we use
     cluster url defined by SHAKEDOWN_DCOS_URL.
 
+    The master state is cached for `max_age` seconds.
+
     :param dcos_client: DCOSClient
     :type dcos_client: DCOSClient | None
+    :param max_age: maximum age in seconds of a cached state, 0 to refetch
+    :type max_age: float
     :returns: master state object
     :rtype: Master
     """
 
     dcos_client = dcos_client or DCOSClient()
-    return Master(dcos_client.get_master_state())
+    return _master_cache.get(dcos_client, max_age)
+
+
+class MasterStateCache(object):
+    """Cache of Master objects keyed by master URL.
+
+    Concurrent callers asking for the same master wait for a single fetch
+    instead of each downloading master/state.json. Masters with an attached
+    state mirror are served by the mirror while it is synced.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._mirrors = {}
+        self._lock = threading.Lock()
+
+    def get(self, dcos_client, max_age=MASTER_STATE_TTL):
+        """Returns the cached Master for `dcos_client`, fetching a new state
+        if the cached one is older than `max_age` seconds.
+
+        :param dcos_client: client used to fetch the state
+        :type dcos_client: DCOSClient
+        :param max_age: maximum age in seconds of the cached state
+        :type max_age: float
+        :rtype: Master
+        """
+
+        key = dcos_client.master_url('master/state.json')
+        mirror = self._mirrors.get(key)
+        if mirror is not None and mirror.synced:
+            try:
+                # Don't block if the stream dropped since the check.
+                return mirror.master(timeout=0)
+            except DCOSException:
+                pass
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < max_age:
+                return entry[1]
+
+            fetched_at = time.time()
+            master = Master(dcos_client.get_master_state())
+            self._entries[key] = (fetched_at, master)
+            return master
+
+    def invalidate(self):
+        """Drops all cached states."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def attach(self, key, mirror):
+        """Serves the master at `key` from a state mirror.
+
+        :param key: URL of the master's state.json
+        :type key: str
+        :param mirror: the mirror
+        :type mirror: shakedown.clients.mesosmirror.MesosStateMirror
+        """
+
+        self._mirrors[key] = mirror
+
+    def detach(self, key, mirror):
+        """Stops serving the master at `key` from `mirror`."""
+
+        if self._mirrors.get(key) is mirror:
+            del self._mirrors[key]
+
+
+_master_cache = MasterStateCache()
 
 
 class DCOSClient(object):
@@ -99,7 +200,7 @@ class DCOSClient(object):
         url = self.master_url('master/state.json')
         return http.get(url, timeout=self._timeout).json()
 
-    def get_slave_state(self, slave_id, private_url):
+    def get_slave_state(self, slave_id, private_url, timeout=None):
         """Get the Mesos slave state json object
 
         :param slave_id: slave ID
@@ -108,13 +209,15 @@ class DCOSClient(object):
                             pid.  Used when we're accessing mesos
                             directly, rather than through DC/OS.
         :type private_url: str
+        :param timeout: request timeout, the client's default if None
+        :type timeout: float | None
         :returns: Mesos' master state json object
         :rtype: dict
 
         """
 
         url = self.slave_url(slave_id, private_url, 'state.json')
-        return http.get(url, timeout=self._timeout).json()
+        return http.get(url, timeout=timeout or self._timeout).json()
 
     def get_state_summary(self):
         """Get the Mesos master state summary json object
@@ -313,6 +416,81 @@ class MesosDNSClient(object):
         return self.hosts('leader.mesos')
 
 
+class MasterSnapshot(object):
+    """Hash indexes over one Mesos master state.json.
+
+    The indexes are built once per fetched state so that lookups by task
+    ID, task name, agent ID and framework ID or name do not scan the
+    state. Task IDs are also kept sorted for prefix lookups.
+
+    :param state: Mesos master's state.json
+    :type state: dict
+    """
+
+    ACTIVE = 'active'
+    INACTIVE = 'inactive'
+    COMPLETED = 'completed'
+
+    def __init__(self, state):
+        # (task, framework, from_completed_tasks) in state.json order
+        self.task_entries = []
+        self.tasks_by_id = {}
+        self.tasks_by_name = collections.defaultdict(list)
+        self.agents_by_id = {}
+        # (framework, kind) in state.json order
+        self.framework_entries = []
+        self.frameworks_by_id = {}
+        self.frameworks_by_name = collections.defaultdict(list)
+        # Tasks listed under 'tasks' of all non-completed frameworks
+        self.current_tasks_by_id = {}
+
+        for agent in state.get('slaves', []):
+            self.agents_by_id[agent['id']] = agent
+
+        for framework in state.get('completed_frameworks', []):
+            self._add_framework(framework, self.COMPLETED)
+
+        for framework in state.get('frameworks', []):
+            kind = self.ACTIVE if framework.get('active') else self.INACTIVE
+            self._add_framework(framework, kind)
+            for task in framework.get('tasks', []):
+                self.current_tasks_by_id.setdefault(task['id'], task)
+
+        self.current_task_ids = sorted(self.current_tasks_by_id)
+
+    def _add_framework(self, framework, kind):
+        entry = (framework, kind)
+        self.framework_entries.append(entry)
+        self.frameworks_by_id.setdefault(framework['id'], framework)
+        self.frameworks_by_name[framework.get('name')].append(entry)
+
+        for key in ('tasks', 'completed_tasks'):
+            from_completed = key == 'completed_tasks'
+            for task in framework.get(key, []):
+                entry = (task, framework, from_completed)
+                self.task_entries.append(entry)
+                self.tasks_by_id.setdefault(task['id'], entry)
+                self.tasks_by_name[task.get('name')].append(entry)
+
+    def current_tasks_with_prefix(self, prefix):
+        """Returns the current tasks whose ID starts with `prefix`.
+
+        :param prefix: task ID prefix
+        :type prefix: str
+        :returns: matching task dictionaries
+        :rtype: [dict]
+        """
+
+        ids = self.current_task_ids
+        start = bisect.bisect_left(ids, prefix)
+        matches = []
+        for task_id in itertools.islice(ids, start, None):
+            if not task_id.startswith(prefix):
+                break
+            matches.append(self.current_tasks_by_id[task_id])
+        return matches
+
+
 class Master(object):
     """Mesos Master Model
 
@@ -322,8 +500,11 @@ class Master(object):
 
     def __init__(self, state):
         self._state = state
+        self._snapshot = MasterSnapshot(state)
         self._frameworks = {}
         self._slaves = {}
+        # Errors of agents whose state could not be prefetched, by agent ID
+        self._unreachable_agents = {}
 
     def state(self):
         """Returns master's master/state.json.
@@ -345,6 +526,11 @@ class Master(object):
         :rtype: Slave
         """
 
+        # An exact match always wins, even if it is a substring of others.
+        agent = self._snapshot.agents_by_id.get(fltr)
+        if agent is not None:
+            return self._slave_obj(agent)
+
         slaves = self.slaves(fltr)
 
         if len(slaves) == 0:
@@ -401,9 +587,28 @@ class Master(object):
         :rtype: Framework
         """
 
-        for f in self._framework_dicts(True, True):
-            if f['id'] == framework_id:
-                return self._framework_obj(f)
+        framework = self._snapshot.frameworks_by_id.get(framework_id)
+        if framework is not None:
+            return self._framework_obj(framework)
+        return None
+
+    def framework_by_name(self, name, inactive=False, completed=False):
+        """Returns the first framework named `name`, in the order of
+        `frameworks()`.
+
+        :param name: the framework's name
+        :type name: str
+        :param inactive: also include inactive frameworks
+        :type inactive: bool
+        :param completed: also include completed frameworks
+        :type completed: bool
+        :returns: the framework
+        :rtype: Framework | None
+        """
+
+        for framework, kind in self._snapshot.frameworks_by_name.get(name, []):
+            if self._include_framework(kind, inactive, completed, True):
+                return self._framework_obj(framework)
         return None
 
     def slaves(self, fltr=""):
@@ -433,27 +638,42 @@ class Master(object):
         :rtype: [Task]
         """
 
-        keys = ['tasks']
         show_completed = completed or all_
-        if show_completed:
-            keys.extend(['completed_tasks'])
+        # Without wildcards fnmatch only matches the ID itself, which is
+        # already covered by the substring check.
+        is_pattern = fltr is not None and any(c in fltr for c in '*?[')
 
         tasks = []
-        # get all frameworks
-        for framework in self._framework_dicts(True, True, True):
-            for task in _merge(framework, keys):
-                state = task.get("state")
-                if completed and state not in COMPLETED_TASK_STATES:
-                        continue
-
-                if fltr is None or \
-                        fltr in task['id'] or \
-                        fnmatch.fnmatchcase(task['id'], fltr):
-                    task = self._framework_obj(framework).task(task['id'])
-                    tasks.append(task)
+        for task, framework, from_completed in self._snapshot.task_entries:
+            if from_completed and not show_completed:
+                continue
+
+            if completed and task.get("state") not in COMPLETED_TASK_STATES:
+                continue
+
+            if fltr is None or \
+                    fltr in task['id'] or \
+                    (is_pattern and fnmatch.fnmatchcase(task['id'], fltr)):
+                tasks.append(self._framework_obj(framework).task(task['id']))
 
         return tasks
 
+    def tasks_by_name(self, name, completed=False):
+        """Returns the tasks named `name`, in the order of `tasks()`.
+
+        :param name: the task's name
+        :type name: str
+        :param completed: also include tasks listed as completed
+        :type completed: bool
+        :returns: a list of tasks
+        :rtype: [Task]
+        """
+
+        return [self._framework_obj(framework).task(task['id'])
+                for task, framework, from_completed
+                in self._snapshot.tasks_by_name.get(name, [])
+                if completed or not from_completed]
+
     def get_container_id(self, task_id):
         """Returns the container ID for a task ID matching `task_id`
 
@@ -464,14 +684,7 @@ class Master(object):
         """
 
         def _get_task(task_id):
-            candidates = []
-            if 'frameworks' in self.state():
-                for framework in self.state()['frameworks']:
-                    if 'tasks' in framework:
-                        for task in framework['tasks']:
-                            if 'id' in task:
-                                if task['id'].startswith(task_id):
-                                    candidates.append(task)
+            candidates = self._snapshot.current_tasks_with_prefix(task_id)
 
             if len(candidates) == 1:
                 return candidates[0]
@@ -521,6 +734,46 @@ class Master(object):
         return [self._framework_obj(framework)
                 for framework in self._framework_dicts(inactive, completed)]
 
+    def prefetch_agent_states(self, agent_ids=None, concurrency=AGENT_STATE_CONCURRENCY,
+                              timeout=AGENT_STATE_TIMEOUT, dcos_client=None):
+        """Fetches the state.json of many agents in parallel. Later calls of
+        `Slave.state()`, and thereby `Task.executor()` and
+        `Task.directory()`, use them instead of fetching one agent after
+        the other. Agents which fail or don't respond within `timeout` are
+        skipped, `Slave.state()` raises for them.
+
+        :param agent_ids: IDs of the agents, all agents if None
+        :type agent_ids: [str] | None
+        :param concurrency: maximum number of fetches at the same time
+        :type concurrency: int
+        :param timeout: timeout in seconds of each fetch
+        :type timeout: float
+        :param dcos_client: client to fetch with, a new one if None
+        :type dcos_client: DCOSClient | None
+        :returns: the states of the reachable agents by agent ID
+        :rtype: {str: dict}
+        """
+
+        dcos_client = dcos_client or DCOSClient()
+        if agent_ids is None:
+            slaves = self.slaves()
+        else:
+            agents = self._snapshot.agents_by_id
+            slaves = [self._slave_obj(agents[agent_id]) for agent_id in set(agent_ids) if agent_id in agents]
+
+        def fetch(slave):
+            return dcos_client.get_slave_state(slave['id'], slave.http_url(), timeout=timeout)
+
+        pending = [slave for slave in slaves if not slave._state and slave['id'] not in self._unreachable_agents]
+        for job, slave in util.stream(fetch, pending, concurrency):
+            try:
+                slave._state = job.result()
+            except Exception as e:
+                logger.warning('Could not fetch the state of agent %s: %s', slave['id'], e)
+                self._unreachable_agents[slave['id']] = e
+
+        return {slave['id']: slave._state for slave in slaves if slave._state}
+
     @util.duration
     def fetch(self, path, **kwargs):
         """GET the resource located at `path`
@@ -576,14 +829,25 @@ class Master(object):
         :returns: a list of frameworks
         """
 
-        if completed:
-            for framework in self.state()['completed_frameworks']:
+        for framework, kind in self._snapshot.framework_entries:
+            if self._include_framework(kind, inactive, completed, active):
                 yield framework
 
-        for framework in self.state()['frameworks']:
-            active_state = framework['active']
-            if (active_state and active) or (not active_state and inactive):
-                yield framework
+    @staticmethod
+    def _include_framework(kind, inactive, completed, active):
+        """Returns whether a framework of `kind` passes the given filters.
+
+        :param kind: one of the MasterSnapshot framework kinds
+        :type kind: str
+        :rtype: bool
+        """
+
+        if kind == MasterSnapshot.COMPLETED:
+            return completed
+        elif kind == MasterSnapshot.ACTIVE:
+            return active
+        else:
+            return inactive
 
 
 class Slave(object):
@@ -601,6 +865,7 @@ class Slave(object):
         self._short_state = short_state
         self._state = state
         self._master = master
+        self._executors_by_task = None
 
     def state(self):
         """Get the slave's state.json object.  Fetch it if it's not already
@@ -611,6 +876,9 @@ class Slave(object):
         """
 
         if not self._state:
+            error = self._master._unreachable_agents.get(self['id']) if self._master else None
+            if error is not None:
+                raise DCOSException('Agent {} is unreachable: {}'.format(self['id'], error))
             self._state = DCOSClient().get_slave_state(self['id'],
                                                        self.http_url())
         return self._state
@@ -645,6 +913,24 @@ class Slave(object):
                  for framework in self._framework_dicts()]
         return itertools.chain(*iters)
 
+    def task_executor(self, task_id):
+        """Returns the executor of a task on this slave. The executors are
+        indexed by task ID on the first call.
+
+        :param task_id: the task's ID
+        :type task_id: str
+        :returns: the executor
+        :rtype: dict | None
+        """
+
+        if self._executors_by_task is None:
+            executors = {}
+            for executor in self.executor_dicts():
+                for task in _merge(executor, ['completed_tasks', 'tasks', 'queued_tasks']):
+                    executors.setdefault(task['id'], executor)
+            self._executors_by_task = executors
+        return self._executors_by_task.get(task_id)
+
     def __getitem__(self, name):
         """Support the slave[attr] syntax
 
@@ -671,6 +957,7 @@ class Framework(object):
         self._framework = framework
         self._master = master
         self._tasks = {}  # id->Task map
+        self._task_dicts = None  # id->task dict map, built on first lookup
 
     def task(self, task_id):
         """Returns a task by id
@@ -681,9 +968,14 @@ class Framework(object):
         :rtype: Task
         """
 
-        for task in _merge(self._framework, ['tasks', 'completed_tasks']):
-            if task['id'] == task_id:
-                return self._task_obj(task)
+        if self._task_dicts is None:
+            self._task_dicts = {}
+            for task in _merge(self._framework, ['tasks', 'completed_tasks']):
+                self._task_dicts.setdefault(task['id'], task)
+
+        task = self._task_dicts.get(task_id)
+        if task is not None:
+            return self._task_obj(task)
         return None
 
     def _task_obj(self, task):
@@ -770,14 +1062,7 @@ class Task(object):
         :returns: task's executor
         :rtype: dict
         """
-        for executor in self.slave().executor_dicts():
-            tasks = _merge(executor,
-                           ['completed_tasks',
-                            'tasks',
-                            'queued_tasks'])
-            if any(task['id'] == self['id'] for task in tasks):
-                return executor
-        return None
+        return self.slave().task_executor(self['id'])
 
     def directory(self):
         """ Sandbox directory for this task
@@ -821,6 +1106,9 @@ class MesosFile(object):
     provide both.  If neither is provided, the file host is the
     leading master.
 
+    Reads are split into ranges of `chunk_size` bytes of which up to
+    `concurrency` are fetched at the same time.
+
     :param path: file's path, relative to the sandbox if `task` is given
     :type path: str
     :param task: file's task
@@ -829,10 +1117,15 @@ class MesosFile(object):
     :type slave: Slave | None
     :param dcos_client: client to use for network requests
     :type dcos_client: DCOSClient | None
+    :param chunk_size: number of bytes requested per files/read.json call
+    :type chunk_size: int
+    :param concurrency: maximum number of concurrent files/read.json calls
+    :type concurrency: int
 
     """
 
-    def __init__(self, path, task=None, slave=None, dcos_client=None):
+    def __init__(self, path, task=None, slave=None, dcos_client=None,
+                 chunk_size=FILE_READ_CHUNK_SIZE, concurrency=FILE_READ_CONCURRENCY):
         if task and slave:
             raise ValueError(
                 "You cannot provide both `task` and `slave` " +
@@ -849,6 +1142,9 @@ class MesosFile(object):
         self._path = path
         self._dcos_client = dcos_client or DCOSClient()
         self._cursor = 0
+        self._chunk_size = chunk_size
+        self._concurrency = concurrency
+        self._cached_host_path = None
 
     def size(self):
         """Size of the file
@@ -902,23 +1198,186 @@ class MesosFile(object):
         :rtype: str
         """
 
-        data = ''
-        while length is None or length - len(data) > 0:
-            chunk_length = -1 if length is None else length - len(data)
-            chunk = self._fetch_chunk(chunk_length)
-            if chunk == '':
+        if length is None:
+            length = max(self.size() - self._cursor, 0)
+        buffer = bytearray(length)
+        read = self.readinto(buffer)
+        return bytes(memoryview(buffer)[:read]).decode('utf-8', errors='replace')
+
+    def readinto(self, buffer):
+        """Reads up to `len(buffer)` bytes into `buffer`.
+
+        The ranges of the buffer are fetched concurrently. Fewer bytes are
+        read if the end of the file is reached.
+
+        :param buffer: writable buffer, e.g. a bytearray
+        :type buffer: bytearray | memoryview
+        :returns: number of bytes read
+        :rtype: int
+        """
+
+        view = memoryview(buffer).cast('B')
+        start = self._cursor
+        ranges = [(offset, min(self._chunk_size, len(view) - offset))
+                  for offset in range(0, len(view), self._chunk_size)]
+        if not ranges:
+            return 0
+
+        # The ranges are filled in place, a short range marks the end of file.
+        def fill(offset_and_length):
+            offset, length = offset_and_length
+            return self._fill(view[offset:offset + length], start + offset)
+
+        if len(ranges) == 1 or self._concurrency <= 1:
+            filled = [fill(r) for r in ranges]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self._concurrency, len(ranges))) as executor:
+                filled = list(executor.map(fill, ranges))
+
+        read = 0
+        for (_, length), count in zip(ranges, filled):
+            read += count
+            if count < length:
                 break
+
+        self._cursor = start + read
+        return read
+
+    def chunks(self, chunk_size=None):
+        """Iterates over the file from the cursor to its current end.
+
+        Up to `concurrency` chunks are fetched ahead of the one which is
+        yielded.
+
+        :param chunk_size: maximum size of a chunk, defaults to the chunk size of this file
+        :type chunk_size: int | None
+        :returns: generator of chunks
+        :rtype: generator of bytes
+        """
+
+        chunk_size = chunk_size or self._chunk_size
+        end = self.size()
+        offsets = iter(range(self._cursor, end, chunk_size))
+
+        def fetch(offset):
+            buffer = bytearray(min(chunk_size, end - offset))
+            count = self._fill(memoryview(buffer), offset)
+            return bytes(memoryview(buffer)[:count])
+
+        with ThreadPoolExecutor(max_workers=max(self._concurrency, 1)) as executor:
+            pending = collections.deque(executor.submit(fetch, offset)
+                                        for offset in itertools.islice(offsets, max(self._concurrency, 1)))
+            while pending:
+                chunk = pending.popleft().result()
+                if not chunk:
+                    break
+                self._cursor += len(chunk)
+                yield chunk
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(executor.submit(fetch, offset))
+
+    def __iter__(self):
+        """Iterates over the lines of the file from the cursor to its current end.
+
+        :rtype: generator of str
+        """
+
+        rest = b''
+        for chunk in self.chunks():
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop()
+            for line in lines:
+                yield (line + b'\n').decode('utf-8', errors='replace')
+        if rest:
+            yield rest.decode('utf-8', errors='replace')
+
+    def follow(self, from_end=False, min_interval=FOLLOW_MIN_INTERVAL, max_interval=FOLLOW_MAX_INTERVAL,
+               stop=None):
+        """Yields the lines written to the file, like `tail -f`.
+
+        Every poll only reads from the cursor on, so content is transferred
+        once. Polls are `min_interval` apart while data is flowing and back
+        off up to `max_interval` while the file is idle. Lines are yielded
+        once their newline has been written.
+
+        Use a `FilePoller` to follow many files from one thread.
+
+        :param from_end: whether to skip the content the file already has
+        :type from_end: bool
+        :param min_interval: delay in seconds between polls while data is flowing
+        :type min_interval: float
+        :param max_interval: maximum delay in seconds between polls while the file is idle
+        :type max_interval: float
+        :param stop: event which ends the generator when set
+        :type stop: threading.Event | None
+        :returns: generator of lines
+        :rtype: generator of str
+        """
+
+        if from_end:
+            self.seek(0, os.SEEK_END)
+        follower = _FileFollower(self, min_interval, max_interval)
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            for line in follower.poll():
+                yield line
+            stop.wait(follower.interval)
+
+    def _read_available(self):
+        """Reads from the cursor up to the current end of the file.
+
+        :returns: data read
+        :rtype: bytes
+        """
+
+        data = bytearray()
+        while True:
+            chunk = self._fetch(self._params(self._chunk_size))["data"].encode('utf-8', errors='surrogatepass')
             data += chunk
+            self._cursor += len(chunk)
+            # A short read is the end of the file, unless the server capped
+            # the response below the chunk size. The next poll then continues.
+            if len(chunk) < self._chunk_size:
+                return bytes(data)
+
+    def _fill(self, view, offset):
+        """Fills `view` with the bytes of the file starting at `offset`.
+
+        :param view: buffer to fill
+        :type view: memoryview
+        :param offset: file offset of the first byte of `view`
+        :type offset: int
+        :returns: number of bytes filled, less than `len(view)` at the end of the file
+        :rtype: int
+        """
 
-        return data
+        filled = 0
+        while filled < len(view):
+            params = self._params(len(view) - filled, offset=offset + filled)
+            data = self._fetch(params)["data"].encode('utf-8', errors='surrogatepass')
+            if not data:
+                break
+            # The server may return less than requested.
+            count = min(len(data), len(view) - filled)
+            view[filled:filled + count] = data[:count]
+            filled += count
+        return filled
 
     def _host_path(self):
         """ The absolute path to the file on slave.
 
+        It is derived from the task's state only once.
+
         :returns: the absolute path to the file on slave
         :rtype: str
         """
 
+        if self._cached_host_path is None:
+            self._cached_host_path = self._compute_host_path()
+        return self._cached_host_path
+
+    def _compute_host_path(self):
         if self._task:
             directory = self._task.directory().rstrip('/')
             executor = self._task.executor()
@@ -955,26 +1414,6 @@ class MesosFile(object):
             'length': length
         }
 
-    def _fetch_chunk(self, length, offset=None):
-        """Fetch data from files/read.json
-
-        :param length: number of bytes to fetch
-        :type length: int
-        :param offset: start location.  If not None, this file's
-                       cursor is set to `offset`
-        :type offset: int
-        :returns: data read
-        :rtype: str
-        """
-
-        if offset is not None:
-            self.seek(offset, os.SEEK_SET)
-
-        params = self._params(length)
-        data = self._fetch(params)["data"]
-        self.seek(len(data), os.SEEK_CUR)
-        return data
-
     def _fetch(self, params):
         """Fetch data from files/read.json
 
@@ -1006,10 +1445,270 @@ class MesosFile(object):
             return "master:{0}".format(self._path)
 
 
+class _FileFollower(object):
+    """Partial line and adaptive poll interval of a followed file.
+
+    :param mesos_file: the followed file, read from its cursor on
+    :type mesos_file: MesosFile
+    :param min_interval: delay in seconds between polls while data is flowing
+    :type min_interval: float
+    :param max_interval: maximum delay in seconds between polls while the file is idle
+    :type max_interval: float
+    """
+
+    def __init__(self, mesos_file, min_interval, max_interval):
+        self.file = mesos_file
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._rest = b''
+
+    def poll(self):
+        """Reads the data written since the previous poll and adapts the
+        interval to the next one.
+
+        :returns: the lines completed by the new data
+        :rtype: [str]
+        """
+
+        data = self.file._read_available()
+        if not data:
+            self.interval = min(max(self.interval * 2, self.min_interval), self.max_interval)
+            return []
+
+        self.interval = self.min_interval
+        lines = (self._rest + data).split(b'\n')
+        self._rest = lines.pop()
+        return [(line + b'\n').decode('utf-8', errors='replace') for line in lines]
+
+
+class FollowedFile(object):
+    """A file followed by a `FilePoller`.
+
+    :param poller: the poller following the file
+    :type poller: FilePoller
+    :param follower: cursor state of the file
+    :type follower: _FileFollower
+    :param callback: called with every new line on the poller thread
+    :type callback: function
+    """
+
+    def __init__(self, poller, follower, callback):
+        self._poller = poller
+        self._follower = follower
+        self._callback = callback
+        self.closed = False
+
+    @property
+    def file(self):
+        return self._follower.file
+
+    @property
+    def interval(self):
+        return self._follower.interval
+
+    def poll(self):
+        """Reads new lines and hands them to the callback.
+
+        A failing poll is logged and retried after the maximum interval.
+        """
+
+        try:
+            lines = self._follower.poll()
+        except Exception:
+            logger.exception('Failed to poll %s', self.file)
+            self._follower.interval = self._follower.max_interval
+            return
+
+        for line in lines:
+            if self.closed:
+                return
+            try:
+                self._callback(line)
+            except Exception:
+                logger.exception('Callback failed on a line of %s', self.file)
+
+    def close(self):
+        """Stops following the file."""
+
+        self._poller.unfollow(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+
+class FilePoller(object):
+    """Follows many files from a single background thread.
+
+    Each file is polled on its own adaptive interval, see
+    `MesosFile.follow`, so idle files cost a request every
+    `max_interval` seconds at most. The thread starts with the first
+    followed file.
+
+    :param min_interval: delay in seconds between polls while data is flowing
+    :type min_interval: float
+    :param max_interval: maximum delay in seconds between polls while a file is idle
+    :type max_interval: float
+    """
+
+    def __init__(self, min_interval=FOLLOW_MIN_INTERVAL, max_interval=FOLLOW_MAX_INTERVAL):
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        # Entries are (due time, sequence number, followed file).
+        self._schedule = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def follow(self, mesos_file, callback, from_end=False):
+        """Starts following a file.
+
+        :param mesos_file: the file to follow, read from its cursor on
+        :type mesos_file: MesosFile
+        :param callback: called with every new line on the poller thread
+        :type callback: function
+        :param from_end: whether to skip the content the file already has
+        :type from_end: bool
+        :returns: the followed file, close it to stop following
+        :rtype: FollowedFile
+        """
+
+        if from_end:
+            mesos_file.seek(0, os.SEEK_END)
+        follower = _FileFollower(mesos_file, self._min_interval, self._max_interval)
+        followed = FollowedFile(self, follower, callback)
+        with self._condition:
+            if self._stopped:
+                raise DCOSException('The file poller is stopped')
+            self._push(followed, time.monotonic())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='file-poller')
+                self._thread.daemon = True
+                self._thread.start()
+        return followed
+
+    def unfollow(self, followed):
+        """Stops following a file. It is dropped from the schedule when it is due.
+
+        :param followed: the followed file
+        :type followed: FollowedFile
+        """
+
+        with self._condition:
+            followed.closed = True
+
+    def stop(self):
+        """Stops following all files and waits for the poller thread."""
+
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+        return False
+
+    def _push(self, followed, due):
+        heapq.heappush(self._schedule, (due, next(self._sequence), followed))
+        self._condition.notify()
+
+    def _next_due(self):
+        """Blocks until a file is due.
+
+        :returns: the file to poll or None once stopped
+        :rtype: FollowedFile | None
+        """
+
+        with self._condition:
+            while not self._stopped:
+                if not self._schedule:
+                    self._condition.wait()
+                    continue
+                due, _, followed = self._schedule[0]
+                if followed.closed:
+                    heapq.heappop(self._schedule)
+                    continue
+                delay = due - time.monotonic()
+                if delay <= 0:
+                    heapq.heappop(self._schedule)
+                    return followed
+                self._condition.wait(delay)
+            return None
+
+    def _run(self):
+        while True:
+            followed = self._next_due()
+            if followed is None:
+                return
+            followed.poll()
+            with self._condition:
+                if not followed.closed:
+                    self._push(followed, time.monotonic() + followed.interval)
+
+
+def task_container_target(task_id, dcos_client=None):
+    """Locates the container of a task for the agent's container API.
+
+    :param task_id: task ID
+    :type task_id: str
+    :param dcos_client: client to use for network requests
+    :type dcos_client: DCOSClient | None
+    :returns: the URL of the agent's v1 API and the ID of the task's container
+    :rtype: (str, dict)
+    """
+
+    # Create a client and grab a reference to the DC/OS master.
+    client = dcos_client or DCOSClient()
+    master = get_master(client)
+
+    # Get the task and make sure its container was launched by the UCR.
+    # Since task's containers are launched by the UCR by default, we want
+    # to allow most tasks to pass through unchecked. The only exception is
+    # when a task has an explicit container specified and it is not of type
+    # "MESOS". Having a type of "MESOS" implies that it was launched by the
+    # UCR -- all other types imply it was not.
+    task_obj = master.task(task_id)
+    if "container" in task_obj.dict():
+        if "type" in task_obj.dict()["container"]:
+            if task_obj.dict()["container"]["type"] != "MESOS":
+                raise DCOSException(
+                    "This command is only supported for tasks"
+                    " launched by the Universal Container Runtime (UCR).")
+
+    # Get the URL to the agent running the task.
+    if client._mesos_master_url:
+        agent_url = client.slave_url(
+            slave_id="",
+            private_url=task_obj.slave().http_url(),
+            path="api/v1")
+    else:
+        agent_url = client.slave_url(
+            slave_id=task_obj.slave()['id'],
+            private_url="",
+            path="api/v1")
+
+    # Grab a reference to the container ID for the task.
+    return agent_url, master.get_container_id(task_id)
+
+
 class TaskIO(object):
     """Object used to stream I/O between a
     running Mesos task and the local terminal.
 
+    It runs one thread per stream. To exec into many containers at once
+    use `shakedown.clients.asynctaskio` instead.
+
     :param task: task ID
     :type task: str
     :param cmd: a command to launch inside the task's container
@@ -1037,38 +1736,7 @@ class TaskIO(object):
         self.tty = tty
         self.args = args
 
-        # Create a client and grab a reference to the DC/OS master.
-        client = DCOSClient()
-        master = get_master(client)
-
-        # Get the task and make sure its container was launched by the UCR.
-        # Since task's containers are launched by the UCR by default, we want
-        # to allow most tasks to pass through unchecked. The only exception is
-        # when a task has an explicit container specified and it is not of type
-        # "MESOS". Having a type of "MESOS" implies that it was launched by the
-        # UCR -- all other types imply it was not.
-        task_obj = master.task(task_id)
-        if "container" in task_obj.dict():
-            if "type" in task_obj.dict()["container"]:
-                if task_obj.dict()["container"]["type"] != "MESOS":
-                    raise DCOSException(
-                        "This command is only supported for tasks"
-                        " launched by the Universal Container Runtime (UCR).")
-
-        # Get the URL to the agent running the task.
-        if client._mesos_master_url:
-            self.agent_url = client.slave_url(
-                slave_id="",
-                private_url=task_obj.slave().http_url(),
-                path="api/v1")
-        else:
-            self.agent_url = client.slave_url(
-                slave_id=task_obj.slave()['id'],
-                private_url="",
-                path="api/v1")
-
-        # Grab a reference to the container ID for the task.
-        self.parent_id = master.get_container_id(task_id)
+        self.agent_url, self.parent_id = task_container_target(task_id)
 
         # Generate a new UUID for the nested container
         # used to run commands passed to `task exec`.
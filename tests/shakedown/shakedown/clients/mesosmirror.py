@@ -0,0 +1,449 @@
+"""Live mirror of the Mesos master state.
+
+A SUBSCRIBE call to the v1 operator API returns the full master state and
+then streams every change to it. `MesosStateMirror` applies these events to
+a copy of the state in the format of `master/state.json` and serves `Master`
+objects built from it. While a mirror is synced, `mesos.get_master()` uses
+it instead of downloading the state::
+
+    mirror = MesosStateMirror().start()
+    mesos.get_master().tasks()
+    mirror.stop()
+
+A `Master` is built once per batch of received events and shared by all
+lookups until the next one. The mirror reconnects when the stream breaks
+and `get_master()` falls back to fetching the state meanwhile.
+"""
+import collections
+import json
+import logging
+import os
+import threading
+
+from . import mesos, recordio
+from .. import http
+from ..errors import DCOSException
+
+logger = logging.getLogger(__name__)
+
+# Seconds without any data, heartbeats included, after which the stream is
+# considered broken. Mesos sends a heartbeat every 15 seconds.
+MIRROR_READ_TIMEOUT = float(os.environ.get('SHAKEDOWN_MIRROR_READ_TIMEOUT', 60))
+
+# Seconds between two attempts to subscribe.
+MIRROR_RECONNECT_INTERVAL = float(os.environ.get('SHAKEDOWN_MIRROR_RECONNECT_INTERVAL', 2))
+
+# Completed tasks kept per framework, the default of the Mesos master.
+MAX_COMPLETED_TASKS_PER_FRAMEWORK = 1000
+
+# States after which the master no longer lists a task as current.
+# Unreachable tasks are listed apart from the current and completed ones.
+UNREACHABLE_TASK_STATES = frozenset(['TASK_UNREACHABLE', 'TASK_UNKNOWN'])
+TERMINAL_TASK_STATES = frozenset(mesos.COMPLETED_TASK_STATES) - UNREACHABLE_TASK_STATES
+
+
+def _value(field):
+    """:returns: the value of a v1 ID message like `{"value": "..."}`"""
+
+    return (field or {}).get('value')
+
+
+def _role(resource):
+    reservations = resource.get('reservations')
+    if reservations:
+        return reservations[-1].get('role', '*')
+    return resource.get('role', '*')
+
+
+def _resources(resources):
+    """Converts v1 resources to the dictionary of state.json.
+
+    :param resources: v1 resources
+    :type resources: [dict]
+    :returns: scalar values by name, ranges as a "[begin-end, ...]" string
+    :rtype: dict
+    """
+
+    scalars = collections.OrderedDict()
+    ranges = collections.OrderedDict()
+    for resource in resources or []:
+        name = resource.get('name')
+        if resource.get('type') == 'RANGES':
+            ranges.setdefault(name, []).extend(
+                '{}-{}'.format(r['begin'], r['end']) for r in resource.get('ranges', {}).get('range', []))
+        elif resource.get('type', 'SCALAR') == 'SCALAR':
+            scalars[name] = scalars.get(name, 0) + resource.get('scalar', {}).get('value', 0)
+
+    converted = dict(scalars)
+    for name, values in ranges.items():
+        converted[name] = '[{}]'.format(', '.join(values))
+    return converted
+
+
+def _reserved_resources(resources):
+    """:returns: the resources of each role except `*`, as in state.json
+       :rtype: {str: dict}
+    """
+
+    by_role = collections.OrderedDict()
+    for resource in resources or []:
+        role = _role(resource)
+        if role != '*':
+            by_role.setdefault(role, []).append(resource)
+    return {role: _resources(role_resources) for role, role_resources in by_role.items()}
+
+
+def _attribute(attribute):
+    kind = attribute.get('type')
+    if kind == 'TEXT':
+        return attribute.get('text', {}).get('value')
+    if kind == 'SCALAR':
+        return attribute.get('scalar', {}).get('value')
+    if kind == 'RANGES':
+        return _resources([dict(attribute, name='value')]).get('value')
+    if kind == 'SET':
+        return '{{{}}}'.format(','.join(attribute.get('set', {}).get('item', [])))
+    return None
+
+
+def _labels(labels):
+    return (labels or {}).get('labels', [])
+
+
+def _status(status):
+    """Converts a v1 task status to the form of `statuses` in state.json."""
+
+    converted = {'state': status.get('state'), 'timestamp': status.get('timestamp')}
+    for key in ('container_status', 'healthy'):
+        if key in status:
+            converted[key] = status[key]
+    if 'labels' in status:
+        converted['labels'] = _labels(status['labels'])
+    return converted
+
+
+def _task(task):
+    """Converts a v1 task to a task of state.json."""
+
+    converted = {key: value for key, value in task.items()
+                 if key not in ('task_id', 'framework_id', 'agent_id', 'executor_id', 'resources', 'labels',
+                                'statuses', 'status_update_state', 'status_update_uuid')}
+    converted.update({
+        'id': _value(task.get('task_id')),
+        'framework_id': _value(task.get('framework_id')),
+        'slave_id': _value(task.get('agent_id')),
+        'executor_id': _value(task.get('executor_id')) or '',
+        'resources': _resources(task.get('resources')),
+        'statuses': [_status(status) for status in task.get('statuses', [])]
+    })
+    if 'labels' in task:
+        converted['labels'] = _labels(task['labels'])
+    return converted
+
+
+def _agent(agent):
+    """Converts a v1 agent to an entry of `slaves` of state.json."""
+
+    info = agent.get('agent_info', {})
+    total = agent.get('total_resources') or info.get('resources')
+    converted = {
+        'id': _value(info.get('id')),
+        'hostname': info.get('hostname'),
+        'port': info.get('port'),
+        'pid': agent.get('pid'),
+        'active': agent.get('active', True),
+        'version': agent.get('version'),
+        'attributes': {attribute['name']: _attribute(attribute) for attribute in info.get('attributes', [])},
+        'resources': _resources(total),
+        'used_resources': _resources(agent.get('allocated_resources')),
+        'offered_resources': _resources(agent.get('offered_resources')),
+        'reserved_resources': _reserved_resources(total),
+        'unreserved_resources': _resources([resource for resource in total or [] if _role(resource) == '*'])
+    }
+    if 'domain' in info:
+        converted['domain'] = info['domain']
+    return converted
+
+
+def _framework(framework):
+    """Converts a v1 framework to a framework of state.json without tasks."""
+
+    info = framework.get('framework_info', {})
+    return {
+        'id': _value(info.get('id')),
+        'name': info.get('name'),
+        'user': info.get('user'),
+        'hostname': info.get('hostname'),
+        'principal': info.get('principal'),
+        'webui_url': info.get('webui_url', ''),
+        'role': info.get('role') or (info.get('roles') or ['*'])[0],
+        'active': framework.get('active', True),
+        'connected': framework.get('connected', True)
+    }
+
+
+class MesosStateMirror(object):
+    """Mirrors the state of a Mesos master from its SUBSCRIBE stream.
+
+    :param dcos_client: client of the master, a new one if None
+    :type dcos_client: mesos.DCOSClient | None
+    """
+
+    def __init__(self, dcos_client=None):
+        dcos_client = dcos_client or mesos.DCOSClient()
+        self.url = dcos_client.master_url('api/v1')
+        self._state_url = dcos_client.master_url('master/state.json')
+
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._response = None
+
+        self._agents = collections.OrderedDict()
+        self._frameworks = collections.OrderedDict()
+        self._completed_frameworks = collections.OrderedDict()
+        # Current and unreachable tasks by framework ID and task ID.
+        self._tasks = {}
+        self._unreachable_tasks = {}
+        self._completed_tasks = {}
+        self._master = None
+        self.events = 0
+
+    @property
+    def synced(self):
+        """Whether the mirror received the state and is connected."""
+
+        return self._synced.is_set()
+
+    def start(self):
+        """Subscribes on a daemon thread and serves `mesos.get_master()` for
+        the master once synced.
+
+        :returns: the mirror
+        :rtype: MesosStateMirror
+        """
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='mesos-state-mirror')
+        self._thread.daemon = True
+        self._thread.start()
+        mesos._master_cache.attach(self._state_url, self)
+        return self
+
+    def stop(self):
+        """Closes the stream and detaches from `mesos.get_master()`."""
+
+        mesos._master_cache.detach(self._state_url, self)
+        self._stopped.set()
+        self._synced.clear()
+        response = self._response
+        if response is not None:
+            response.close()
+        if self._thread is not None:
+            self._thread.join(MIRROR_READ_TIMEOUT)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def wait_synced(self, timeout=None):
+        """Blocks until the mirror received the state.
+
+        :param timeout: seconds to wait at most, forever if None
+        :type timeout: float | None
+        :rtype: bool
+        """
+
+        return self._synced.wait(timeout)
+
+    def master(self, timeout=None):
+        """Returns the current state of the master.
+
+        :param timeout: seconds to wait for the mirror to sync, forever if None
+        :type timeout: float | None
+        :rtype: mesos.Master
+        """
+
+        if not self._synced.wait(timeout):
+            raise DCOSException('The state of {} is not mirrored yet'.format(self.url))
+        with self._lock:
+            if self._master is None:
+                self._master = mesos.Master(self._state())
+            return self._master
+
+    def _state(self):
+        """Builds a state.json from the mirrored state. Task, agent and
+        framework dictionaries are replaced rather than changed by events,
+        so they are shared with earlier states. Requires the lock.
+
+        :rtype: dict
+        """
+
+        def framework(framework_id, framework):
+            return dict(framework,
+                        tasks=list(self._tasks.get(framework_id, {}).values()),
+                        unreachable_tasks=list(self._unreachable_tasks.get(framework_id, {}).values()),
+                        completed_tasks=list(self._completed_tasks.get(framework_id, ())))
+
+        return {
+            'slaves': list(self._agents.values()),
+            'frameworks': [framework(framework_id, f) for framework_id, f in self._frameworks.items()],
+            'completed_frameworks': [framework(framework_id, f)
+                                     for framework_id, f in self._completed_frameworks.items()]
+        }
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._subscribe()
+            except Exception:
+                if self._stopped.is_set():
+                    break
+                logger.exception('Mirroring the state of %s failed', self.url)
+            self._synced.clear()
+            self._stopped.wait(MIRROR_RECONNECT_INTERVAL)
+
+    def _subscribe(self):
+        decoder = recordio.Decoder(lambda s: json.loads(s.decode('utf-8')))
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/recordio',
+            'Message-Accept': 'application/json'}
+        self._response = http.post(self.url, data=json.dumps({'type': 'SUBSCRIBE'}), headers=headers,
+                                   stream=True, timeout=(http.DEFAULT_TIMEOUT, MIRROR_READ_TIMEOUT))
+        try:
+            for chunk in self._response.iter_content(chunk_size=None):
+                self.apply(decoder.decode(chunk))
+        finally:
+            self._response.close()
+            self._response = None
+        if not self._stopped.is_set():
+            logger.warning('The SUBSCRIBE stream of %s ended', self.url)
+
+    def apply(self, events):
+        """Applies decoded operator API events to the mirrored state.
+
+        :param events: the events, e.g. SUBSCRIBED or TASK_UPDATED
+        :type events: [dict]
+        """
+
+        if not events:
+            return
+        with self._lock:
+            for event in events:
+                handler = self._handlers.get(event.get('type'))
+                if handler is not None:
+                    handler(self, event)
+            self.events += len(events)
+            self._master = None
+
+    def _subscribed(self, event):
+        state = event['subscribed']['get_state']
+        self._agents.clear()
+        self._frameworks.clear()
+        self._completed_frameworks.clear()
+        self._tasks.clear()
+        self._unreachable_tasks.clear()
+        self._completed_tasks.clear()
+
+        for agent in state.get('get_agents', {}).get('agents', []):
+            self._agent_added({'agent_added': {'agent': agent}})
+        frameworks = state.get('get_frameworks', {})
+        for framework in frameworks.get('frameworks', []):
+            self._framework_added({'framework_added': {'framework': framework}})
+        for framework in frameworks.get('completed_frameworks', []):
+            converted = _framework(framework)
+            self._completed_frameworks[converted['id']] = converted
+
+        tasks = state.get('get_tasks', {})
+        for task in tasks.get('tasks', []):
+            self._task_added({'task_added': {'task': task}})
+        for task in tasks.get('unreachable_tasks', []):
+            converted = _task(task)
+            self._unreachable(converted['framework_id'])[converted['id']] = converted
+        for task in tasks.get('completed_tasks', []):
+            converted = _task(task)
+            self._completed(converted['framework_id']).append(converted)
+
+        self._synced.set()
+        logger.info('Mirroring the state of %s: %d agents, %d frameworks',
+                    self.url, len(self._agents), len(self._frameworks))
+
+    def _completed(self, framework_id):
+        completed = self._completed_tasks.get(framework_id)
+        if completed is None:
+            completed = self._completed_tasks[framework_id] = collections.deque(
+                maxlen=MAX_COMPLETED_TASKS_PER_FRAMEWORK)
+        return completed
+
+    def _unreachable(self, framework_id):
+        return self._unreachable_tasks.setdefault(framework_id, collections.OrderedDict())
+
+    def _task_added(self, event):
+        task = _task(event['task_added']['task'])
+        self._tasks.setdefault(task['framework_id'], collections.OrderedDict())[task['id']] = task
+
+    def _task_updated(self, event):
+        update = event['task_updated']
+        framework_id = _value(update.get('framework_id'))
+        status = update.get('status', {})
+        task_id = _value(status.get('task_id'))
+        tasks = self._tasks.get(framework_id, {})
+        unreachable = self._unreachable_tasks.get(framework_id, {})
+        task = tasks.get(task_id) or unreachable.get(task_id)
+        if task is None:
+            logger.debug('Update of unknown task %s of framework %s', task_id, framework_id)
+            return
+
+        state = update.get('state') or status.get('state')
+        task = dict(task, state=state, statuses=task['statuses'] + [_status(status)])
+        if state in TERMINAL_TASK_STATES:
+            tasks.pop(task_id, None)
+            unreachable.pop(task_id, None)
+            self._completed(framework_id).append(task)
+        elif state in UNREACHABLE_TASK_STATES:
+            tasks.pop(task_id, None)
+            self._unreachable(framework_id)[task_id] = task
+        else:
+            # An unreachable task is current again once its agent reregisters.
+            unreachable.pop(task_id, None)
+            self._tasks.setdefault(framework_id, collections.OrderedDict())[task_id] = task
+
+    def _agent_added(self, event):
+        agent = _agent(event['agent_added']['agent'])
+        self._agents[agent['id']] = agent
+
+    def _agent_removed(self, event):
+        self._agents.pop(_value(event['agent_removed'].get('agent_id')), None)
+
+    def _framework_added(self, event):
+        framework = _framework(event.get('framework_added', event.get('framework_updated'))['framework'])
+        self._frameworks[framework['id']] = framework
+
+    def _framework_removed(self, event):
+        framework_id = _value(event['framework_removed']['framework_info'].get('id'))
+        framework = self._frameworks.pop(framework_id, None)
+        if framework is None:
+            return
+        self._completed_frameworks[framework_id] = dict(framework, active=False, connected=False)
+        # The master kills the tasks of a removed framework.
+        completed = self._completed(framework_id)
+        tasks = list(self._tasks.pop(framework_id, {}).values())
+        tasks += self._unreachable_tasks.pop(framework_id, {}).values()
+        for task in tasks:
+            completed.append(task if task.get('state') in TERMINAL_TASK_STATES else dict(task, state='TASK_KILLED'))
+
+    _handlers = {
+        'SUBSCRIBED': _subscribed,
+        'TASK_ADDED': _task_added,
+        'TASK_UPDATED': _task_updated,
+        'AGENT_ADDED': _agent_added,
+        'AGENT_REMOVED': _agent_removed,
+        'FRAMEWORK_ADDED': _framework_added,
+        'FRAMEWORK_UPDATED': _framework_added,
+        'FRAMEWORK_REMOVED': _framework_removed,
+    }
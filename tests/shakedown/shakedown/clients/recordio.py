@@ -95,12 +95,17 @@ class Decoder(object):
     def __init__(self, deserialize):
         self.deserialize = deserialize
         self.state = self.HEADER
-        self.buffer = bytes("", "UTF-8")
+        self.buffer = bytearray()
         self.length = 0
 
     def decode(self, data):
         """Decode a 'RecordIO' formatted message to its original type.
 
+        Incoming data is appended to an internal buffer which is scanned
+        from an offset: headers are located with 'find' and each completed
+        record is copied out of the buffer exactly once. Consumed bytes are
+        dropped from the front of the buffer at the end of the call.
+
         :param data: an array of 'UTF-8' encoded bytes that make up a
                       partial 'RecordIO' message. Subsequent calls to this
                       function maintain state to build up a full 'RecordIO'
@@ -110,46 +115,54 @@ class Decoder(object):
         :rtype: list
         """
 
-        if not isinstance(data, bytes):
+        if not isinstance(data, (bytes, bytearray, memoryview)):
             raise DCOSException("Parameter 'data' must of of type 'bytes'")
 
         if self.state == self.FAILED:
             raise DCOSException("Decoder is in a FAILED state")
 
-        records = []
+        buffer = self.buffer
+        buffer += data
 
-        for c in data:
-            if self.state == self.HEADER:
-                if c != ord('\n'):
-                    self.buffer += bytes([c])
-                    continue
-
-                try:
-                    self.length = int(self.buffer.decode("UTF-8"))
-                except Exception as exception:
-                    self.state = self.FAILED
-                    raise DCOSException("Failed to decode length"
-                                        "'{buffer}': {error}"
-                                        .format(buffer=self.buffer,
-                                                error=exception))
-
-                self.buffer = bytes("", "UTF-8")
-                self.state = self.RECORD
-
-                # Note that for 0 length records, we immediately decode.
-                if self.length <= 0:
-                    records.append(self.deserialize(self.buffer))
-                    self.state = self.HEADER
-
-            elif self.state == self.RECORD:
-                assert self.length
-                assert len(self.buffer) < self.length
-
-                self.buffer += bytes([c])
-
-                if len(self.buffer) == self.length:
-                    records.append(self.deserialize(self.buffer))
-                    self.buffer = bytes("", "UTF-8")
-                    self.state = self.HEADER
+        records = []
+        offset = 0
+
+        try:
+            while True:
+                if self.state == self.HEADER:
+                    end = buffer.find(b'\n', offset)
+                    if end == -1:
+                        break
+
+                    header = bytes(buffer[offset:end])
+                    try:
+                        self.length = int(header.decode("UTF-8"))
+                    except Exception as exception:
+                        self.state = self.FAILED
+                        raise DCOSException("Failed to decode length"
+                                            "'{buffer}': {error}"
+                                            .format(buffer=header,
+                                                    error=exception))
+
+                    offset = end + 1
+                    self.state = self.RECORD
+
+                    # Note that for 0 length records, we immediately decode.
+                    if self.length <= 0:
+                        records.append(self.deserialize(b''))
+                        self.state = self.HEADER
+                        continue
+
+                if len(buffer) - offset < self.length:
+                    break
+
+                with memoryview(buffer) as view:
+                    record = bytes(view[offset:offset + self.length])
+
+                offset += self.length
+                self.state = self.HEADER
+                records.append(self.deserialize(record))
+        finally:
+            del buffer[:offset]
 
         return records
@@ -0,0 +1,265 @@
+"""Frees the persistent volumes and reservations of a role on all agents.
+
+The operations are posted to the master for many agents at once. Mesos
+answers 409 while a framework that is being torn down still uses the
+resources, so these requests are retried with an exponential backoff::
+
+    report = cleanup.free_role('cassandra-role')
+    print(report)
+    assert report, report.failures()
+"""
+import json
+import logging
+import os
+import time
+
+from urllib.parse import urljoin
+
+from . import dcos_agents_state, master_url
+from .. import http, util
+from ..errors import DCOSHTTPException
+
+logger = logging.getLogger(__name__)
+
+# Number of agents cleaned up at the same time.
+CLEANUP_CONCURRENCY = int(os.environ.get('SHAKEDOWN_CLEANUP_CONCURRENCY', 16))
+
+# Retries of an operation the master answered with 409, and the bounds in
+# seconds of the delay between them. The delay doubles with every retry.
+CLEANUP_CONFLICT_RETRIES = int(os.environ.get('SHAKEDOWN_CLEANUP_CONFLICT_RETRIES', 8))
+CLEANUP_MIN_BACKOFF = 1
+CLEANUP_MAX_BACKOFF = 30
+
+DESTROY_VOLUMES = 'destroy-volumes'
+UNRESERVE = 'unreserve'
+
+
+class AgentResult(object):
+    """ The outcome of one operation on one agent.
+
+    :param agent_id: the agent's ID
+    :type agent_id: str
+    :param operation: DESTROY_VOLUMES or UNRESERVE
+    :type operation: str
+    :param resources: the resources the operation was posted for
+    :type resources: [dict]
+    :param attempts: number of requests sent
+    :type attempts: int
+    :param error: why the operation failed, None if it succeeded
+    :type error: str | None
+    """
+
+    def __init__(self, agent_id, operation, resources, attempts=0, error=None):
+        self.agent_id = agent_id
+        self.operation = operation
+        self.resources = resources
+        self.attempts = attempts
+        self.error = error
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+    def __str__(self):
+        outcome = 'freed {} resources'.format(len(self.resources)) if self.succeeded else self.error
+        return '{} on {}: {} after {} attempts'.format(self.operation, self.agent_id, outcome, self.attempts)
+
+
+class CleanupReport(object):
+    """ What a cleanup freed on which agents. It is truthy if nothing failed.
+
+    :param role: the cleaned up role
+    :type role: str
+    :param error: why the cleanup could not start, e.g. no agent state
+    :type error: str | None
+    """
+
+    def __init__(self, role, error=None):
+        self.role = role
+        self.error = error
+        self.results = []
+        self.seconds = 0.0
+
+    def failures(self):
+        """ :return: the failed operations
+            :rtype: [AgentResult]
+        """
+        return [result for result in self.results if not result.succeeded]
+
+    def freed(self):
+        """ Sums up the freed resources.
+
+            :return: number of destroyed volumes and the unreserved scalar
+                     resources, e.g. {'volumes': 3, 'cpus': 1.5, 'disk': 2048}
+            :rtype: {str: float}
+        """
+        totals = {'volumes': 0}
+        for result in self.results:
+            if not result.succeeded:
+                continue
+            if result.operation == DESTROY_VOLUMES:
+                totals['volumes'] += len(result.resources)
+                continue
+            for resource in result.resources:
+                value = resource.get('scalar', {}).get('value')
+                if value is not None:
+                    totals[resource['name']] = totals.get(resource['name'], 0) + value
+        return totals
+
+    @property
+    def agents(self):
+        return len(set(result.agent_id for result in self.results))
+
+    def __bool__(self):
+        return self.error is None and not self.failures()
+
+    def __str__(self):
+        if self.error is not None:
+            return 'Cleanup of role {} failed: {}'.format(self.role, self.error)
+        freed = ', '.join('{} {}'.format(value, name) for name, value in sorted(self.freed().items()))
+        lines = ['Cleanup of role {} on {} agents in {:.1f}s freed {}; {} operations failed'.format(
+            self.role, self.agents, self.seconds, freed, len(self.failures()))]
+        lines.extend('- {}'.format(result) for result in self.failures())
+        return '\n'.join(lines)
+
+
+def _reserved_resources(agent, role):
+    return (agent.get('reserved_resources_full') or {}).get(role) or []
+
+
+def _volumes(agent, role):
+    return [resource for resource in _reserved_resources(agent, role)
+            if resource.get('name') == 'disk' and 'persistence' in (resource.get('disk') or {})]
+
+
+def _without_volume(resource):
+    """ :return: the reserved disk a destroyed volume leaves behind
+        :rtype: dict
+    """
+    disk = {key: value for key, value in (resource.get('disk') or {}).items() if key not in ('persistence', 'volume')}
+    resource = {key: value for key, value in resource.items() if key != 'disk'}
+    if disk:
+        resource['disk'] = disk
+    return resource
+
+
+def _post(agent_id, operation, resources, retries, backoff):
+    """ Posts an operation for an agent, retrying while the master answers 409.
+
+    :rtype: AgentResult
+    """
+    result = AgentResult(agent_id, operation, resources)
+    if not resources:
+        return result
+
+    key = 'volumes' if operation == DESTROY_VOLUMES else 'resources'
+    data = {'slaveId': agent_id, key: json.dumps(resources)}
+    url = urljoin(master_url(), operation)
+    delay = backoff
+    while True:
+        result.attempts += 1
+        try:
+            http.post(url, data=data)
+            return result
+        except DCOSHTTPException as e:
+            status = e.response.status_code
+            if status != 409 or result.attempts > retries:
+                result.error = 'HTTP {}: {}'.format(status, e.response.text)
+                return result
+        except Exception as e:
+            result.error = str(e)
+            return result
+
+        # A framework that is being torn down may still use the resources.
+        logger.info('%s on agent %s conflicts, retrying in %.1fs', operation, agent_id, delay)
+        time.sleep(delay)
+        delay = min(delay * 2, CLEANUP_MAX_BACKOFF)
+
+
+def _cleanup(role, operations, agents=None, concurrency=CLEANUP_CONCURRENCY,
+             retries=CLEANUP_CONFLICT_RETRIES, backoff=CLEANUP_MIN_BACKOFF):
+    """ Runs the operations on every agent, one agent after the other in
+    parallel over the agents.
+
+    :rtype: CleanupReport
+    """
+    report = CleanupReport(role)
+    if agents is None:
+        state = dcos_agents_state()
+        if not state or 'slaves' not in state:
+            report.error = 'the state of the agents is not available'
+            return report
+        agents = state['slaves']
+    agents = [agent for agent in agents if _reserved_resources(agent, role)]
+
+    def clean(agent):
+        results = []
+        volumes = _volumes(agent, role)
+        if DESTROY_VOLUMES in operations:
+            results.append(_post(agent['id'], DESTROY_VOLUMES, volumes, retries, backoff))
+            if not results[-1].succeeded:
+                return results
+        if UNRESERVE in operations:
+            resources = _reserved_resources(agent, role)
+            if DESTROY_VOLUMES in operations:
+                resources = [_without_volume(resource) if resource in volumes else resource
+                             for resource in resources]
+            results.append(_post(agent['id'], UNRESERVE, resources, retries, backoff))
+        return results
+
+    start = time.monotonic()
+    for job, agent in util.stream(clean, agents, concurrency):
+        try:
+            report.results.extend(job.result())
+        except Exception as e:
+            report.results.append(AgentResult(agent['id'], ', '.join(operations), [], error=str(e)))
+    report.seconds = time.monotonic() - start
+    logger.info('%s', report)
+    return report
+
+
+def destroy_volumes(role, agents=None, concurrency=CLEANUP_CONCURRENCY):
+    """ Destroys the persistent volumes of a role on all agents.
+
+    :param role: the Mesos role
+    :type role: str
+    :param agents: agents from /mesos/slaves, fetched if None
+    :type agents: [dict] | None
+    :param concurrency: maximum number of agents cleaned up at the same time
+    :type concurrency: int
+
+    :rtype: CleanupReport
+    """
+    return _cleanup(role, [DESTROY_VOLUMES], agents, concurrency)
+
+
+def unreserve_resources(role, agents=None, concurrency=CLEANUP_CONCURRENCY):
+    """ Unreserves the resources of a role on all agents.
+
+    :param role: the Mesos role
+    :type role: str
+    :param agents: agents from /mesos/slaves, fetched if None
+    :type agents: [dict] | None
+    :param concurrency: maximum number of agents cleaned up at the same time
+    :type concurrency: int
+
+    :rtype: CleanupReport
+    """
+    return _cleanup(role, [UNRESERVE], agents, concurrency)
+
+
+def free_role(role, agents=None, concurrency=CLEANUP_CONCURRENCY):
+    """ Destroys the persistent volumes of a role and then unreserves its
+    resources, agent by agent. An agent's resources are unreserved right
+    after its volumes are destroyed, without waiting for other agents.
+
+    :param role: the Mesos role
+    :type role: str
+    :param agents: agents from /mesos/slaves, fetched if None
+    :type agents: [dict] | None
+    :param concurrency: maximum number of agents cleaned up at the same time
+    :type concurrency: int
+
+    :rtype: CleanupReport
+    """
+    return _cleanup(role, [DESTROY_VOLUMES, UNRESERVE], agents, concurrency)
@@ -143,139 +143,305 @@ def mesos_logging_strategy():
     return None
 
 
+# Scalar resources of an agent which are accounted for. Ports are counted.
+RESOURCE_NAMES = ('cpus', 'mem', 'disk', 'gpus', 'ports')
+
+# Resource types of an agent in the state summary, reserved_resources aside.
+RESOURCE_TYPES = ('resources', 'used_resources', 'offered_resources', 'unreserved_resources')
+
+
 def get_resources():
-    return _get_resources()
+    return ResourceSnapshot.fetch().total()
 
 
-def resources_needed(total_tasks=1, per_task_cpu=0.01, per_task_mem=1):
-    total_cpu = per_task_cpu * total_tasks
-    total_mem = per_task_mem * total_tasks
-    return Resources(total_cpu, total_mem)
+def resources_needed(total_tasks=1, per_task_cpu=0.01, per_task_mem=1, per_task_disk=0, per_task_gpus=0,
+                     per_task_ports=0):
+    return Resources(per_task_cpu, per_task_mem, per_task_disk, per_task_gpus, per_task_ports) * total_tasks
 
 
 def get_used_resources():
-    return _get_resources('used_resources')
+    return ResourceSnapshot.fetch().total('used_resources')
 
 
 def get_unreserved_resources():
-    return _get_resources('unreserved_resources')
+    return ResourceSnapshot.fetch().total('unreserved_resources')
 
 
 def available_resources():
-    res = get_resources()
-    used = get_used_resources()
-
-    return res - used
+    return ResourceSnapshot.fetch().available()
 
 
 def get_resources_by_role(role='*'):
-    if '*' in role:
-        return get_resources() - get_reserved_resources()
-    else:
-        return get_reserved_resources(role)
+    return ResourceSnapshot.fetch().by_role(role)
 
 
-def _get_resources(rtype='resources'):
-    """ resource types from state summary include:  resources, used_resources
-    offered_resources, reserved_resources, unreserved_resources
-    The default is resources.
+def get_reserved_resources(role=None):
+    """ resource types from state summary include: reserved_resources
 
-    :param rtype: the type of resources to return
-    :type rtype: str
     :param role: the name of the role if for reserved and if None all reserved
-    :type rtype: str
+    :type role: str
 
     :return: resources(cpu,mem)
     :rtype: Resources
     """
-    cpus = 0
-    mem = 0
-    summary = DCOSClient().get_state_summary()
+    return ResourceSnapshot.fetch().reserved(role)
 
-    if 'slaves' in summary:
-        agents = summary.get('slaves')
-        for agent in agents:
-            if agent[rtype].get('cpus') is not None:
-                cpus += agent[rtype].get('cpus')
-            if agent[rtype].get('mem') is not None:
-                mem += agent[rtype].get('mem')
 
-    return Resources(cpus, mem)
+def _port_count(ranges):
+    """ Counts the ports of a Mesos ranges string, e.g. "[31000-31005, 31010-31010]".
 
+    :param ranges: the port ranges
+    :type ranges: str
 
-def get_reserved_resources(role=None):
-    """ resource types from state summary include: reserved_resources
+    :return: the number of ports
+    :rtype: int
+    """
+    count = 0
+    for port_range in ranges.strip('[] ').split(','):
+        if '-' in port_range:
+            begin, end = port_range.split('-')
+            count += int(end) - int(begin) + 1
+    return count
 
-    :param role: the name of the role if for reserved and if None all reserved
-    :type role: str
 
-    :return: resources(cpu,mem)
-    :rtype: Resources
+def _resource_row(resources):
+    """ The scalar values of a resources object of the state summary.
+
+    :param resources: e.g. {"cpus": 4, "mem": 14861, "ports": "[1025-2180]"}
+    :type resources: dict
+
+    :return: the values in the order of RESOURCE_NAMES
+    :rtype: tuple
+    """
+    return (resources.get('cpus') or 0,
+            resources.get('mem') or 0,
+            resources.get('disk') or 0,
+            resources.get('gpus') or 0,
+            _port_count(resources['ports']) if resources.get('ports') else 0)
+
+
+def _columns(rows, agent_count):
+    """ Turns one row of resource values per agent into one column per resource.
+
+    :return: a list per resource of RESOURCE_NAMES, holding one value per agent
+    :rtype: [[float]]
+    """
+    if not rows:
+        return [[0] * agent_count for _ in RESOURCE_NAMES]
+    return [list(column) for column in zip(*rows)]
+
+
+class ResourceSnapshot(object):
+    """ The resources of all agents from one fetch of the master state summary.
+
+    Values are stored as columns: one list per resource type and resource,
+    holding the value of every agent. Sums and fit checks run over these
+    lists instead of walking the summary again.
+
+    :param summary: master state summary
+    :type summary: dict
     """
-    rtype = 'reserved_resources'
-    cpus = 0.0
-    mem = 0.0
-    summary = DCOSClient().get_state_summary()
-
-    if 'slaves' in summary:
-        agents = summary.get('slaves')
-        for agent in agents:
-            resource_reservations = agent.get(rtype)
-            reservations = []
-            if role is None or '*' in role:
-                reservations = resource_reservations.values()
-            elif role in resource_reservations:
-                reservations = [resource_reservations.get(role)]
-            for reservation in reservations:
-                if reservation.get('cpus') is not None:
-                    cpus += reservation.get('cpus')
-                if reservation.get('mem') is not None:
-                    mem += reservation.get('mem')
-
-    return Resources(cpus, mem)
+
+    def __init__(self, summary):
+        agents = summary.get('slaves', [])
+        self.agent_ids = [agent.get('id') for agent in agents]
+        self.hostnames = [agent.get('hostname') for agent in agents]
+        self.attributes = [agent.get('attributes') or {} for agent in agents]
+        self.domains = [(agent.get('domain') or {}).get('fault_domain') or {} for agent in agents]
+        count = len(agents)
+
+        self._columns = {rtype: _columns([_resource_row(agent.get(rtype) or {}) for agent in agents], count)
+                         for rtype in RESOURCE_TYPES}
+
+        roles = sorted({role for agent in agents for role in (agent.get('reserved_resources') or {})})
+        self._reserved = {
+            role: _columns([_resource_row((agent.get('reserved_resources') or {}).get(role) or {})
+                            for agent in agents], count)
+            for role in roles}
+
+    @classmethod
+    def fetch(cls, dcos_client=None):
+        """ Fetches the master state summary once.
+
+        :param dcos_client: client to use for network requests
+        :type dcos_client: DCOSClient | None
+
+        :rtype: ResourceSnapshot
+        """
+        return cls((dcos_client or DCOSClient()).get_state_summary())
+
+    @property
+    def roles(self):
+        """ :return: the roles with reservations
+            :rtype: [str]
+        """
+        return list(self._reserved)
+
+    def total(self, rtype='resources'):
+        """ Sums a resource type over all agents.
+
+        :param rtype: one of RESOURCE_TYPES
+        :type rtype: str
+
+        :rtype: Resources
+        """
+        return Resources(*[sum(column) for column in self._columns[rtype]])
+
+    def reserved(self, role=None):
+        """ Sums the reservations over all agents.
+
+        :param role: the name of the role if for reserved and if None or '*' all reserved
+        :type role: str
+
+        :rtype: Resources
+        """
+        if role is None or '*' in role:
+            roles = self._reserved.values()
+        else:
+            roles = [self._reserved[role]] if role in self._reserved else []
+        return Resources(*[sum(sum(role_columns[i]) for role_columns in roles) for i in range(len(RESOURCE_NAMES))])
+
+    def available(self):
+        return self.total() - self.total('used_resources')
+
+    def by_role(self, role='*'):
+        if '*' in role:
+            return self.total() - self.reserved()
+        else:
+            return self.reserved(role)
+
+    def agent_available(self, roles=None):
+        """ The resources of every agent which are not used.
+
+        Mesos does not report the used resources per role. For `roles`
+        the unused resources of an agent are therefore capped by its
+        unreserved resources for '*' plus its reservations of the roles.
+
+        :param roles: roles the resources may be allocated to, all if None
+        :type roles: [str] | None
+
+        :return: a list per resource of RESOURCE_NAMES, holding the value of every agent
+        :rtype: [[float]]
+        """
+        available = [[total - used for total, used in zip(totals, useds)]
+                     for totals, useds in zip(self._columns['resources'], self._columns['used_resources'])]
+        if roles is None:
+            return available
+
+        allocatable = [self._columns['unreserved_resources'] if role == '*' else self._reserved.get(role)
+                       for role in set(roles)]
+        allocatable = [columns for columns in allocatable if columns is not None]
+        return [[min(value, sum(columns[i][agent] for columns in allocatable)) for agent, value in enumerate(column)]
+                for i, column in enumerate(available)]
+
+    def agent_capacity(self, per_task, roles=None):
+        """ The number of tasks of the same size which fit on the available
+        resources of every agent. An agent fits as many tasks as its
+        scarcest resource allows.
+
+        :param per_task: the resources of one task
+        :type per_task: Resources
+        :param roles: roles the resources may be allocated to, all if None
+        :type roles: [str] | None
+
+        :return: the number of tasks of every agent
+        :rtype: [int]
+        """
+        needs = per_task.values()
+        if not any(needs):
+            raise ValueError('A task needs some resources: {}'.format(per_task))
+
+        capacity = None
+        for column, need in zip(self.agent_available(roles), needs):
+            if not need:
+                continue
+            # The epsilon keeps e.g. 0.3 cpus from fitting only two tasks of 0.1 cpus.
+            fits = [int(value / need + 1e-9) if value > 0 else 0 for value in column]
+            capacity = fits if capacity is None else [min(a, b) for a, b in zip(capacity, fits)]
+        return capacity
+
+    def max_tasks(self, per_task, roles=None):
+        """ The number of tasks of the same size which fit on the available
+        resources of the agents. A task has to fit on a single agent.
+
+        :param per_task: the resources of one task
+        :type per_task: Resources
+        :param roles: roles the resources may be allocated to, all if None
+        :type roles: [str] | None
+
+        :rtype: int
+        """
+        # Tasks of one size pack best by filling every agent up.
+        return sum(self.agent_capacity(per_task, roles))
+
+    def fits(self, total_tasks, per_task):
+        """ Whether `total_tasks` tasks of size `per_task` can be placed.
+
+        :param total_tasks: number of tasks
+        :type total_tasks: int
+        :param per_task: the resources of one task
+        :type per_task: Resources
+
+        :rtype: bool
+        """
+        return self.max_tasks(per_task) >= total_tasks
 
 
 class Resources(object):
 
     cpus = 0
     mem = 0
+    disk = 0
+    gpus = 0
+    ports = 0
 
-    def __init__(self, cpus=0, mem=0):
+    def __init__(self, cpus=0, mem=0, disk=0, gpus=0, ports=0):
         self.cpus = cpus
         self.mem = mem
+        self.disk = disk
+        self.gpus = gpus
+        self.ports = ports
+
+    def values(self):
+        """ :return: the values in the order of RESOURCE_NAMES
+            :rtype: tuple
+        """
+        return self.cpus, self.mem, self.disk, self.gpus, self.ports
 
     def __str__(self):
-        return "cpus: {}, mem: {}".format(self.cpus, self.mem)
+        return "cpus: {}, mem: {}, disk: {}, gpus: {}, ports: {}".format(*self.values())
 
     def __repr__(self):
-        return "cpus: {}, mem: {}".format(self.cpus, self.mem)
+        return self.__str__()
 
-    def __sub__(self, other):
-        total_cpu = self.cpus - other.cpus
-        total_mem = self.mem - other.mem
+    def __add__(self, other):
+        return Resources(*[a + b for a, b in zip(self.values(), other.values())])
 
-        return Resources(total_cpu, total_mem)
+    def __sub__(self, other):
+        return Resources(*[a - b for a, b in zip(self.values(), other.values())])
 
     def __rsub__(self, other):
         return self.__sub__(other)
 
+    # Resources are ordered partially, like sets: one is less than another
+    # if it is not more in any resource and differs in some.
     def __gt__(self, other):
-        return self.cpus > other.cpus and self.mem > other.cpus
+        return self >= other and self.values() != other.values()
 
     def __ge__(self, other):
-        return self.cpus >= other.cpus and self.mem >= other.cpus
+        return all(a >= b for a, b in zip(self.values(), other.values()))
 
     def __lt__(self, other):
-        return self.cpus < other.cpus and self.mem < other.cpus
+        return self <= other and self.values() != other.values()
 
     def __le__(self, other):
-        return self.cpus <= other.cpus and self.mem <= other.cpus
+        return all(a <= b for a, b in zip(self.values(), other.values()))
 
     def __mul__(self, other):
-        return Resources(self.cpus * other, self.mem * other)
+        return Resources(*[value * other for value in self.values()])
 
     def __rmul__(self, other):
-        return Resources(self.cpus * other, self.mem * other)
+        return self.__mul__(other)
 
     def __eq__(self, other):
         """Override the default Equals behavior"""
@@ -1,8 +1,10 @@
 import logging
 import shlex
 import subprocess
+import threading
 import time
-from _thread import RLock
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
 from functools import lru_cache, wraps
 from os import environ
@@ -12,12 +14,31 @@ import paramiko
 
 from . import master_ip, master_leader_ip, marathon_leader_ip
 from .helpers import validate_key, try_close, get_transport, start_transport
+from .. import metrics
 from ..clients import dcos_url
 from ..errors import DCOSException
 
 
 logger = logging.getLogger(__name__)
 
+# Number of hosts run_command_on_hosts runs a command on at the same time.
+DEFAULT_SSH_CONCURRENCY = int(environ.get('SHAKEDOWN_SSH_CONCURRENCY', 10))
+
+# Maximum number of cached SSH connections.
+SSH_POOL_MAX_SIZE = int(environ.get('SHAKEDOWN_SSH_POOL_MAX_SIZE', 64))
+
+# Seconds after which an unused SSH connection is closed.
+SSH_POOL_IDLE_TIMEOUT = float(environ.get('SHAKEDOWN_SSH_POOL_IDLE_TIMEOUT', 300))
+
+# Seconds between two health checks of the cached SSH connections.
+SSH_POOL_KEEPALIVE_INTERVAL = float(environ.get('SHAKEDOWN_SSH_POOL_KEEPALIVE_INTERVAL', 30))
+
+# Maximum number of concurrent sessions to a host. sshd allows 10 by default.
+SSH_MAX_SESSIONS_PER_HOST = int(environ.get('SHAKEDOWN_SSH_MAX_SESSIONS_PER_HOST', 8))
+
+# Number of locks serializing the connects of the keys hashed to them.
+SSH_POOL_CONNECT_LOCKS = 32
+
 
 @lru_cache()
 def ssh_key_file():
@@ -35,61 +56,246 @@ def ssh_user():
         raise DCOSException('SHAKEDOWN_SSH_USER environment variable is not defined.')
 
 
-def connection_cache(func: callable):
-    """Connection cache for SSH sessions. This is to prevent opening a
-     new, expensive connection on every command run."""
-    cache = dict()
-    lock = RLock()
+class ConnectionPool:
+    """Bounded pool of SSH connections, keyed by host and user.
+
+    Connections are evicted in least recently used order once more than
+    `max_size` are open and closed after `idle_timeout` seconds without use.
+    A background thread checks the idle connections every
+    `keepalive_interval` seconds and drops the ones that died. Only one
+    connection per key is opened at a time; concurrent callers for the same
+    key wait for it instead of opening duplicates. The keys share a fixed
+    set of connect locks, so the locks don't grow with the hosts seen.
+
+    :param connect: function opening a new connection for `(host, username, *args)`
+    :type connect: function
+    :param max_size: maximum number of cached connections
+    :type max_size: int
+    :param idle_timeout: seconds after which an unused connection is closed
+    :type idle_timeout: float
+    :param keepalive_interval: seconds between two health checks, 0 disables them
+    :type keepalive_interval: float
+    :param in_use: function telling whether a host has running sessions, their
+                   connections are never evicted
+    :type in_use: function | None
+    :param clock: monotonic time source
+    :type clock: function
+    """
 
-    @wraps(func)
-    def func_wrapper(host: str, username: str, *args, **kwargs):
+    def __init__(self, connect, max_size=SSH_POOL_MAX_SIZE, idle_timeout=SSH_POOL_IDLE_TIMEOUT,
+                 keepalive_interval=SSH_POOL_KEEPALIVE_INTERVAL, in_use=None, clock=time.monotonic):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self._in_use = in_use or (lambda host: False)
+        self._clock = clock
+        self._cache = OrderedDict()
+        self._hosts = dict()
+        self._last_used = dict()
+        self._key_locks = [threading.Lock() for _ in range(SSH_POOL_CONNECT_LOCKS)]
+        self._lock = threading.RLock()
+        self._keepalive_thread = None
+        self._metrics = {'opens': 0, 'reuses': 0, 'evictions': 0, 'failures': 0}
+
+    @staticmethod
+    def _is_valid(conn):
+        return conn is not None and conn.is_active() and conn.is_authenticated()
+
+    def get(self, host, username, *args, **kwargs):
         key = "{h}-{u}".format(h=host, u=username)
-        if key in cache:
-            # connection exists, check if it is still valid before
-            # returning it.
-            conn = cache[key]
-            if conn and conn.is_active() and conn.is_authenticated():
-                return conn
-            else:
-                # try to close a bad connection and remove it from
-                # the cache.
-                if conn:
-                    try_close(conn)
-                del cache[key]
-
-        # key is not in the cache, so try to recreate it
-        # it may have been removed just above.
-        if key not in cache:
-            conn = func(host, username, *args, **kwargs)
+        conn = self._lookup(key)
+        if conn is not None:
+            return conn
+
+        # Only one thread connects per key, most other keys are not blocked.
+        with self._key_locks[hash(key) % len(self._key_locks)]:
+            conn = self._lookup(key)
             if conn is not None:
-                cache[key] = conn
+                return conn
+
+            conn = self._connect(host, username, *args, **kwargs)
+            with self._lock:
+                if conn is None:
+                    self._metrics['failures'] += 1
+                    return None
+                self._metrics['opens'] += 1
+                self._cache[key] = conn
+                self._hosts[key] = host
+                self._last_used[key] = self._clock()
+                self._evict()
+            self._start_keepalive()
             return conn
 
-        # not sure how to reach this point, but just in case.
-        return None
+    def _lookup(self, key):
+        with self._lock:
+            conn = self._cache.get(key)
+            if conn is None:
+                return None
+            if self._is_valid(conn):
+                self._cache.move_to_end(key)
+                self._last_used[key] = self._clock()
+                self._metrics['reuses'] += 1
+                return conn
+            # try to close a bad connection and remove it from the cache.
+            self._remove(key)
+            return None
+
+    def _remove(self, key):
+        conn = self._cache.pop(key)
+        self._hosts.pop(key, None)
+        self._last_used.pop(key, None)
+        try_close(conn)
+
+    def _evict(self):
+        """Close idle connections and the least recently used ones above `max_size`.
+
+        Connections to hosts with running sessions are kept, even if that
+        means exceeding `max_size` for a while."""
+
+        with self._lock:
+            now = self._clock()
+            evictable = [key for key in self._cache if not self._in_use(self._hosts[key])]
+            expired = [key for key in evictable if now - self._last_used[key] > self.idle_timeout]
+            overflow = len(self._cache) - len(expired) - self.max_size
+            if overflow > 0:
+                expired.extend([key for key in evictable if key not in expired][:overflow])
+            for key in expired:
+                logger.debug('Evicting SSH connection %s', key)
+                self._remove(key)
+                self._metrics['evictions'] += 1
+
+    def keepalive(self):
+        """Evict idle connections and drop the ones which do not answer a keepalive."""
+
+        self._evict()
+        with self._lock:
+            conns = list(self._cache.items())
+        for key, conn in conns:
+            try:
+                conn.send_ignore()
+                alive = self._is_valid(conn)
+            except Exception:
+                alive = False
+            if not alive:
+                with self._lock:
+                    if self._cache.get(key) is conn:
+                        logger.info('Dropping dead SSH connection %s', key)
+                        self._remove(key)
+
+    def _start_keepalive(self):
+        with self._lock:
+            if self._keepalive_thread is not None or not self.keepalive_interval:
+                return
+            self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name='ssh-keepalive')
+            self._keepalive_thread.daemon = True
+            self._keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        while True:
+            time.sleep(self.keepalive_interval)
+            try:
+                self.keepalive()
+            except Exception:
+                logger.exception('SSH keepalive failed')
+
+    def get_cache(self) -> dict:
+        return self._cache
+
+    def metrics(self) -> dict:
+        """:returns: number of connection opens, reuses, evictions and failed opens
+           :rtype: dict
+        """
 
-    def get_cache() -> dict:
-        return cache
+        with self._lock:
+            return dict(self._metrics)
 
-    def purge(key: str=None):
-        with lock:
+    def purge(self, key: str = None):
+        with self._lock:
             if key is None:
-                conns = [(k, v) for k, v in cache.items()]
-            elif key in cache:
-                conns = ((key, cache[key]), )
+                keys = list(self._cache)
+            elif key in self._cache:
+                keys = [key]
             else:
-                conns = list()
+                keys = list()
+
+            for k in keys:
+                self._remove(k)
+
+
+def connection_cache(func: callable = None, **pool_options):
+    """Connection cache for SSH sessions. This is to prevent opening a
+     new, expensive connection on every command run.
+
+     The decorated function is backed by a `ConnectionPool` created with
+     `pool_options` and exposes its `get_cache`, `purge` and `metrics`."""
+
+    if func is None:
+        return lambda f: connection_cache(f, **pool_options)
+
+    pool = ConnectionPool(func, **pool_options)
 
-            for k, v in conns:
-                try_close(v)
-                del cache[k]
+    @wraps(func)
+    def func_wrapper(host: str, username: str, *args, **kwargs):
+        return pool.get(host, username, *args, **kwargs)
 
-    func_wrapper.get_cache = get_cache
-    func_wrapper.purge = purge
+    func_wrapper.pool = pool
+    func_wrapper.get_cache = pool.get_cache
+    func_wrapper.purge = pool.purge
+    func_wrapper.metrics = pool.metrics
     return func_wrapper
 
 
-@connection_cache
+class _SessionSlots:
+    """Limits and counts the concurrent sessions to a host. A pinned host
+    keeps its connection without taking a session."""
+
+    def __init__(self, limit):
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.pinned = 0
+
+    def pin(self):
+        with self._lock:
+            self.pinned += 1
+
+    def unpin(self):
+        with self._lock:
+            self.pinned -= 1
+
+    def acquire(self):
+        self._semaphore.acquire()
+        with self._lock:
+            self.active += 1
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._semaphore.release()
+
+
+_session_slots = dict()
+_session_slots_lock = threading.Lock()
+
+
+def _session_slot(host):
+    """:returns: the slots limiting the number of concurrent sessions to `host`
+       :rtype: _SessionSlots
+    """
+
+    with _session_slots_lock:
+        if host not in _session_slots:
+            _session_slots[host] = _SessionSlots(SSH_MAX_SESSIONS_PER_HOST)
+        return _session_slots[host]
+
+
+def _has_sessions(host):
+    slot = _session_slot(host)
+    return slot.active > 0 or slot.pinned > 0
+
+
+@connection_cache(in_use=_has_sessions)
 def _get_connection(host, username: str, key_path: str) \
         -> paramiko.Transport or None:
     """Return an authenticated SSH connection.
@@ -153,6 +359,63 @@ def run_command(
     return ec == 0, output
 
 
+def run_command_on_hosts(
+        hosts,
+        command,
+        username=None,
+        key_path=None,
+        noisy=True,
+        concurrency=DEFAULT_SSH_CONCURRENCY
+):
+    """ Run a command via SSH on several hosts concurrently.
+
+        Cached connections are reused and results are yielded as soon as
+        the command finished on a host, not in the order of `hosts`.
+
+        :param hosts: hosts or IPs of the machines to execute the command on
+        :type hosts: [str]
+        :param command: the command to execute, or a function returning the command for a host
+        :type command: str | function
+        :param username: SSH username
+        :type username: str
+        :param key_path: path to the SSH private key to use for SSH authentication
+        :type key_path: str
+        :param noisy: whether to print the output of each host once it is done
+        :type noisy: bool
+        :param concurrency: maximum number of hosts the command runs on at once
+        :type concurrency: int
+        :return: generator of (host, success, output) tuples
+        :rtype: generator
+    """
+
+    def command_for(host):
+        return command(host) if callable(command) else command
+
+    def run_on_host(host):
+        try:
+            with HostSession(host, username, key_path, False) as s:
+                if s.session is None:
+                    raise DCOSException('Unable to open an SSH session to {}'.format(host))
+                s.run(command_for(host))
+            ec, output = s.get_result()
+            return host, ec == 0, output
+        except Exception as e:
+            logger.warning('Failed to run "%s" on %s: %s', command_for(host), host, e)
+            return host, False, str(e)
+
+    hosts = list(dict.fromkeys(hosts))
+    if not hosts:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(min(concurrency, len(hosts)), 1)) as executor:
+        futures = [executor.submit(run_on_host, host) for host in hosts]
+        for future in as_completed(futures):
+            host, success, output = future.result()
+            if noisy:
+                print("\n>>{} $ {}\n{}".format(host, command_for(host), output), end='', flush=True)
+            yield host, success, output
+
+
 def run_command_on_master(
         command,
         username=None,
@@ -263,15 +526,22 @@ class HostSession:
         self.exit_code = -1
         self.output = ''
         self.session = None
+        self._started = None
 
     def __enter__(self):
         """
         :return: this session manager
         :rtype: HostSession
         """
-        c = _get_connection(self.host, self.username, self.key_path)
-        if c:
-            self.session = c.open_session()
+        self._slot = _session_slot(self.host)
+        self._slot.acquire()
+        try:
+            c = _get_connection(self.host, self.username, self.key_path)
+            if c:
+                self.session = c.open_session()
+        except Exception:
+            self._slot.release()
+            raise
 
         return self
 
@@ -280,6 +550,16 @@ class HostSession:
 
         :return: None
         """
+        try:
+            self._collect_output()
+        finally:
+            self._slot.release()
+        # no Exceptions were handled; return False
+        return False
+
+    def _collect_output(self):
+        if self.session is None:
+            return
         self.exit_code = self.session.recv_exit_status()
         self._wait_for_recv()
         # read data that is ready
@@ -293,8 +573,10 @@ class HostSession:
                     print(recv, end='', flush=True)
                 self.output += recv
         try_close(self.session)
-        # no Exceptions were handled; return False
-        return False
+        if self._started is not None:
+            status = 'success' if self.exit_code == 0 else 'failure'
+            metrics.SSH_COMMAND_DURATION.observe(time.perf_counter() - self._started, status)
+            metrics.SSH_RECEIVED_BYTES.inc(amount=len(self.output.encode('utf-8')))
 
     def _wait_for_recv(self):
         """After executing a command, wait for results.
@@ -319,6 +601,7 @@ class HostSession:
 
         :return: None
         """
+        self._started = time.perf_counter()
         self.session.exec_command(command)
 
     def get_result(self):
@@ -5,7 +5,8 @@ import os
 
 from .agent import get_private_agents
 from .command import run_command_on_master
-from .file import copy_file
+from .file import copy_files
+from ..errors import DCOSException
 
 
 def docker_version(host=None, component='server'):
@@ -106,8 +107,10 @@ def _distribute_docker_credentials_file(file_name):
         Used to access private docker repositories in tests.
     """
     # Upload docker.tar.gz to all private agents
-    for host in get_private_agents():
-        copy_file(host, file_name)
+    reports = copy_files({host: [file_name] for host in get_private_agents()})
+    failed = [host for host, report in reports.items() if report['failed']]
+    if failed:
+        raise DCOSException('Failed to copy {} to agents {}'.format(file_name, ', '.join(failed)))
 
 
 def distribute_docker_credentials_to_private_agents(
@@ -2,14 +2,48 @@ import logging
 import os
 import scp
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from . import master_ip
-from .command import ssh_user, ssh_key_file
-from .helpers import get_transport, start_transport, try_close, validate_key
+from .command import DEFAULT_SSH_CONCURRENCY, _get_connection, _session_slot
+from .helpers import try_close
+from .. import metrics
 
 logger = logging.getLogger(__name__)
 
 
+# Number of SCP transfers run at the same time over the connection to one host.
+SCP_CHANNELS_PER_HOST = int(os.environ.get('SHAKEDOWN_SCP_CHANNELS_PER_HOST', 4))
+
+
+def _scp(transport, host, file_path, remote_path, action):
+    """ Copy a single file over an already authenticated transport.
+
+        :return: number of bytes transferred
+        :rtype: int
+    """
+
+    transferred = dict()
+
+    def progress(filename, size, sent):
+        transferred[filename] = sent
+
+    channel = scp.SCPClient(transport, progress=progress)
+    try:
+        if action == 'get':
+            print("\n>>scp {}:{} {}\n".format(host, remote_path, file_path))
+            channel.get(remote_path, file_path)
+        else:
+            print("\n>>scp {} {}:{}\n".format(file_path, host, remote_path))
+            channel.put(file_path, remote_path)
+    finally:
+        try_close(channel)
+
+    size = sum(transferred.values())
+    metrics.SCP_BYTES.inc(action, amount=size)
+    return size
+
+
 def copy_file(
         host,
         file_path,
@@ -20,6 +54,8 @@ def copy_file(
 ):
     """ Copy a file via SCP, proxied through the mesos master
 
+        The SSH connection is taken from and left in the connection cache.
+
         :param host: host or IP of the machine to execute the command on
         :type host: str
         :param file_path: the local path to the file to be copied
@@ -35,38 +71,121 @@ def copy_file(
         :rtype: bool
     """
 
-    if not username:
-        username = ssh_user()
-
-    if not key_path:
-        key_path = ssh_key_file()
-
-    key = validate_key(key_path)
+    slot = _session_slot(host)
+    slot.acquire()
+    try:
+        transport = _get_connection(host, username, key_path)
+        if transport is None:
+            logger.error('unable to connect to %s', host)
+            return False
 
-    transport = get_transport(host, username, key)
-    transport = start_transport(transport, username, key)
-
-    if transport.is_authenticated():
         start = time.time()
+        size = _scp(transport, host, file_path, remote_path, action)
+        logger.info("%s bytes copied in %d seconds.", size, round(time.time() - start, 2))
+        return True
+    finally:
+        slot.release()
 
-        channel = scp.SCPClient(transport)
 
-        if action == 'get':
-            print("\n>>scp {}:{} {}\n".format(host, remote_path, file_path))
-            channel.get(remote_path, file_path)
-        else:
-            print("\n>>scp {} {}:{}\n".format(file_path, host, remote_path))
-            channel.put(file_path, remote_path)
+def copy_files(
+        host_to_paths,
+        username=None,
+        key_path=None,
+        action='put',
+        concurrency=DEFAULT_SSH_CONCURRENCY,
+        channels_per_host=SCP_CHANNELS_PER_HOST
+):
+    """ Copy many files via SCP to or from many hosts concurrently.
 
-        logger.info("%s bytes copied in %d seconds.", os.path.getsize(file_path), round(time.time() - start, 2))
+        Up to `concurrency` hosts are served at once. The files of a host are
+        copied over a single cached SSH connection with up to
+        `channels_per_host` transfers in flight.
 
-        try_close(channel)
-        try_close(transport)
+        :param host_to_paths: files to copy per host. An entry is either a
+                              `(file_path, remote_path)` tuple or a single path,
+                              which is the local file for `put` and the remote
+                              file for `get`, the other side being `.`.
+        :type host_to_paths: dict
+        :param username: SSH username
+        :type username: str
+        :param key_path: path to the SSH private key to use for SSH authentication
+        :type key_path: str
+        :param action: `put` to copy to the hosts, `get` to copy from them
+        :type action: str
+        :param concurrency: maximum number of hosts to copy files to or from at once
+        :type concurrency: int
+        :param channels_per_host: maximum number of concurrent transfers per host
+        :type channels_per_host: int
+
+        :return: per host report with the `files` copied, the paths which `failed`,
+                 the `bytes` transferred, the `seconds` it took and `bytes_per_second`
+        :rtype: dict
+    """
 
-        return True
-    else:
-        logger.error('unable to authenticate %s@%s with key %s', username, host, key_path)
-        return False
+    def normalize(entry):
+        if isinstance(entry, str):
+            return (entry, '.') if action == 'put' else ('.', entry)
+        return entry
+
+    def copy_one(host, transport, file_path, remote_path):
+        slot = _session_slot(host)
+        slot.acquire()
+        try:
+            return _scp(transport, host, file_path, remote_path, action)
+        finally:
+            slot.release()
+
+    def copy_to_host(host, entries):
+        report = {'files': 0, 'failed': [], 'bytes': 0, 'seconds': 0.0, 'bytes_per_second': 0.0}
+        start = time.time()
+        # Pin the host for the whole batch so the cached transport is neither
+        # evicted nor closed between two transfers. The transfers take the
+        # session slots.
+        slot = _session_slot(host)
+        slot.pin()
+        try:
+            try:
+                transport = _get_connection(host, username, key_path)
+            except Exception as e:
+                logger.warning('Failed to connect to %s: %s', host, e)
+                transport = None
+            if transport is None:
+                logger.error('unable to connect to %s', host)
+                report['failed'] = [remote_path if action == 'get' else file_path
+                                    for file_path, remote_path in entries]
+                return host, report
+
+            with ThreadPoolExecutor(max_workers=max(min(channels_per_host, len(entries)), 1)) as executor:
+                futures = {executor.submit(copy_one, host, transport, file_path, remote_path):
+                           remote_path if action == 'get' else file_path
+                           for file_path, remote_path in entries}
+                for future in as_completed(futures):
+                    try:
+                        report['bytes'] += future.result()
+                        report['files'] += 1
+                    except Exception as e:
+                        logger.warning('Failed to copy %s %s %s: %s', futures[future],
+                                       'from' if action == 'get' else 'to', host, e)
+                        report['failed'].append(futures[future])
+        finally:
+            slot.unpin()
+
+        report['seconds'] = time.time() - start
+        if report['seconds'] > 0:
+            report['bytes_per_second'] = report['bytes'] / report['seconds']
+        logger.info('%s: copied %d files, %d bytes in %.2f seconds (%.0f bytes/s)', host, report['files'],
+                    report['bytes'], report['seconds'], report['bytes_per_second'])
+        return host, report
+
+    jobs = {host: [normalize(entry) for entry in entries] for host, entries in host_to_paths.items() if entries}
+    if not jobs:
+        return dict()
+
+    reports = dict()
+    with ThreadPoolExecutor(max_workers=max(min(concurrency, len(jobs)), 1)) as executor:
+        for host, report in executor.map(lambda job: copy_to_host(*job), jobs.items()):
+            reports[host] = report
+    return reports
 
 
 def copy_file_to_master(
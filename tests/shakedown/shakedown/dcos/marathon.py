@@ -64,9 +64,10 @@ def deployment_predicate(app_id=None):
     return len(marathon.create_client().get_deployments(app_id)) == 0
 
 
-def deployment_wait(timeout=120, app_id=None):
+def deployment_wait(timeout=120, app_id=None, wake_on=None):
     time_wait(lambda: deployment_predicate(app_id),
-              timeout)
+              timeout,
+              wake_on=wake_on)
 
 
 def delete_app(app_id, force=True):
@@ -0,0 +1,359 @@
+"""Offline placement feasibility of Marathon apps and pods.
+
+Computes whether and where the instances of an app or pod definition fit on
+the agents of a `ResourceSnapshot`, taking resources, accepted resource roles,
+host ports and constraints into account. A test can skip or fail right away
+instead of waiting for a deployment which can never finish::
+
+    placement.assert_feasible(app_def)
+
+Tasks which are already running on the cluster are only accounted for
+through the used resources of the agents, constraints do not see them.
+"""
+import logging
+import os
+import re
+import time
+
+from .cluster import Resources, ResourceSnapshot
+from ..errors import DCOSException
+
+logger = logging.getLogger(__name__)
+
+# Maximum age in seconds of the snapshot shared by checks without an explicit
+# snapshot.
+SNAPSHOT_TTL = float(os.environ.get('SHAKEDOWN_PLACEMENT_SNAPSHOT_TTL', 5))
+
+# Resources Marathon assumes when an app definition omits them.
+APP_DEFAULT_CPUS = 1
+APP_DEFAULT_MEM = 128
+
+# Roles Marathon accepts resources of when a definition omits
+# acceptedResourceRoles. DC/OS starts Marathon with
+# --default_accepted_resource_roles=*, so public agents are not used.
+DEFAULT_ACCEPTED_RESOURCE_ROLES = os.environ.get('SHAKEDOWN_DEFAULT_ACCEPTED_RESOURCE_ROLES', '*').split(',')
+
+# Resources of the executor of a pod when its definition omits them.
+POD_DEFAULT_EXECUTOR_RESOURCES = {'cpus': 0.1, 'mem': 32, 'disk': 10}
+
+_snapshot_cache = {'snapshot': None, 'fetched': 0}
+
+
+def agent_snapshot(max_age=SNAPSHOT_TTL):
+    """ Returns a resource snapshot of the agents which is at most `max_age` seconds old.
+
+    :param max_age: maximum age in seconds of a cached snapshot
+    :type max_age: float
+
+    :rtype: ResourceSnapshot
+    """
+    now = time.monotonic()
+    if _snapshot_cache['snapshot'] is None or now - _snapshot_cache['fetched'] > max_age:
+        _snapshot_cache['snapshot'] = ResourceSnapshot.fetch()
+        _snapshot_cache['fetched'] = now
+    return _snapshot_cache['snapshot']
+
+
+class Requirement(object):
+    """ What the instances of an app or a pod need from the agents.
+
+    :param definition_id: ID of the app or pod
+    :type definition_id: str
+    :param instances: number of instances
+    :type instances: int
+    :param resources: resources of one instance
+    :type resources: Resources
+    :param roles: accepted resource roles, any if None
+    :type roles: [str] | None
+    :param constraints: constraints as [field, operator, value]
+    :type constraints: [[str]]
+    :param fixed_ports: whether an instance needs host ports with fixed numbers
+    :type fixed_ports: bool
+    """
+
+    def __init__(self, definition_id, instances, resources, roles=None, constraints=None, fixed_ports=False):
+        self.id = definition_id
+        self.instances = instances
+        self.resources = resources
+        self.roles = roles
+        self.constraints = constraints or []
+        self.fixed_ports = fixed_ports
+
+    @classmethod
+    def from_app(cls, app_def):
+        """ :param app_def: Marathon app definition
+            :type app_def: dict
+            :rtype: Requirement
+        """
+        container = app_def.get('container') or {}
+        port_mappings = container.get('portMappings') or (container.get('docker') or {}).get('portMappings') or []
+        # Marathon gives a host networking app without port definitions one
+        # port, the count here only includes ports which are asked for.
+        # Port numbers are only fixed with requirePorts, host ports of port
+        # mappings always are. Zero stands for a random port.
+        if 'portDefinitions' in app_def or 'ports' in app_def:
+            ports = app_def.get('ports') or [definition.get('port', 0)
+                                             for definition in app_def.get('portDefinitions') or []]
+            fixed_ports = app_def.get('requirePorts', False) and any(ports)
+        else:
+            ports = [mapping['hostPort'] for mapping in port_mappings if mapping.get('hostPort') is not None]
+            fixed_ports = any(ports)
+
+        resources = Resources(app_def.get('cpus', APP_DEFAULT_CPUS), app_def.get('mem', APP_DEFAULT_MEM),
+                              app_def.get('disk', 0), app_def.get('gpus', 0), len(ports))
+        return cls(app_def.get('id'), app_def.get('instances', 1), resources,
+                   roles=app_def.get('acceptedResourceRoles') or DEFAULT_ACCEPTED_RESOURCE_ROLES,
+                   constraints=[list(constraint) for constraint in app_def.get('constraints') or []],
+                   fixed_ports=fixed_ports)
+
+    @classmethod
+    def from_pod(cls, pod_def):
+        """ :param pod_def: Marathon pod definition
+            :type pod_def: dict
+            :rtype: Requirement
+        """
+        resources = Resources(**dict(POD_DEFAULT_EXECUTOR_RESOURCES, **(pod_def.get('executorResources') or {})))
+        ports = []
+        for container in pod_def.get('containers') or []:
+            container_resources = container.get('resources') or {}
+            resources += Resources(container_resources.get('cpus', 0), container_resources.get('mem', 0),
+                                   container_resources.get('disk', 0), container_resources.get('gpus', 0))
+            ports += [endpoint['hostPort'] for endpoint in container.get('endpoints') or []
+                      if endpoint.get('hostPort') is not None]
+        resources.ports = len(ports)
+
+        scheduling = pod_def.get('scheduling') or {}
+        placement = scheduling.get('placement') or {}
+        constraints = [[constraint['fieldName'], constraint['operator']] +
+                       ([constraint['value']] if constraint.get('value') is not None else [])
+                       for constraint in placement.get('constraints') or []]
+        return cls(pod_def.get('id'), (pod_def.get('scaling') or {}).get('instances', 1), resources,
+                   roles=placement.get('acceptedResourceRoles') or DEFAULT_ACCEPTED_RESOURCE_ROLES,
+                   constraints=constraints, fixed_ports=any(ports))
+
+    @classmethod
+    def from_definition(cls, definition):
+        """ :param definition: Marathon app or pod definition
+            :type definition: dict
+            :rtype: Requirement
+        """
+        if 'containers' in definition:
+            return cls.from_pod(definition)
+        return cls.from_app(definition)
+
+
+class Placement(object):
+    """ The outcome of a feasibility check. It is truthy if all instances fit.
+
+    :param requirement: the checked requirement
+    :type requirement: Requirement
+    :param hosts: number of instances placed per agent hostname
+    :type hosts: {str: int}
+    :param reason: why not all instances fit, None if they do
+    :type reason: str | None
+    """
+
+    def __init__(self, requirement, hosts, reason=None):
+        self.requirement = requirement
+        self.hosts = hosts
+        self.reason = reason
+
+    @property
+    def placed(self):
+        return sum(self.hosts.values())
+
+    @property
+    def feasible(self):
+        return self.placed >= self.requirement.instances
+
+    def __bool__(self):
+        return self.feasible
+
+    def __str__(self):
+        if self.feasible:
+            return '{} instances of {} fit on {}'.format(self.requirement.instances, self.requirement.id,
+                                                         sorted(self.hosts))
+        return '{} of {} instances of {} fit: {}'.format(
+            self.placed, self.requirement.instances, self.requirement.id, self.reason)
+
+
+class _AgentIndex(object):
+    """ Agents of a snapshot indexed by the values of constraint fields.
+
+    :param snapshot: the agents
+    :type snapshot: ResourceSnapshot
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._values = {}
+        self._groups = {}
+
+    def values(self, field):
+        """ :return: the value of `field` of every agent, None if it has none
+            :rtype: [str | None]
+        """
+        if field not in self._values:
+            snapshot = self._snapshot
+            if field in ('hostname', '@hostname'):
+                values = list(snapshot.hostnames)
+            elif field in ('@region', '@zone'):
+                key = field[1:]
+                values = [(domain.get(key) or {}).get('name') for domain in snapshot.domains]
+            else:
+                values = [attributes.get(field) for attributes in snapshot.attributes]
+            self._values[field] = [None if value is None else str(value) for value in values]
+        return self._values[field]
+
+    def groups(self, field):
+        """ :return: the agent indices per value of `field`
+            :rtype: {str: set}
+        """
+        if field not in self._groups:
+            groups = {}
+            for agent, value in enumerate(self.values(field)):
+                if value is not None:
+                    groups.setdefault(value, set()).add(agent)
+            self._groups[field] = groups
+        return self._groups[field]
+
+    def matching(self, field, pattern, negate=False):
+        """ Agents whose value of `field` fully matches the regular expression
+        `pattern`. Only the distinct values are matched.
+
+        :rtype: set
+        """
+        regex = re.compile(pattern)
+        matches = set()
+        for value, agents in self.groups(field).items():
+            if bool(regex.fullmatch(value)) != negate:
+                matches |= agents
+        if negate:
+            # Agents without the field do not match the pattern either.
+            matches |= {agent for agent, value in enumerate(self.values(field)) if value is None}
+        return matches
+
+
+def check(definition, instances=None, snapshot=None):
+    """ Computes whether and where the instances of an app or pod fit.
+
+    Agents are filled greedily, largest capacity first, within the limits of
+    the grouping constraints (UNIQUE, MAX_PER, CLUSTER). GROUP_BY only spreads
+    instances in Marathon and does not limit them here.
+
+    :param definition: Marathon app or pod definition
+    :type definition: dict
+    :param instances: number of instances, the one of the definition if None
+    :type instances: int | None
+    :param snapshot: the agents, a cached snapshot if None
+    :type snapshot: ResourceSnapshot | None
+
+    :rtype: Placement
+    """
+    requirement = Requirement.from_definition(definition)
+    if instances is not None:
+        requirement.instances = instances
+    snapshot = snapshot or agent_snapshot()
+    index = _AgentIndex(snapshot)
+
+    capacity = snapshot.agent_capacity(requirement.resources, requirement.roles)
+    if requirement.fixed_ports:
+        # Instances on one agent would compete for the same host ports.
+        capacity = [min(tasks, 1) for tasks in capacity]
+    if not any(capacity):
+        return Placement(requirement, {}, 'no agent has {} available for roles {}'.format(
+            requirement.resources, requirement.roles or ['*']))
+
+    candidates = set(agent for agent, tasks in enumerate(capacity) if tasks > 0)
+    # Each limit is (field, maximum instances per value of the field).
+    limits = []
+    clusters = []
+    for constraint in requirement.constraints:
+        field, operator = constraint[0], constraint[1].upper()
+        value = constraint[2] if len(constraint) > 2 else None
+        if operator == 'LIKE' or (operator == 'IS' and value is not None):
+            candidates &= index.matching(field, value if operator == 'LIKE' else re.escape(value))
+        elif operator == 'UNLIKE':
+            candidates &= index.matching(field, value, negate=True)
+        elif operator == 'UNIQUE':
+            limits.append((field, 1))
+        elif operator == 'MAX_PER':
+            limits.append((field, int(value)))
+        elif operator == 'CLUSTER':
+            if value is not None:
+                candidates &= index.matching(field, re.escape(value))
+            else:
+                clusters.append(field)
+        elif operator != 'GROUP_BY':
+            logger.warning('Ignoring unknown constraint %s of %s', constraint, requirement.id)
+
+    if not candidates:
+        return Placement(requirement, {}, 'no agent with enough resources matches {}'.format(
+            requirement.constraints))
+
+    # CLUSTER without a value puts all instances on agents with the same
+    # value: try every value and keep the best.
+    candidate_sets = [candidates]
+    for field in clusters:
+        candidate_sets = [agents & group for agents in candidate_sets for group in index.groups(field).values()]
+
+    best = {}
+    for agents in candidate_sets:
+        hosts = _fill(requirement.instances, agents, capacity, limits, index, snapshot)
+        if sum(hosts.values()) > sum(best.values()):
+            best = hosts
+        if sum(best.values()) >= requirement.instances:
+            break
+
+    reason = None
+    if sum(best.values()) < requirement.instances:
+        reason = 'agents run out of resources within the constraints {}'.format(requirement.constraints)
+    return Placement(requirement, best, reason)
+
+
+def _fill(instances, agents, capacity, limits, index, snapshot):
+    """ Places instances on the agents, largest capacity first.
+
+    :return: number of instances per agent hostname
+    :rtype: {str: int}
+    """
+    used = [{} for _ in limits]
+    hosts = {}
+    remaining = instances
+    for agent in sorted(agents, key=lambda agent: -capacity[agent]):
+        if remaining <= 0:
+            break
+        tasks = min(capacity[agent], remaining)
+        values = []
+        for (field, maximum), counts in zip(limits, used):
+            value = index.values(field)[agent]
+            values.append(value)
+            # Agents without the field can't satisfy a limit on it.
+            tasks = 0 if value is None else min(tasks, maximum - counts.get(value, 0))
+        if tasks <= 0:
+            continue
+        for value, counts in zip(values, used):
+            counts[value] = counts.get(value, 0) + tasks
+        hostname = snapshot.hostnames[agent] or snapshot.agent_ids[agent]
+        hosts[hostname] = hosts.get(hostname, 0) + tasks
+        remaining -= tasks
+    return hosts
+
+
+def assert_feasible(definition, instances=None, snapshot=None):
+    """ Raises unless all instances of an app or pod fit.
+
+    :param definition: Marathon app or pod definition
+    :type definition: dict
+    :param instances: number of instances, the one of the definition if None
+    :type instances: int | None
+    :param snapshot: the agents, a cached snapshot if None
+    :type snapshot: ResourceSnapshot | None
+
+    :return: the placement
+    :rtype: Placement
+    """
+    placement = check(definition, instances, snapshot)
+    if not placement:
+        raise DCOSException('Placement is not feasible: {}'.format(placement))
+    return placement
@@ -1,6 +1,6 @@
-import json
+import time
 
-from . import dcos_agents_state, master_url
+from . import cleanup
 from .master import get_all_masters
 from .spinner import time_wait, TimeoutExpired
 from .zookeeper import delete_zk_node
@@ -9,8 +9,6 @@ from .. import http
 from ..clients import marathon, mesos, dcos_service_url
 from ..errors import DCOSException, DCOSConnectionError, DCOSHTTPException
 
-from urllib.parse import urljoin
-
 
 def get_service(
         service_name,
@@ -29,13 +27,7 @@ def get_service(
         :rtype: dict, or None
     """
 
-    services = mesos.get_master().frameworks(inactive=inactive, completed=completed)
-
-    for service in services:
-        if service['name'] == service_name:
-            return service
-
-    return None
+    return mesos.get_master().framework_by_name(service_name, inactive=inactive, completed=completed)
 
 
 def get_service_framework_id(
@@ -174,12 +166,10 @@ def get_marathon_task(
 def get_mesos_task(task_name):
     """ Get a mesos task with a specific task name
     """
-    tasks = get_mesos_tasks()
+    tasks = mesos.get_master().tasks_by_name(task_name)
 
-    if tasks is not None:
-        for task in tasks:
-            if task['name'] == task_name:
-                return task
+    if tasks:
+        return tasks[0]
     return None
 
 
@@ -274,8 +264,9 @@ def delete_persistent_data(role, zk_node):
         :type zk_node: str
     """
     if role:
-        destroy_volumes(role)
-        unreserve_resources(role)
+        report = cleanup.free_role(role)
+        if not report:
+            print(report)
 
     if zk_node:
         delete_zk_node(zk_node)
@@ -283,110 +274,38 @@ def delete_persistent_data(role, zk_node):
 
 def destroy_volumes(role):
     """ Destroys all volumes on all the slaves in the cluster for the role.
+
+        :return: what was destroyed, truthy if all volumes were destroyed
+        :rtype: cleanup.CleanupReport
     """
-    state = dcos_agents_state()
-    if not state or 'slaves' not in state.keys():
-        return False
-    all_success = True
-    for agent in state['slaves']:
-        if not destroy_volume(agent, role):
-            all_success = False
-    return all_success
+    return cleanup.destroy_volumes(role)
 
 
 def destroy_volume(agent, role):
     """ Deletes the volumes on the specific agent for the role
     """
-    volumes = []
-    agent_id = agent['id']
-
-    reserved_resources_full = agent.get('reserved_resources_full', None)
-    if not reserved_resources_full:
-        # doesn't exist
-        return True
-
-    reserved_resources = reserved_resources_full.get(role, None)
-    if not reserved_resources:
-        # doesn't exist
-        return True
-
-    for reserved_resource in reserved_resources:
-        name = reserved_resource.get('name', None)
-        disk = reserved_resource.get('disk', None)
-
-        if name == 'disk' and disk is not None and 'persistence' in disk:
-            volumes.append(reserved_resource)
-
-    req_url = urljoin(master_url(), 'destroy-volumes')
-    data = {
-        'slaveId': agent_id,
-        'volumes': json.dumps(volumes)
-    }
-
-    success = False
-    try:
-        response = http.post(req_url, data=data)
-        success = 200 <= response.status_code < 300
-        if response.status_code == 409:
-            # thoughts on what to do here? throw exception
-            # i would rather not print
-            print('''###\nIs a framework using these resources still installed?\n###''')
-    except DCOSHTTPException as e:
-        print("HTTP {}: Unabled to delete volume based on: {}".format(
-            e.response.status_code,
-            e.response.text))
-
-    return success
+    return _print_failures(cleanup.destroy_volumes(role, agents=[agent]))
 
 
 def unreserve_resources(role):
     """ Unreserves all the resources for all the slaves for the role.
+
+        :return: what was unreserved, truthy if all resources were unreserved
+        :rtype: cleanup.CleanupReport
     """
-    state = dcos_agents_state()
-    if not state or 'slaves' not in state.keys():
-        return False
-    all_success = True
-    for agent in state['slaves']:
-        if not unreserve_resource(agent, role):
-            all_success = False
-    return all_success
+    return cleanup.unreserve_resources(role)
 
 
 def unreserve_resource(agent, role):
     """ Unreserves all the resources for the role on the agent.
     """
-    resources = []
-    agent_id = agent['id']
-
-    reserved_resources_full = agent.get('reserved_resources_full', None)
-    if not reserved_resources_full:
-        # doesn't exist
-        return True
-
-    reserved_resources = reserved_resources_full.get(role, None)
-    if not reserved_resources:
-        # doesn't exist
-        return True
-
-    for reserved_resource in reserved_resources:
-        resources.append(reserved_resource)
-
-    req_url = urljoin(master_url(), 'unreserve')
-    data = {
-        'slaveId': agent_id,
-        'resources': json.dumps(resources)
-    }
+    return _print_failures(cleanup.unreserve_resources(role, agents=[agent]))
 
-    success = False
-    try:
-        response = http.post(req_url, data=data)
-        success = 200 <= response.status_code < 300
-    except DCOSHTTPException as e:
-        print("HTTP {}: Unabled to unreserve resources based on: {}".format(
-            e.response.status_code,
-            e.response.text))
 
-    return success
+def _print_failures(report):
+    for failure in report.failures():
+        print(failure)
+    return bool(report)
 
 
 def service_available_predicate(service_name):
@@ -506,6 +425,105 @@ def wait_for_service_tasks_running(
     return wait_for_service_tasks_state(service_name, expected_task_count, ['TASK_RUNNING'], timeout_sec)
 
 
+class TaskReplacementTracker(object):
+    """ Follows the replacement of a service's tasks across polls.
+
+        The old task IDs are kept in a set and intersected with the current
+        ones on every poll, so each poll costs one pass over the current
+        tasks. The old tasks which are still present are computed afresh each
+        time: a poll which briefly returns no tasks, e.g. during a Marathon
+        failover, does not count them as replaced.
+
+        :param service_name: the service name
+        :type service_name: str
+        :param old_task_ids: original task ids as returned by get_service_task_ids
+        :type old_task_ids: [str]
+        :param task_predicate: filter to use when searching for tasks
+        :type task_predicate: func
+    """
+
+    def __init__(self, service_name, old_task_ids, task_predicate=None):
+        self.service_name = service_name
+        self.old_task_ids = frozenset(old_task_ids)
+        self.task_predicate = task_predicate
+        self.remaining_task_ids = self.old_task_ids
+        self.new_tasks = 0
+        self.started = time.monotonic()
+
+    @property
+    def replaced(self):
+        """ :return: number of old tasks which are gone
+            :rtype: int
+        """
+        return len(self.old_task_ids) - len(self.remaining_task_ids)
+
+    @property
+    def remaining(self):
+        """ :return: number of old tasks which are still present
+            :rtype: int
+        """
+        return len(self.remaining_task_ids)
+
+    @property
+    def rate(self):
+        """ :return: old tasks gone per second since the tracker was created
+            :rtype: float
+        """
+        elapsed = time.monotonic() - self.started
+        return self.replaced / elapsed if elapsed > 0 else 0.0
+
+    def update(self, task_ids=None):
+        """ Applies the current task IDs of the service.
+
+            :param task_ids: current task ids, fetched if None
+            :type task_ids: [str] | None
+
+            :return: False if the task IDs could not be fetched
+            :rtype: bool
+        """
+        if task_ids is None:
+            try:
+                task_ids = get_service_task_ids(self.service_name, self.task_predicate)
+            except DCOSHTTPException:
+                print('failed to get task ids for service {}'.format(self.service_name))
+                return False
+
+        current = set(task_ids)
+        self.remaining_task_ids = self.old_task_ids & current
+        self.new_tasks = len(current) - len(self.remaining_task_ids)
+        return True
+
+    def all_replaced(self):
+        """ Polls the service and returns whether ALL old tasks have been replaced with new tasks
+
+            :rtype: bool
+        """
+        if not self.update():
+            return False
+        print('waiting for all task ids in "{}" to change: {}'.format(self.service_name, self.progress()))
+        return not self.remaining_task_ids and self.new_tasks >= len(self.old_task_ids)
+
+    def any_missing(self):
+        """ Polls the service and returns whether any old task is no longer present
+
+            :rtype: bool
+        """
+        if not self.update():
+            return False
+        print('checking whether old tasks in "{}" are missing: {}'.format(self.service_name, self.progress()))
+        return bool(self.replaced)
+
+    def progress(self):
+        """ :return: replaced and remaining counts and the replacement rate
+            :rtype: str
+        """
+        message = '{}/{} replaced, {} remaining, {} new, {:.1f} tasks/s'.format(
+            self.replaced, len(self.old_task_ids), self.remaining, self.new_tasks, self.rate)
+        if 0 < self.remaining <= 10:
+            message += ', old tasks left: {}'.format(sorted(self.remaining_task_ids))
+        return message
+
+
 def tasks_all_replaced_predicate(
         service_name,
         old_task_ids,
@@ -523,20 +541,7 @@ def tasks_all_replaced_predicate(
         :return: True if none of old_task_ids are still present in the service
         :rtype: bool
     """
-    try:
-        task_ids = get_service_task_ids(service_name, task_predicate)
-    except DCOSHTTPException:
-        print('failed to get task ids for service {}'.format(service_name))
-        task_ids = []
-
-    print('waiting for all task ids in "{}" to change:\n- old tasks: {}\n- current tasks: {}'.format(
-        service_name, old_task_ids, task_ids))
-    for id in task_ids:
-        if id in old_task_ids:
-            return False  # old task still present
-    if len(task_ids) < len(old_task_ids):  # new tasks haven't fully replaced old tasks
-        return False
-    return True
+    return TaskReplacementTracker(service_name, old_task_ids, task_predicate).all_replaced()
 
 
 def tasks_missing_predicate(
@@ -556,18 +561,7 @@ def tasks_missing_predicate(
         :return: True if any of old_task_ids are no longer present in the service
         :rtype: bool
     """
-    try:
-        task_ids = get_service_task_ids(service_name, task_predicate)
-    except DCOSHTTPException:
-        print('failed to get task ids for service {}'.format(service_name))
-        task_ids = []
-
-    print('checking whether old tasks in "{}" are missing:\n- old tasks: {}\n- current tasks: {}'.format(
-        service_name, old_task_ids, task_ids))
-    for id in old_task_ids:
-        if id not in task_ids:
-            return True  # an old task was not present
-    return False
+    return TaskReplacementTracker(service_name, old_task_ids, task_predicate).any_missing()
 
 
 def wait_for_service_tasks_all_changed(
@@ -590,9 +584,8 @@ def wait_for_service_tasks_all_changed(
         :return: the duration waited in seconds
         :rtype: int
     """
-    return time_wait(
-        lambda: tasks_all_replaced_predicate(service_name, old_task_ids, task_predicate),
-        timeout_seconds=timeout_sec)
+    tracker = TaskReplacementTracker(service_name, old_task_ids, task_predicate)
+    return time_wait(lambda: tracker.all_replaced(), timeout_seconds=timeout_sec)
 
 
 def wait_for_service_tasks_all_unchanged(
@@ -615,11 +608,11 @@ def wait_for_service_tasks_all_unchanged(
         :return: the duration waited in seconds (the timeout value)
         :rtype: int
     """
+    tracker = TaskReplacementTracker(service_name, old_task_ids, task_predicate)
     try:
-        time_wait(
-            lambda: tasks_missing_predicate(service_name, old_task_ids, task_predicate),
-            timeout_seconds=timeout_sec)
+        time_wait(lambda: tracker.any_missing(), timeout_seconds=timeout_sec)
         # shouldn't have exited successfully: raise below
     except TimeoutExpired:
         return timeout_sec  # no changes occurred within timeout, as expected
-    raise DCOSException("One or more of the following tasks were no longer found: {}".format(old_task_ids))
+    raise DCOSException("One or more of the following tasks were no longer found: {}".format(
+        sorted(tracker.old_task_ids - tracker.remaining_task_ids)))
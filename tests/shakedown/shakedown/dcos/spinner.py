@@ -3,6 +3,8 @@ import time as time_module
 
 from inspect import currentframe, getargvalues, getsource, getouterframes
 
+from .. import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,12 +15,17 @@ def wait_for(
         ignore_exceptions=True,
         inverse_predicate=False,
         noisy=False,
-        required_consecutive_success_count=1):
+        required_consecutive_success_count=1,
+        wake_on=None):
     """ waits or spins for a predicate, returning the result.
         Predicate is a function that returns a truthy or falsy value.
         An exception in the function will be returned.
         A timeout will throw a TimeoutExpired Exception.
 
+        If `wake_on` is given the predicate is re-evaluated as soon as
+        `wake_on.wait(sleep_seconds)` returns, e.g. when a matching event
+        arrives, and polling every `sleep_seconds` is only a fallback.
+
     """
     count = 0
     start_time = time_module.time()
@@ -53,7 +60,23 @@ def wait_for(
                     count,
                     required_consecutive_success_count)
             print('{} spinning...'.format(header))
-        time_module.sleep(sleep_seconds)
+        _sleep(sleep_seconds, wake_on)
+
+
+def _sleep(seconds, wake_on=None):
+    """ Sleeps for `seconds` or until `wake_on` is signaled.
+
+        :param seconds: maximum time to sleep
+        :type seconds: float
+        :param wake_on: object with a `wait(timeout)` method such as a
+                        `threading.Event`
+        :type wake_on: object | None
+    """
+    metrics.WAIT_RETRIES.inc()
+    if wake_on is None:
+        time_module.sleep(seconds)
+    else:
+        wake_on.wait(seconds)
 
 
 def _stringify_predicate(predicate):
@@ -79,7 +102,8 @@ def time_wait(
         ignore_exceptions=True,
         inverse_predicate=False,
         noisy=True,
-        required_consecutive_success_count=1):
+        required_consecutive_success_count=1,
+        wake_on=None):
     """ waits or spins for a predicate and returns the time of the wait.
         An exception in the function will be returned.
         A timeout will throw a TimeoutExpired Exception.
@@ -87,7 +111,7 @@ def time_wait(
     """
     start = time_module.time()
     wait_for(predicate, timeout_seconds, sleep_seconds, ignore_exceptions, inverse_predicate, noisy,
-             required_consecutive_success_count)
+             required_consecutive_success_count, wake_on)
     return elapse_time(start)
 
 
@@ -95,7 +119,8 @@ def wait_while_exceptions(
         predicate,
         timeout_seconds=120,
         sleep_seconds=1,
-        noisy=False):
+        noisy=False,
+        wake_on=None):
     """ waits for a predicate, ignoring exceptions, returning the result.
         Predicate is a function.
         Exceptions will trigger the sleep and retry; any non-exception result
@@ -121,7 +146,7 @@ def wait_while_exceptions(
                 pretty_duration(timeout_seconds)
             )
             print('{} spinning...'.format(header))
-        time_module.sleep(sleep_seconds)
+        _sleep(sleep_seconds, wake_on)
 
 
 def elapse_time(start, end=None, precision=3):
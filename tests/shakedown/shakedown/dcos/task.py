@@ -17,8 +17,7 @@ def get_tasks(task_id='', completed=True):
         :rtype: []
     """
 
-    client = mesos.DCOSClient()
-    master = mesos.Master(client.get_master_state())
+    master = mesos.get_master()
     mesos_tasks = master.tasks(completed=completed, fltr=task_id)
     return [task.__dict__['_task'] for task in mesos_tasks]
 
@@ -1,5 +1,19 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
 from . import http
+from .. import util
 from ..clients import dcos_url
+from ..errors import DCOSException
+
+logger = logging.getLogger(__name__)
+
+# Number of Exhibitor requests sent at the same time by the tree functions.
+ZK_CONCURRENCY = int(os.environ.get('SHAKEDOWN_ZK_CONCURRENCY', 16))
 
 
 # API found via https://groups.google.com/forum/#!topic/exhibitor-users/HoTXQWmQ1bs
@@ -23,3 +37,184 @@ def delete_zk_node(node_name):
         return True
     else:
         return False
+
+
+def _zk_path(node_name):
+    return '/' + node_name.strip('/')
+
+
+def _fetch_zk_node(path, depth, data):
+    node = {
+        'path': path,
+        'depth': depth,
+        'children': [child['key'] for child in get_zk_node_children(path)]
+    }
+    if data:
+        # Exhibitor sends the bytes as space separated hex pairs.
+        node['data'] = get_zk_node_data(path).get('bytes', '').replace(' ', '')
+        node['size'] = len(node['data']) // 2
+    return node
+
+
+def walk_zk_tree(root, data=True, concurrency=ZK_CONCURRENCY):
+    """ Walks a tree breadth-first. The nodes of a level are fetched in
+        parallel, so only the paths of the next level are kept in memory.
+
+        :param root: path of the root node, e.g. /marathon/state
+        :type root: str
+        :param data: whether to fetch the data of the nodes too
+        :type data: bool
+        :param concurrency: maximum number of requests at the same time
+        :type concurrency: int
+        :return: the nodes level by level, in no order within a level, as
+                 {'path', 'depth', 'children'} and the hex 'data' and its
+                 byte 'size' if data is fetched
+        :rtype: iterator over dict
+    """
+    level = [_zk_path(root)]
+    depth = 0
+    while level:
+        children = []
+        for job, path in util.stream(lambda path: _fetch_zk_node(path, depth, data), level, concurrency):
+            node = job.result()
+            children.extend(node['children'])
+            yield node
+        level = children
+        depth += 1
+
+
+def snapshot_zk_tree(root, snapshot_path, concurrency=ZK_CONCURRENCY):
+    """ Writes a tree with its data to a gzipped file with one JSON node per
+        line, as it is walked. The file is replaced atomically.
+
+        :param root: path of the root node, e.g. /marathon/state
+        :type root: str
+        :param snapshot_path: path of the snapshot file
+        :type snapshot_path: str
+        :param concurrency: maximum number of requests at the same time
+        :type concurrency: int
+        :return: the number of nodes and the bytes of their data
+        :rtype: {'nodes': int, 'bytes': int}
+    """
+    summary = {'nodes': 0, 'bytes': 0}
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(snapshot_path)))
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as snapshot:
+            for node in walk_zk_tree(root, concurrency=concurrency):
+                line = {'path': node['path'], 'size': node['size'], 'children': len(node['children']),
+                        'data': node['data']}
+                snapshot.write(json.dumps(line, separators=(',', ':')) + '\n')
+                summary['nodes'] += 1
+                summary['bytes'] += node['size']
+        os.replace(temporary, snapshot_path)
+    except Exception:
+        os.remove(temporary)
+        raise
+
+    logger.info('Wrote %d nodes with %d bytes under %s to %s',
+                summary['nodes'], summary['bytes'], root, snapshot_path)
+    return summary
+
+
+def read_zk_snapshot(snapshot_path):
+    """ Reads the nodes of a snapshot, the root first.
+
+        :param snapshot_path: path of a file written by snapshot_zk_tree
+        :type snapshot_path: str
+        :return: the nodes as {'path', 'size', 'children', 'data'}
+        :rtype: iterator over dict
+    """
+    with gzip.open(snapshot_path, 'rt', encoding='utf-8') as snapshot:
+        for line in snapshot:
+            yield json.loads(line)
+
+
+def _index_zk_snapshot(snapshot_path):
+    root = None
+    nodes = {}
+    for node in read_zk_snapshot(snapshot_path):
+        if root is None:
+            root = node['path']
+        nodes[node['path']] = (node['size'], hashlib.sha1(node['data'].encode('ascii')).hexdigest())
+    return root, nodes
+
+
+def _subtree(root, path):
+    """ :return: the child of root the path is in, or root itself
+        :rtype: str
+    """
+    if path == root:
+        return root
+    relative = path[len(root):].lstrip('/')
+    return root.rstrip('/') + '/' + relative.split('/', 1)[0]
+
+
+def diff_zk_snapshots(before_path, after_path):
+    """ Compares two snapshots, e.g. of /marathon/state before and after an
+        upgrade.
+
+        :param before_path: path of the earlier snapshot
+        :type before_path: str
+        :param after_path: path of the later snapshot
+        :type after_path: str
+        :return: the node counts and data bytes of both, the bytes of each
+                 subtree under the root, and the added, removed and changed
+                 paths
+        :rtype: dict
+    """
+    root, before = _index_zk_snapshot(before_path)
+    _, after = _index_zk_snapshot(after_path)
+
+    subtrees = {}
+    for index, nodes in enumerate((before, after)):
+        for path, (size, _) in nodes.items():
+            subtrees.setdefault(_subtree(root, path), [0, 0])[index] += size
+
+    return {
+        'nodes': [len(before), len(after)],
+        'bytes': [sum(size for size, _ in before.values()), sum(size for size, _ in after.values())],
+        'subtrees': subtrees,
+        'added': sorted(after.keys() - before.keys()),
+        'removed': sorted(before.keys() - after.keys()),
+        'changed': sorted(path for path in before.keys() & after.keys() if before[path] != after[path])
+    }
+
+
+def delete_zk_tree(root, concurrency=ZK_CONCURRENCY):
+    """ Deletes a node and all its descendants. The levels are deleted from
+        the deepest up, the nodes of a level in parallel. If a node of a
+        level could not be deleted, the levels above it are kept.
+
+        Exhibitor deletes a whole subtree with a single `delete_zk_node`
+        call. Use this instead only to learn which nodes could not be deleted.
+
+        :param root: path of the root node
+        :type root: str
+        :param concurrency: maximum number of requests at the same time
+        :type concurrency: int
+        :return: whether all nodes were deleted
+        :rtype: bool
+    """
+    levels = []
+    for node in walk_zk_tree(root, data=False, concurrency=concurrency):
+        if node['depth'] == len(levels):
+            levels.append([])
+        levels[node['depth']].append(node['path'])
+
+    def delete(path):
+        try:
+            return delete_zk_node(path.lstrip('/'))
+        except DCOSException as e:
+            logger.warning('Unable to delete ZooKeeper node %s: %s', path, e)
+            return False
+
+    deleted = 0
+    for level in reversed(levels):
+        failed = [path for job, path in util.stream(delete, level, concurrency) if not job.result()]
+        deleted += len(level) - len(failed)
+        if failed:
+            logger.warning('Deleted %d nodes under %s, unable to delete %s', deleted, root, ', '.join(sorted(failed)))
+            return False
+
+    logger.info('Deleted %d nodes under %s', deleted, root)
+    return True
@@ -1,14 +1,19 @@
 import logging
-import requests
+import os
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
 
+import requests
+from dcos import config
+from requests.adapters import HTTPAdapter
 from requests.auth import AuthBase
-
+from requests.packages.urllib3.util.retry import Retry
 from six.moves.urllib.parse import urlparse
 
-from dcos import config
-from . import util
-from .clients.authentication import dcos_acs_token
+from . import metrics
 from .clients import dcos_url
+from .clients.authentication import dcos_acs_token, invalidate_dcos_acs_token
 from .errors import (DCOSAuthenticationException,
                      DCOSAuthorizationException, DCOSBadRequest,
                      DCOSConnectionError, DCOSException, DCOSHTTPException,
@@ -19,6 +24,16 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = 5
 
+# Number of keep-alive connections kept per host in a cluster session.
+DEFAULT_POOL_SIZE = int(os.environ.get('SHAKEDOWN_HTTP_POOL_SIZE', 10))
+
+# Number of times a request is retried when the connection could not be
+# established. Requests that reached the server are never retried.
+DEFAULT_CONNECT_RETRIES = int(os.environ.get('SHAKEDOWN_HTTP_CONNECT_RETRIES', 3))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
 
 def _default_is_success(status_code):
     """Returns true if the success status is between [200, 300).
@@ -84,7 +99,6 @@ def _verify_ssl(url, verify=None, toml_config=None):
     return False
 
 
-@util.duration
 def _request(method,
              url,
              is_success=_default_is_success,
@@ -124,14 +138,16 @@ def _request(method,
     if verify is not None:
         silence_requests_warnings()
 
-    logger.info(
-        'Sending HTTP [%r] to [%r]: %r',
-        method,
-        url,
-        kwargs.get('headers'))
+    # Header logging is formatted only if it is enabled. It used to run at
+    # INFO on every request and showed up in profiles.
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug('Sending HTTP [%r] to [%r]: %r', method, url, kwargs.get('headers'))
 
+    endpoint = metrics.endpoint_template(url)
+    start = time.perf_counter()
     try:
-        response = requests.request(
+        response = session(url).request(
             method=method,
             url=url,
             timeout=timeout,
@@ -139,22 +155,54 @@ def _request(method,
             verify=verify,
             **kwargs)
     except requests.exceptions.ConnectionError as e:
+        metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method.upper(), endpoint, 'error')
         logger.exception("HTTP Connection Error")
         raise DCOSConnectionError(url)
     except requests.exceptions.Timeout as e:
+        metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method.upper(), endpoint, 'timeout')
         logger.exception("HTTP Timeout")
         raise DCOSException('Request to URL [{0}] timed out.'.format(url))
     except requests.exceptions.RequestException as e:
+        metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method.upper(), endpoint, 'error')
         logger.exception("HTTP Exception")
         raise DCOSException('HTTP Exception: {}'.format(e))
 
-    logger.info('Received HTTP response [%r]: %r',
-                response.status_code,
-                response.headers)
+    _record_response(method.upper(), endpoint, response, time.perf_counter() - start, kwargs.get('stream', False))
+    if debug:
+        logger.debug('Received HTTP response [%r]: %r', response.status_code, response.headers)
 
     return response
 
 
+def _record_response(method, endpoint, response, seconds, stream):
+    """Records the latency, size and retries of a response.
+
+    :param method: HTTP method
+    :type method: str
+    :param endpoint: endpoint template of the URL
+    :type endpoint: str
+    :param response: the response
+    :type response: requests.Response
+    :param seconds: time until the response headers were received
+    :type seconds: float
+    :param stream: whether the body is streamed, it is not read then
+    :type stream: bool
+    """
+
+    metrics.HTTP_REQUEST_DURATION.observe(seconds, method, endpoint, str(response.status_code))
+
+    if stream:
+        size = int(response.headers.get('Content-Length', 0))
+    else:
+        size = len(response.content)
+    if size:
+        metrics.HTTP_RESPONSE_BYTES.inc(method, endpoint, amount=size)
+
+    retries = getattr(response.raw, 'retries', None)
+    if retries is not None and retries.history:
+        metrics.HTTP_RETRIES.inc(method, endpoint, amount=len(retries.history))
+
+
 def request(method,
             url,
             is_success=_default_is_success,
@@ -162,8 +210,8 @@ def request(method,
             verify=None,
             toml_config=None,  # TODO: delete me
             **kwargs):
-    """Sends an HTTP request. If the server responds with a 401, ask the
-    user for their credentials, and try request again (up to 3 times).
+    """Sends an HTTP request. If the cluster rejects the ACS token with a
+    401, log in again and retry the request once.
 
     :param method: method for the new Request object
     :type method: str
@@ -181,6 +229,7 @@ def request(method,
     :rtype: Response
     """
 
+    provided_token = not kwargs.get('auth_token')
     auth_token = kwargs.get('auth_token') or dcos_acs_token()
 
     # only request with DC/OS Auth if request is to DC/OS cluster
@@ -193,6 +242,16 @@ def request(method,
                         auth=auth, verify=verify, toml_config=toml_config,
                         **kwargs)
 
+    # A token may be revoked before it expires, e.g. a persisted token of a
+    # cluster which was set up again.
+    if response.status_code == 401 and provided_token and auth is not None:
+        logger.warning('The ACS token was rejected by %s, logging in again.', url)
+        invalidate_dcos_acs_token(auth_token)
+        auth_token = dcos_acs_token()
+        response = _request(method, url, is_success, timeout,
+                            auth=DCOSAcsAuth(auth_token), verify=verify, toml_config=toml_config,
+                            **kwargs)
+
     if is_success(response.status_code):
         return response
     elif response.status_code == 401:
@@ -304,6 +363,110 @@ def delete(url, **kwargs):
     return request('delete', url, **kwargs)
 
 
+def _session_key(url):
+    """Returns the key of the pooled session serving `url`.
+
+    :param url: URL of the request
+    :type url: str
+    :returns: scheme and network location of the URL
+    :rtype: (str, str)
+    """
+
+    parsed_url = urlparse(url)
+    return parsed_url.scheme, parsed_url.netloc
+
+
+def _create_session(pool_size=DEFAULT_POOL_SIZE,
+                    connect_retries=DEFAULT_CONNECT_RETRIES):
+    """Creates a session with a keep-alive connection pool and a retry
+    adapter for connection errors.
+
+    :param pool_size: number of connections kept alive per host
+    :type pool_size: int
+    :param connect_retries: number of retries on connection errors
+    :type connect_retries: int
+    :rtype: requests.Session
+    """
+
+    retries = Retry(total=connect_retries,
+                    connect=connect_retries,
+                    read=0,
+                    backoff_factor=0.1)
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retries)
+
+    s = requests.Session()
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+
+    # Sessions are shared between threads and calls. Never persist cookies so
+    # that calls stay as independent as they were with `requests.request`.
+    s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return s
+
+
+def session(url):
+    """Returns the pooled session for the cluster serving `url`.
+
+    One session is kept per scheme and host so that consecutive calls to the
+    same cluster reuse established TCP and TLS connections. Sessions are
+    created lazily and are safe to share between threads.
+
+    :param url: URL of the request
+    :type url: str
+    :rtype: requests.Session
+    """
+
+    key = _session_key(url)
+    s = _sessions.get(key)
+    if s is None:
+        with _sessions_lock:
+            s = _sessions.get(key)
+            if s is None:
+                s = _create_session()
+                _sessions[key] = s
+    return s
+
+
+def close_sessions():
+    """Closes all pooled sessions and their connections."""
+
+    with _sessions_lock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
+
+
+def pool_stats():
+    """Returns connection pool hit and miss counters summed over all pooled
+    sessions.
+
+    A hit is a request sent over an already established connection, a miss is
+    a request that had to open a new connection.
+
+    :returns: {'hits': int, 'misses': int, 'requests': int}
+    :rtype: dict
+    """
+
+    connections = 0
+    requests_sent = 0
+    with _sessions_lock:
+        adapters = {id(a): a for s in _sessions.values() for a in s.adapters.values()}
+
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+
+    return {'hits': max(requests_sent - connections, 0),
+            'misses': connections,
+            'requests': requests_sent}
+
+
 def silence_requests_warnings():
     """Silence warnings from requests.packages.urllib3.  See DCOS-1007."""
     requests.packages.urllib3.disable_warnings()
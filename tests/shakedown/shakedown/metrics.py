@@ -0,0 +1,355 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Shakedown records the latency of its HTTP requests and SSH commands, the
+bytes they transferred and the number of retries into the default
+registry. The metrics can be exported to a file, e.g. for the node
+exporter's textfile collector, or served on a local `/metrics` endpoint::
+
+    metrics.write_textfile('shakedown.prom')
+    metrics.start_http_server(9102)
+
+If SHAKEDOWN_METRICS_FILE is set, the metrics are written to that file when
+the process exits.
+"""
+import atexit
+import bisect
+import logging
+import os
+import re
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Path segments after which the IDs of apps, pods and groups follow. These
+# IDs may span several segments.
+_ID_COLLECTIONS = frozenset(['apps', 'pods', 'groups'])
+
+# Path segments which end such an ID.
+_ID_SUFFIXES = frozenset(['tasks', 'versions', 'restart', '::status', '::instances'])
+
+_VARIABLE_SEGMENT = re.compile(r'.*\d.*|[0-9a-fA-F-]{16,}')
+
+_VERSION_SEGMENT = re.compile(r'v\d+')
+
+
+def endpoint_template(url):
+    """Reduces a URL to a path template with a bounded number of values,
+    e.g. `https://cluster/service/marathon/v2/apps/foo/bar/tasks?embed=x`
+    becomes `/service/marathon/v2/apps/{id}/tasks`.
+
+    :param url: the request URL
+    :type url: str
+    :returns: the path with IDs replaced by `{id}`
+    :rtype: str
+    """
+
+    path = url.split('?', 1)[0]
+    if '://' in path:
+        path = '/' + path.split('://', 1)[1].partition('/')[2]
+
+    segments = []
+    in_id = False
+    for segment in path.split('/')[1:]:
+        if in_id and segment not in _ID_SUFFIXES:
+            variable = True
+        else:
+            in_id = False
+            variable = bool(_VARIABLE_SEGMENT.fullmatch(segment)) and not _VERSION_SEGMENT.fullmatch(segment)
+        if variable:
+            if not segments or segments[-1] != '{id}':
+                segments.append('{id}')
+        else:
+            segments.append(segment)
+        if segment in _ID_COLLECTIONS:
+            in_id = True
+    return '/' + '/'.join(segments)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value)) for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(object):
+    """Base class of metrics with a value per combination of label values.
+
+    :param name: metric name
+    :type name: str
+    :param documentation: help text
+    :type documentation: str
+    :param labelnames: names of the labels
+    :type labelnames: (str)
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError('{} expects labels {}, got {}'.format(self.name, self.labelnames, labels))
+        return tuple(str(label) for label in labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def exposition(self):
+        """:returns: the metric in the text exposition format
+           :rtype: str
+        """
+
+        lines = ['# HELP {} {}'.format(self.name, self.documentation.replace('\n', ' ')),
+                 '# TYPE {} {}'.format(self.name, self.kind)]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._samples(labels, value))
+        return '\n'.join(lines) + '\n'
+
+    def _samples(self, labels, value):
+        raise NotImplementedError()
+
+
+class Counter(_Metric):
+    """A value which only goes up."""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        """Increments the counter of the label values.
+
+        :param labels: the label values in the order of `labelnames`
+        :type labels: str
+        :param amount: the increment
+        :type amount: float
+        """
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, labels, value):
+        return ['{}_total{} {}'.format(self.name, _format_labels(self.labelnames, labels), _format_value(value))]
+
+
+class Histogram(_Metric):
+    """Counts observations in cumulative buckets.
+
+    :param buckets: upper bounds of the buckets, +Inf is added
+    :type buckets: (float)
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        """Records an observation.
+
+        :param value: the observed value, e.g. seconds
+        :type value: float
+        :param labels: the label values in the order of `labelnames`
+        :type labels: str
+        """
+
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per bucket counts, sum and count.
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _samples(self, labels, value):
+        counts, total, count = value
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append('{}_bucket{} {}'.format(
+                self.name, _format_labels(self.labelnames, labels, ('le', _format_value(float(bound)))), cumulative))
+        samples.append('{}_sum{} {}'.format(self.name, _format_labels(self.labelnames, labels), repr(total)))
+        samples.append('{}_count{} {}'.format(self.name, _format_labels(self.labelnames, labels), count))
+        return samples
+
+
+class Registry(object):
+    """A set of metrics, exported together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError('Metric {} is already registered differently'.format(name))
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """:returns: the counter `name`, created on first use
+           :rtype: Counter
+        """
+
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """:returns: the histogram `name`, created on first use
+           :rtype: Histogram
+        """
+
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def clear(self):
+        """Resets the values of all metrics."""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def exposition(self):
+        """:returns: all metrics in the text exposition format
+           :rtype: str
+        """
+
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return ''.join(metric.exposition() for _, metric in metrics)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'shakedown_http_request_duration_seconds', 'Latency of HTTP requests.', ('method', 'endpoint', 'status'))
+HTTP_RESPONSE_BYTES = REGISTRY.counter(
+    'shakedown_http_response_bytes', 'Bytes of HTTP response bodies.', ('method', 'endpoint'))
+HTTP_RETRIES = REGISTRY.counter(
+    'shakedown_http_retries', 'Connection attempts of HTTP requests which were retried.', ('method', 'endpoint'))
+SSH_COMMAND_DURATION = REGISTRY.histogram(
+    'shakedown_ssh_command_duration_seconds', 'Latency of commands run over SSH.', ('status',))
+SSH_RECEIVED_BYTES = REGISTRY.counter(
+    'shakedown_ssh_received_bytes', 'Bytes of output received from commands run over SSH.')
+SCP_BYTES = REGISTRY.counter(
+    'shakedown_scp_bytes', 'Bytes copied with SCP.', ('action',))
+WAIT_RETRIES = REGISTRY.counter(
+    'shakedown_wait_retries', 'Evaluations of a waited for predicate which were not successful yet.')
+FUNCTION_DURATION = REGISTRY.histogram(
+    'shakedown_function_duration_seconds', 'Latency of functions decorated with util.duration.', ('function',))
+
+
+def exposition():
+    """:returns: the metrics of the default registry in the text exposition format
+       :rtype: str
+    """
+
+    return REGISTRY.exposition()
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Writes the metrics to a file. The file is replaced atomically, so a
+    collector never reads a partial file.
+
+    :param path: path of the file
+    :type path: str
+    :param registry: the metrics to write
+    :type registry: Registry
+    """
+
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'w') as f:
+        f.write(registry.exposition())
+    os.replace(temporary, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.exposition().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_http_server(port=0, addr='127.0.0.1', registry=REGISTRY):
+    """Serves the metrics on `/metrics` from a daemon thread.
+
+    :param port: port to listen on, a free one if 0
+    :type port: int
+    :param addr: address to listen on
+    :type addr: str
+    :param registry: the metrics to serve
+    :type registry: Registry
+    :returns: the server, its `server_port` is the port listened on
+    :rtype: http.server.HTTPServer
+    """
+
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = _ThreadingHTTPServer((addr, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name='shakedown-metrics')
+    thread.daemon = True
+    thread.start()
+    logger.info('Serving metrics on http://%s:%d/metrics', addr, server.server_port)
+    return server
+
+
+if os.environ.get('SHAKEDOWN_METRICS_FILE'):
+    atexit.register(write_textfile, os.environ['SHAKEDOWN_METRICS_FILE'])
@@ -16,9 +16,10 @@ import time
 
 import jsonschema
 import six
+from dcos import constants
 from six.moves import urllib
 
-from dcos import constants
+from . import metrics
 from .errors import DCOSException
 
 
@@ -574,7 +575,8 @@ def is_windows_platform():
 
 
 def duration(fn):
-    """ Decorator to log the duration of a function.
+    """ Decorator to record the duration of a function in the
+    `shakedown_function_duration_seconds` metric and log it at debug level.
 
     :param fn: function to measure
     :type fn: function
@@ -582,16 +584,17 @@ def duration(fn):
     :rtype: function
     """
 
+    name = '{0}.{1}'.format(fn.__module__, fn.__name__)
+
     @functools.wraps(fn)
     def timer(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter()
         try:
             return fn(*args, **kwargs)
         finally:
-            logger.debug("duration: {0}.{1}: {2:2.2f}s".format(
-                fn.__module__,
-                fn.__name__,
-                time.time() - start))
+            elapsed = time.perf_counter() - start
+            metrics.FUNCTION_DURATION.observe(elapsed, name)
+            logger.debug("duration: %s: %2.2fs", name, elapsed)
 
     return timer
 
@@ -661,7 +664,7 @@ def io_exception(path, errno):
 STREAM_CONCURRENCY = 20
 
 
-def stream(fn, objs):
+def stream(fn, objs, concurrency=STREAM_CONCURRENCY):
     """Apply `fn` to `objs` in parallel, yielding the (Future, obj) for
     each as it completes.
 
@@ -669,12 +672,14 @@ def stream(fn, objs):
     :type fn: function
     :param objs: objs
     :type objs: objs
+    :param concurrency: maximum number of calls of `fn` at the same time
+    :type concurrency: int
     :returns: iterator over (Future, typeof(obj))
     :rtype: iterator over (Future, typeof(obj))
 
     """
 
-    with concurrent.futures.ThreadPoolExecutor(STREAM_CONCURRENCY) as pool:
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
         jobs = {pool.submit(fn, obj): obj for obj in objs}
         for job in concurrent.futures.as_completed(jobs):
             yield job, jobs[job]
@@ -0,0 +1,79 @@
+"""Benchmark of resolving the sandbox directories of many tasks.
+
+Every task's directory comes from the state.json of its agent. A fake client
+serves the agent states after a fixed latency. The benchmark compares
+fetching the states one agent after the other, as `Slave.state()` does on
+first use, with `Master.prefetch_agent_states` at several concurrency levels.
+
+Usage: python tests/benchmark/agent_state_benchmark.py [latency in ms]
+"""
+import sys
+import time
+
+from shakedown.clients import mesos
+
+AGENTS = 80
+TASKS = 500
+CONCURRENCIES = [8, 16, 32]
+
+
+def _master_state():
+    agents = [{'id': 'agent-{}'.format(i), 'pid': 'slave(1)@10.0.{}.{}:5051'.format(i // 250, i % 250)}
+              for i in range(AGENTS)]
+    tasks = [{'id': 'app.{}'.format(i), 'name': 'app', 'state': 'TASK_RUNNING', 'framework_id': 'marathon-id',
+              'slave_id': agents[i % AGENTS]['id']} for i in range(TASKS)]
+    return {'slaves': agents,
+            'frameworks': [{'id': 'marathon-id', 'name': 'marathon', 'active': True, 'tasks': tasks,
+                            'completed_tasks': []}],
+            'completed_frameworks': []}
+
+
+class LatencyAgentClient(object):
+    """Stands in for DCOSClient, answering each agent state after `latency` seconds."""
+
+    def __init__(self, state, latency):
+        self.latency = latency
+        self.tasks_by_agent = {}
+        for task in state['frameworks'][0]['tasks']:
+            self.tasks_by_agent.setdefault(task['slave_id'], []).append(task)
+
+    def get_slave_state(self, slave_id, private_url, timeout=None):
+        time.sleep(self.latency)
+        executors = [{'id': task['id'], 'directory': '/var/lib/mesos/slave/' + task['id'],
+                      'tasks': [task], 'completed_tasks': [], 'queued_tasks': []}
+                     for task in self.tasks_by_agent.get(slave_id, [])]
+        return {'frameworks': [{'executors': executors, 'completed_executors': []}], 'completed_frameworks': []}
+
+
+def sequential(master, client):
+    """What Task.directory() did for each task: fetch agent states one by one."""
+
+    for slave in master.slaves():
+        slave._state = client.get_slave_state(slave['id'], slave.http_url())
+
+
+def _measure(name, prefetch, latency):
+    state = _master_state()
+    master = mesos.Master(state)
+    client = LatencyAgentClient(state, latency)
+    start = time.perf_counter()
+    prefetch(master, client)
+    directories = [task.directory() for task in master.tasks()]
+    elapsed = time.perf_counter() - start
+    assert len(directories) == TASKS
+    print('{:<24} {:>10.2f}'.format(name, elapsed))
+
+
+def main():
+    latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.1
+    print('{} tasks on {} agents, {:.0f} ms per agent state'.format(TASKS, AGENTS, latency * 1000))
+    print('{:<24} {:>10}'.format('fetch', 'seconds'))
+    _measure('sequential', sequential, latency)
+    for concurrency in CONCURRENCIES:
+        _measure('prefetch x{}'.format(concurrency),
+                 lambda master, client: master.prefetch_agent_states(concurrency=concurrency, dcos_client=client),
+                 latency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark of task lookups in the Marathon client.
+
+Builds a `v2/tasks` response with TASKS_PER_APP tasks for each app of the
+`155_1000.json` group fixture of the Marathon benchmarks and compares looking
+up the tasks of one app and a single task through the full task list, as the
+client used to, with the per-app endpoint and the cached task index.
+
+Responses are served from memory, so the numbers show the client side cost of
+parsing and filtering but not the transfer time.
+
+Usage: python tests/benchmark/marathon_tasks_benchmark.py
+"""
+import json
+import os
+import time
+import uuid
+
+import requests
+
+from shakedown import http
+from shakedown.clients import marathon, rpcclient
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       '../../../../benchmark/src/main/resources/mocks/json/real/155_1000.json')
+TASKS_PER_APP = 20
+LOOKUPS = 50
+
+
+def _apps(group):
+    yield from group['apps']
+    for subgroup in group['groups']:
+        yield from _apps(subgroup)
+
+
+def _responses():
+    with open(FIXTURE) as f:
+        apps = [app['id'] for app in _apps(json.load(f))]
+
+    tasks = [{'id': '{}.instance-{}._app.1'.format(app_id.strip('/').replace('/', '_'), uuid.uuid4()),
+              'appId': app_id, 'host': '10.0.0.1', 'ports': [31000], 'state': 'TASK_RUNNING',
+              'startedAt': '2017-12-04T03:57:49.198Z', 'version': '2017-12-04T03:57:49.198Z'}
+             for app_id in apps for _ in range(TASKS_PER_APP)]
+    responses = {'v2/tasks': json.dumps({'tasks': tasks}).encode('utf-8')}
+    for app_id in apps:
+        app_tasks = [task for task in tasks if task['appId'] == app_id]
+        responses['v2/apps{}/tasks'.format(app_id)] = json.dumps({'tasks': app_tasks}).encode('utf-8')
+    return apps, tasks, responses
+
+
+def _serve(responses, served):
+    def get(url, **kwargs):
+        path = url.split('/', 3)[3]
+        response = requests.Response()
+        response.status_code = 200
+        response._content = responses[path]
+        served.append(len(response._content))
+        return response
+    http.get = get
+
+
+def _measure(name, lookup, keys, served):
+    del served[:]
+    start = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    elapsed = time.perf_counter() - start
+    print('{:<40} {:>10.2f} {:>14.0f}'.format(name, elapsed / len(keys) * 1000, sum(served) / len(keys)))
+
+
+def main():
+    apps, tasks, responses = _responses()
+    served = []
+    _serve(responses, served)
+    client = marathon.Client(rpcclient.create_client('http://marathon.example.com/', 5, auth_token='token'))
+
+    app_ids = [apps[i * len(apps) // LOOKUPS] for i in range(LOOKUPS)]
+    task_ids = [tasks[i * len(tasks) // LOOKUPS]['id'] for i in range(LOOKUPS)]
+
+    def tasks_of_app_from_full_list(app_id):
+        return [task for task in client.get_tasks(max_age=0) if task['appId'] == app_id]
+
+    def task_from_full_list(task_id):
+        return next(task for task in client.get_tasks(max_age=0) if task['id'] == task_id)
+
+    print('{} apps, {} tasks'.format(len(apps), len(tasks)))
+    print('{:<40} {:>10} {:>14}'.format('lookup', 'ms/lookup', 'bytes/lookup'))
+    _measure('tasks of app via v2/tasks', tasks_of_app_from_full_list, app_ids, served)
+    _measure('tasks of app via v2/apps/{id}/tasks', client.get_tasks, app_ids, served)
+    _measure('task via v2/tasks', task_from_full_list, task_ids, served)
+    _measure('task via v2/apps/{id}/tasks', client.get_task, task_ids, served)
+    client.invalidate_tasks_cache()
+    _measure('task via cached index', lambda task_id: client._all_tasks(60).tasks_by_id[task_id], task_ids, served)
+
+
+if __name__ == '__main__':
+    main()
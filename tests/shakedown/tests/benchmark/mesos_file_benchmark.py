@@ -0,0 +1,110 @@
+"""Benchmark of reading a sandbox file through files/read.json.
+
+Serves a generated log file from a local fake `files/read.json` endpoint
+which, like Mesos, returns at most 16 pages per call and optionally adds a
+latency to every call. It compares the former sequential read loop with
+`MesosFile.read` at several concurrency levels.
+
+Usage: python tests/benchmark/mesos_file_benchmark.py [latency in ms]
+"""
+import json
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+from shakedown import http
+from shakedown.clients import mesos
+
+FILE_SIZE = 64 * 1024 * 1024
+PAGE_LIMIT = 16 * 4096
+CONCURRENCIES = [1, 4, 8, 16]
+
+CONTENT = ''.join('{:>10} INFO some log line of a task running on the cluster\n'.format(i)
+                  for i in range(FILE_SIZE // 64))
+
+
+class FilesReadHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        offset, length = int(params['offset']), int(params['length'])
+        if offset == -1:
+            body = {'data': '', 'offset': len(CONTENT)}
+        else:
+            length = PAGE_LIMIT if length == -1 else min(length, PAGE_LIMIT)
+            body = {'data': CONTENT[offset:offset + length], 'offset': offset}
+        payload = json.dumps(body).encode('utf-8')
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LocalFilesClient(object):
+    """Stands in for DCOSClient, reading files from the local server."""
+
+    def __init__(self, url):
+        self._url = url
+
+    def master_file_read(self, path, length, offset):
+        params = {'path': path, 'length': length, 'offset': offset}
+        return http.session(self._url).get(self._url, params=params).json()
+
+
+def sequential_read(client, path):
+    """The read loop MesosFile used before: one chunk after the other."""
+
+    data = ''
+    offset = 0
+    while True:
+        chunk = client.master_file_read(path, -1, offset)['data']
+        if chunk == '':
+            break
+        data += chunk
+        offset += len(chunk)
+    return data
+
+
+def _measure(name, read):
+    start = time.perf_counter()
+    data = read()
+    elapsed = time.perf_counter() - start
+    assert len(data) == len(CONTENT)
+    print('{:<24} {:>10.2f} {:>10.1f}'.format(name, elapsed, len(data) / elapsed / (1 << 20)))
+
+
+def main():
+    FilesReadHandler.latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FilesReadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = LocalFilesClient('http://127.0.0.1:{}/files/read.json'.format(server.server_port))
+
+    print('{} MB file, {:.0f} ms latency per call'.format(FILE_SIZE >> 20, FilesReadHandler.latency * 1000))
+    print('{:<24} {:>10} {:>10}'.format('reader', 'seconds', 'MB/s'))
+    try:
+        _measure('sequential', lambda: sequential_read(client, '/stdout'))
+        for concurrency in CONCURRENCIES:
+            mesos_file = mesos.MesosFile('/stdout', dcos_client=client, concurrency=concurrency)
+            _measure('MesosFile x{}'.format(concurrency), mesos_file.read)
+    finally:
+        http.close_sessions()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
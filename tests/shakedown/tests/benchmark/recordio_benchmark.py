@@ -0,0 +1,48 @@
+"""Micro-benchmark for the RecordIO decoder.
+
+Feeds a stream of records through `recordio.Decoder` in chunks the size of
+those returned by `requests.Response.iter_content` and reports the decoding
+throughput for several record sizes.
+
+Usage: python tests/benchmark/recordio_benchmark.py
+"""
+import time
+
+from shakedown.clients import recordio
+
+RECORD_SIZES = [1024, 64 * 1024, 4 * 1024 * 1024]
+STREAM_SIZE = 64 * 1024 * 1024
+CHUNK_SIZE = 16 * 1024
+ROUNDS = 3
+
+
+def _stream(record_size):
+    encoder = recordio.Encoder(lambda s: s)
+    record = encoder.encode(b'x' * record_size)
+    count = max(STREAM_SIZE // len(record), 1)
+    return record * count, count
+
+
+def _decode(data):
+    decoder = recordio.Decoder(lambda s: s)
+    records = 0
+    for offset in range(0, len(data), CHUNK_SIZE):
+        records += len(decoder.decode(data[offset:offset + CHUNK_SIZE]))
+    return records
+
+
+def main():
+    print('{:>10} {:>10} {:>10}'.format('record', 'records', 'MB/s'))
+    for record_size in RECORD_SIZES:
+        data, count = _stream(record_size)
+        best = None
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            assert _decode(data) == count
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print('{:>10} {:>10} {:>10.1f}'.format(record_size, count, len(data) / best / (1 << 20)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+# aiohttp is the optional `async` extra of shakedown.
+web = pytest.importorskip('aiohttp.web')
+
+from shakedown.clients import asyncmarathon  # NOQA E402
+from shakedown.errors import DCOSException  # NOQA E402
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+@pytest.fixture
+def marathon():
+    apps = {}
+    concurrent = {'now': 0, 'max': 0}
+
+    async def add_app(request):
+        app = await request.json()
+        concurrent['now'] += 1
+        concurrent['max'] = max(concurrent['max'], concurrent['now'])
+        await asyncio.sleep(0.01)
+        concurrent['now'] -= 1
+        if app['id'] in apps:
+            return web.json_response({'message': 'An app with id [{}] already exists.'.format(app['id'])},
+                                     status=409)
+        apps[app['id']] = app
+        return web.json_response({'deployments': [{'id': 'deployment-' + app['id'].strip('/')}]}, status=201)
+
+    async def app_tasks(request):
+        app_id = '/' + request.match_info['app_id']
+        if app_id not in apps:
+            return web.json_response({'message': 'App not found'}, status=404)
+        return web.json_response({'tasks': [{'id': 'task', 'appId': app_id}]})
+
+    async def add_pod(request):
+        return web.json_response({}, status=201, headers={'Marathon-Deployment-Id': 'pod-deployment'})
+
+    app = web.Application()
+    app.router.add_post('/v2/apps', add_app)
+    app.router.add_get('/v2/apps/{app_id:.*}/tasks', app_tasks)
+    app.router.add_post('/v2/pods', add_pod)
+
+    runner = web.AppRunner(app)
+    run(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    run(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+
+    rpc_client = asyncmarathon.AsyncRpcClient('http://127.0.0.1:{}/'.format(port), auth_token='token')
+    client = asyncmarathon.AsyncClient(rpc_client)
+    yield client, concurrent
+    run(client.close())
+    run(runner.cleanup())
+
+
+def test_add_apps_concurrently(marathon):
+    client, concurrent = marathon
+
+    async def add_apps():
+        return await asyncio.gather(*[client.add_app({'id': '/app-{}'.format(i)}) for i in range(20)])
+
+    deployments = run(add_apps())
+
+    assert deployments == ['deployment-app-{}'.format(i) for i in range(20)]
+    assert concurrent['max'] > 1
+
+
+def test_errors_are_mapped_like_the_sync_client(marathon):
+    client, _ = marathon
+    run(client.add_app({'id': '/app'}))
+
+    with pytest.raises(DCOSException) as e:
+        run(client.add_app({'id': '/app'}))
+    assert str(e.value) == 'Changes blocked: deployment already in progress for app.'
+
+
+def test_get_tasks_of_unknown_app(marathon):
+    client, _ = marathon
+    run(client.add_app({'id': '/app'}))
+
+    assert run(client.get_tasks('app')) == [{'id': 'task', 'appId': '/app'}]
+    assert run(client.get_tasks('unknown')) == []
+
+
+def test_add_pod_returns_deployment_header(marathon):
+    client, _ = marathon
+
+    assert run(client.add_pod({'id': '/pod'})) == 'pod-deployment'
@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+# aiohttp is the optional `async` extra of shakedown.
+web = pytest.importorskip('aiohttp.web')
+
+from shakedown.clients import asynctaskio, recordio  # NOQA E402
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def _output(stream, data):
+    return {'type': 'DATA', 'data': {'type': stream, 'data': base64.b64encode(data).decode('utf-8')}}
+
+
+@pytest.fixture
+def agent():
+    """Serves the nested container session calls of a Mesos agent.
+
+    A launched session echoes its command and the stdin it receives, and
+    ends once stdin reached EOF or immediately for non-interactive sessions.
+    """
+
+    encoder = recordio.Encoder(lambda s: json.dumps(s).encode('utf-8'))
+    state = {'inputs': [], 'sessions': 0, 'max_sessions': 0}
+    stdin_done = {}
+
+    async def handle(request):
+        if request.headers['Content-Type'] == 'application/recordio':
+            decoder = recordio.Decoder(lambda s: json.loads(s.decode('utf-8')))
+            async for chunk in request.content.iter_any():
+                for message in decoder.decode(chunk):
+                    state['inputs'].append(message)
+                    container = message['attach_container_input'].get('container_id')
+                    io = message['attach_container_input'].get('process_io', {})
+                    if container is not None:
+                        stdin_done.setdefault(container['value'], asyncio.Event())
+                    elif io.get('type') == 'DATA' and io['data']['data'] == '':
+                        for done in stdin_done.values():
+                            done.set()
+            return web.json_response({})
+
+        message = await request.json()
+        session = message['launch_nested_container_session']
+        command = session['command']
+        state['sessions'] += 1
+        state['max_sessions'] = max(state['max_sessions'], state['sessions'])
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/recordio'})
+        await response.prepare(request)
+        # One record split over two chunks, then two records in one chunk.
+        record = encoder.encode(_output('STDOUT', ' '.join(command['arguments']).encode()))
+        await response.write(record[:5])
+        await asyncio.sleep(0.01)
+        await response.write(record[5:] + encoder.encode(_output('STDERR', b'warning\n')) +
+                             encoder.encode({'type': 'CONTROL'}))
+        if request.query.get('interactive'):
+            done = stdin_done.setdefault(session['container_id']['value'], asyncio.Event())
+            await asyncio.wait_for(done.wait(), 5)
+            stdin = b''.join(base64.b64decode(m['attach_container_input']['process_io']['data']['data'])
+                             for m in state['inputs']
+                             if m['attach_container_input'].get('process_io', {}).get('type') == 'DATA')
+            await response.write(encoder.encode(_output('STDOUT', stdin)))
+        state['sessions'] -= 1
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post('/api/v1', handle)
+    runner = web.AppRunner(app)
+    run(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    run(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+
+    yield 'http://127.0.0.1:{}/api/v1'.format(port), state
+    run(runner.cleanup())
+
+
+def test_exec_many(agent, monkeypatch):
+    agent_url, state = agent
+    monkeypatch.setattr(asynctaskio, 'task_container_target',
+                        lambda task_id: (agent_url, {'value': task_id + '-container'}))
+
+    task_ids = ['task-{}'.format(i) for i in range(20)]
+    outputs = run(asynctaskio.exec_many(task_ids, 'cat', ['/etc/hosts'], concurrency=8, auth_token='token'))
+
+    assert outputs == {task_id: asynctaskio.ExecOutput(b'cat /etc/hosts', b'warning\n', None) for task_id in task_ids}
+    assert 1 < state['max_sessions'] <= 8
+
+
+def test_interactive_session_streams_stdin_and_heartbeats(agent, monkeypatch):
+    agent_url, state = agent
+    monkeypatch.setattr(asynctaskio.AsyncTaskIO, 'HEARTBEAT_INTERVAL', 0.01)
+
+    async def session():
+        stdin = asyncio.StreamReader()
+        stdin.feed_data(b'hello ')
+        stdin.feed_data(b'world')
+        stdin.feed_eof()
+        stdout = asynctaskio._Capture()
+        task_io = asynctaskio.AsyncTaskIO(agent_url + '?interactive=1', {'value': 'parent'}, 'cat',
+                                          interactive=True, stdin=stdin, stdout=stdout,
+                                          stderr=asynctaskio._Capture(), auth_token='token')
+        await task_io.run()
+        return stdout.getvalue()
+
+    assert run(session()) == b'cat' + b'hello world'
+
+    types = [m['attach_container_input']['type'] for m in state['inputs']]
+    assert types[:2] == ['CONTAINER_ID', 'CONTAINER_ID']
+    controls = [m['attach_container_input']['process_io']['control']['type'] for m in state['inputs']
+                if m['attach_container_input'].get('process_io', {}).get('type') == 'CONTROL']
+    assert controls and set(controls) == {'HEARTBEAT'}
+
+
+def test_interactive_session_ends_with_output_while_stdin_is_open(agent, monkeypatch):
+    agent_url, state = agent
+    monkeypatch.setattr(asynctaskio.AsyncTaskIO, 'HEARTBEAT_INTERVAL', 0.01)
+
+    async def session():
+        stdin = asyncio.StreamReader()
+        stdin.feed_data(b'hello')
+        stdout = asynctaskio._Capture()
+        task_io = asynctaskio.AsyncTaskIO(agent_url, {'value': 'parent'}, 'cat',
+                                          interactive=True, stdin=stdin, stdout=stdout,
+                                          stderr=asynctaskio._Capture(), auth_token='token')
+        await asyncio.wait_for(task_io.run(), 5)
+        return stdout.getvalue()
+
+    assert run(session()) == b'cat'
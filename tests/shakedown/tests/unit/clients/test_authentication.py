@@ -0,0 +1,165 @@
+import base64
+import json
+import os
+import stat
+import threading
+import time
+
+from shakedown.clients import authentication
+from shakedown.clients.authentication import TokenProvider
+
+
+def jwt(expiry, subject='test'):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('utf-8').rstrip('=')
+    return '.'.join([encode({'alg': 'RS256', 'typ': 'JWT'}), encode({'uid': subject, 'exp': expiry}), 'signature'])
+
+
+class Login(object):
+
+    def __init__(self, lifetime, delay=0):
+        self.lifetime = lifetime
+        self.delay = delay
+        self.calls = 0
+        self.current_tokens = []
+
+    def __call__(self, current_token=None):
+        self.calls += 1
+        self.current_tokens.append(current_token)
+        time.sleep(self.delay)
+        return jwt(time.time() + self.lifetime, 'login-{}'.format(self.calls))
+
+
+def test_token_expiry():
+    assert authentication.token_expiry(jwt(1500000000)) == 1500000000
+    assert authentication.token_expiry('opaque') is None
+    assert authentication.token_expiry('a.not-base64!.c') is None
+
+
+def test_concurrent_callers_share_one_login():
+    login = Login(3600, delay=0.1)
+    provider = TokenProvider(login, cache_file=None, cluster_url='https://cluster')
+
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(provider.token())) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert login.calls == 1
+    assert len(set(tokens)) == 1
+    assert provider.token() == tokens[0]
+
+
+def test_expired_token_is_refreshed():
+    login = Login(-1)
+    provider = TokenProvider(login, cache_file=None, cluster_url='https://cluster')
+
+    provider.token()
+    provider.token()
+    assert login.calls == 2
+    # An expired token is replaced by a new login.
+    assert login.current_tokens == [None, None]
+
+
+def test_token_is_refreshed_before_it_expires():
+    login = Login(1.2)
+    provider = TokenProvider(login, cache_file=None, refresh_margin=1, cluster_url='https://cluster')
+
+    first = provider.token()
+    deadline = time.time() + 5
+    while login.calls < 2 and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert login.calls == 2
+    assert login.current_tokens == [None, first]
+    assert provider.token() != first
+    provider.invalidate()
+
+
+def test_token_is_not_refreshed_early_without_credentials():
+    login = Login(1.2)
+    provider = TokenProvider(login, cache_file=None, refresh_margin=1, cluster_url='https://cluster',
+                             can_refresh=lambda: False)
+
+    first = provider.token()
+    time.sleep(0.5)
+
+    assert login.calls == 1
+    assert provider.token() == first
+
+
+def test_failed_background_refresh_is_not_retried(monkeypatch):
+    monkeypatch.setattr(authentication, 'TOKEN_RETRY_INTERVAL', 0.05)
+    login = Login(1.2)
+
+    def failing_login(current_token=None):
+        if login.calls:
+            login.calls += 1
+            raise Exception('No credentials')
+        return login(current_token)
+
+    provider = TokenProvider(failing_login, cache_file=None, refresh_margin=1, cluster_url='https://cluster')
+
+    first = provider.token()
+    time.sleep(0.6)
+
+    # The token is kept until it expires.
+    assert login.calls == 2
+    assert provider.token() == first
+    provider.invalidate()
+
+
+def test_has_credentials(monkeypatch):
+    monkeypatch.setattr(authentication, 'read_config', lambda: {})
+    for name in ('SHAKEDOWN_OAUTH_TOKEN', 'DCOS_USERNAME', 'DCOS_PASSWORD'):
+        monkeypatch.delenv(name, raising=False)
+    assert not authentication.has_credentials()
+
+    monkeypatch.setenv('DCOS_USERNAME', 'bootstrapuser')
+    assert not authentication.has_credentials()
+    monkeypatch.setenv('DCOS_PASSWORD', 'deleteme')
+    assert authentication.has_credentials()
+
+    monkeypatch.delenv('DCOS_PASSWORD')
+    monkeypatch.setenv('SHAKEDOWN_OAUTH_TOKEN', 'oauth')
+    assert authentication.has_credentials()
+
+
+def test_token_is_persisted(tmpdir):
+    cache_file = str(tmpdir.join('tokens.json'))
+    login = Login(3600)
+    token = TokenProvider(login, cache_file=cache_file, cluster_url='https://cluster').token()
+    assert stat.S_IMODE(os.stat(cache_file).st_mode) == 0o600
+
+    # A new process starts with the persisted token of its cluster.
+    assert TokenProvider(login, cache_file=cache_file, cluster_url='https://cluster').token() == token
+    assert login.calls == 1
+    assert TokenProvider(login, cache_file=cache_file, cluster_url='https://other').token() != token
+    assert login.calls == 2
+    assert set(json.loads(tmpdir.join('tokens.json').read())) == {'https://cluster', 'https://other'}
+
+
+def test_persisted_token_which_is_due_is_not_used(tmpdir):
+    cache_file = str(tmpdir.join('tokens.json'))
+    tmpdir.join('tokens.json').write(json.dumps({'https://cluster': jwt(time.time() + 10)}))
+    login = Login(3600)
+
+    TokenProvider(login, cache_file=cache_file, refresh_margin=60, cluster_url='https://cluster').token()
+    assert login.calls == 1
+
+
+def test_refresh_skips_cli_session(monkeypatch):
+    commands = []
+
+    def run_dcos_command(command, **kwargs):
+        commands.append(command)
+        return 'cli-token\n', '', 0
+
+    monkeypatch.setattr(authentication, 'run_dcos_command', run_dcos_command)
+    monkeypatch.setattr(authentication, 'authenticate_oauth', lambda oauth_token: 'oauth-token')
+    monkeypatch.setenv('SHAKEDOWN_OAUTH_TOKEN', 'oauth')
+
+    assert authentication.login(current_token='cli-token') == 'oauth-token'
+    assert commands == []
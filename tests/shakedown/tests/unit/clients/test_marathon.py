@@ -0,0 +1,111 @@
+import json
+
+import pytest
+import requests
+
+from shakedown import http
+from shakedown.clients import marathon, rpcclient
+from shakedown.errors import DCOSHTTPException
+
+APP_TASK = {'id': 'group_app.instance-6f1b2d3e-1111-2222-3333-444455556666._app.1', 'appId': '/group/app'}
+POD_TASK = {'id': 'pod.instance-6f1b2d3e-1111-2222-3333-444455556666.ct1', 'appId': '/pod'}
+OTHER_TASK = {'id': 'other.6f1b2d3e-1111-2222-3333-444455556666', 'appId': '/other'}
+
+
+def _response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode('utf-8')
+    return response
+
+
+@pytest.fixture
+def requests_made(monkeypatch):
+    made = []
+    tasks = [APP_TASK, POD_TASK, OTHER_TASK]
+
+    def get(url, **kwargs):
+        path = url.split('/', 3)[3]
+        made.append(path)
+        if path == 'v2/tasks':
+            return _response(200, {'tasks': tasks})
+        for app_id in {task['appId'] for task in tasks}:
+            if path == 'v2/apps{}/tasks'.format(app_id):
+                return _response(200, {'tasks': [task for task in tasks if task['appId'] == app_id]})
+        raise DCOSHTTPException(_response(404, {'message': 'not found'}))
+
+    monkeypatch.setattr(http, 'get', get)
+    return made
+
+
+@pytest.fixture
+def client():
+    return marathon.Client(rpcclient.create_client('http://marathon.example.com/', 5, auth_token='token'))
+
+
+def test_get_tasks_of_app_uses_app_endpoint(client, requests_made):
+    assert client.get_tasks('group/app') == [APP_TASK]
+    assert client.get_tasks('/unknown') == []
+    assert requests_made == ['v2/apps/group/app/tasks', 'v2/apps/unknown/tasks']
+
+
+def test_get_task_derives_app_from_task_id(client, requests_made):
+    assert client.get_task(APP_TASK['id']) == APP_TASK
+    assert requests_made == ['v2/apps/group/app/tasks']
+
+
+def test_get_task_falls_back_to_cached_task_list(client, requests_made):
+    assert client.get_task(POD_TASK['id']) == POD_TASK
+    assert client.get_task('unknown') is None
+    assert client.get_tasks() == [APP_TASK, POD_TASK, OTHER_TASK]
+    assert requests_made == ['v2/apps/pod/tasks', 'v2/tasks']
+
+    client.invalidate_tasks_cache()
+    client.get_tasks()
+    client.get_tasks(max_age=0)
+    assert requests_made[2:] == ['v2/tasks', 'v2/tasks']
+
+
+def test_app_id_of_task():
+    assert marathon.app_id_of_task('foo.6f1b2d3e-1111-2222-3333-444455556666') == '/foo'
+    assert marathon.app_id_of_task(APP_TASK['id']) == '/group/app'
+    assert marathon.app_id_of_task('not-a-task') is None
+
+
+def test_bulk_create_deploys_apps_per_batch(client, monkeypatch):
+    from shakedown.dcos import spinner
+
+    puts, posts, running = [], [], []
+
+    def put(url, json=None, **kwargs):
+        puts.append([app['id'] for app in json])
+        deployment = 'apps-{}'.format(len(puts))
+        running.append(deployment)
+        return _response(200, {'deploymentId': deployment, 'version': '2018-01-01T00:00:00.000Z'})
+
+    def post(url, json=None, **kwargs):
+        posts.append(json['id'])
+        response = _response(201, json)
+        response.headers['Marathon-Deployment-Id'] = 'pod-{}'.format(json['id'])
+        running.append('pod-{}'.format(json['id']))
+        return response
+
+    def get(url, **kwargs):
+        # every deployment is still running on the first poll after it started
+        deployments = [{'id': deployment} for deployment in running]
+        del running[:]
+        return _response(200, deployments)
+
+    monkeypatch.setattr(http, 'put', put)
+    monkeypatch.setattr(http, 'post', post)
+    monkeypatch.setattr(http, 'get', get)
+    monkeypatch.setattr(spinner.time_module, 'sleep', lambda seconds: None)
+
+    apps = [{'id': '/app-{}'.format(i)} for i in range(5)]
+    reports = client.bulk_create(apps, [{'id': '/pod'}], batch_size=4)
+
+    assert puts == [['/app-0', '/app-1', '/app-2', '/app-3'], ['/app-4']]
+    assert posts == ['/pod']
+    assert [report['deployments'] for report in reports] == [['apps-1'], ['apps-2', 'pod-/pod']]
+    assert [report['pods'] for report in reports] == [[], ['/pod']]
+    assert all(report['deploy_seconds'] >= report['submit_seconds'] for report in reports)
@@ -0,0 +1,329 @@
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+from shakedown.clients import mesos
+from shakedown.errors import DCOSException
+
+
+def _task(task_id, name, state='TASK_RUNNING', slave_id='agent-1'):
+    return {
+        'id': task_id,
+        'name': name,
+        'state': state,
+        'framework_id': 'marathon-id',
+        'slave_id': slave_id,
+        'statuses': [{'container_status': {'container_id': {'value': task_id + '-container'}}}]
+    }
+
+
+def _state():
+    return {
+        'slaves': [
+            {'id': 'agent-1', 'pid': 'slave(1)@10.0.0.1:5051'},
+            {'id': 'agent-10', 'pid': 'slave(1)@10.0.0.10:5051'},
+        ],
+        'frameworks': [
+            {
+                'id': 'marathon-id',
+                'name': 'marathon',
+                'active': True,
+                'tasks': [_task('app.1', 'app'), _task('app.2', 'app'), _task('other.1', 'other')],
+                'completed_tasks': [_task('app.0', 'app', 'TASK_KILLED')]
+            },
+            {
+                'id': 'inactive-id',
+                'name': 'sleepy',
+                'active': False,
+                'tasks': [],
+                'completed_tasks': []
+            }
+        ],
+        'completed_frameworks': [
+            {
+                'id': 'old-marathon-id',
+                'name': 'marathon',
+                'active': False,
+                'tasks': [],
+                'completed_tasks': [_task('gone.1', 'gone', 'TASK_FINISHED')]
+            }
+        ]
+    }
+
+
+def _ids(tasks):
+    return [t['id'] for t in tasks]
+
+
+def test_tasks_filters():
+    master = mesos.Master(_state())
+
+    assert _ids(master.tasks()) == ['app.1', 'app.2', 'other.1']
+    assert _ids(master.tasks('app')) == ['app.1', 'app.2']
+    assert _ids(master.tasks('app', all_=True)) == ['app.1', 'app.2', 'app.0']
+    assert _ids(master.tasks(completed=True)) == ['gone.1', 'app.0']
+    assert _ids(master.tasks('*.1')) == ['app.1', 'other.1']
+
+
+def test_tasks_by_name():
+    master = mesos.Master(_state())
+
+    assert _ids(master.tasks_by_name('app')) == ['app.1', 'app.2']
+    assert _ids(master.tasks_by_name('app', completed=True)) == ['app.1', 'app.2', 'app.0']
+    assert master.tasks_by_name('missing') == []
+
+
+def test_slave_prefers_exact_match():
+    master = mesos.Master(_state())
+
+    assert master.slave('agent-1')['id'] == 'agent-1'
+    assert master.slave('agent-10')['id'] == 'agent-10'
+    assert master.slave('-10')['id'] == 'agent-10'
+
+
+def test_framework_lookups():
+    master = mesos.Master(_state())
+
+    assert master.framework('inactive-id')['name'] == 'sleepy'
+    assert master.framework('unknown') is None
+    assert master.framework_by_name('marathon')['id'] == 'marathon-id'
+    assert master.framework_by_name('marathon', completed=True)['id'] == 'old-marathon-id'
+    assert master.framework_by_name('sleepy') is None
+    assert master.framework_by_name('sleepy', inactive=True)['id'] == 'inactive-id'
+    assert [f['id'] for f in master.frameworks(inactive=True, completed=True)] == \
+        ['old-marathon-id', 'marathon-id', 'inactive-id']
+
+
+def test_get_container_id_by_prefix():
+    master = mesos.Master(_state())
+
+    assert master.get_container_id('other')['value'] == 'other.1-container'
+    assert master.get_container_id('app.2')['value'] == 'app.2-container'
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.fetches = 0
+
+    def master_url(self, path):
+        return 'http://fake/mesos/' + path
+
+    def get_master_state(self):
+        self.fetches += 1
+        return _state()
+
+
+def test_master_state_cache():
+    cache = mesos.MasterStateCache()
+    client = FakeClient()
+
+    first = cache.get(client, max_age=60)
+    assert cache.get(client, max_age=60) is first
+    assert client.fetches == 1
+
+    assert cache.get(client, max_age=0) is not first
+    assert client.fetches == 2
+
+    cache.invalidate()
+    cache.get(client, max_age=60)
+    assert client.fetches == 3
+
+
+class DroppedMirror(object):
+    """A mirror whose stream drops right after it reported to be synced."""
+
+    synced = True
+
+    def master(self, timeout=None):
+        if timeout is None:
+            raise AssertionError('waits for the mirror to resubscribe')
+        raise DCOSException('not mirrored yet')
+
+
+def test_master_state_cache_falls_back_to_fetch_without_mirror():
+    cache = mesos.MasterStateCache()
+    client = FakeClient()
+    cache.attach(client.master_url('master/state.json'), DroppedMirror())
+
+    assert cache.get(client, max_age=60).state() == _state()
+    assert client.fetches == 1
+
+
+class FakeAgentClient(object):
+    """Serves agent state.json files after a delay, failing for `unreachable`."""
+
+    def __init__(self, unreachable=()):
+        self.unreachable = unreachable
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.timeouts = set()
+        self._lock = threading.Lock()
+
+    def get_slave_state(self, slave_id, private_url, timeout=None):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.timeouts.add(timeout)
+        try:
+            time.sleep(0.05)
+            if slave_id in self.unreachable:
+                raise DCOSException('timed out')
+            executor = {'id': 'executor', 'directory': '/sandbox/' + slave_id,
+                        'tasks': [t for t in _state()['frameworks'][0]['tasks'] if t['slave_id'] == slave_id],
+                        'completed_tasks': [], 'queued_tasks': []}
+            return {'frameworks': [{'executors': [executor], 'completed_executors': []}],
+                    'completed_frameworks': []}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_prefetch_agent_states():
+    master = mesos.Master(_state())
+    client = FakeAgentClient(unreachable=['agent-10'])
+
+    states = master.prefetch_agent_states(concurrency=2, timeout=3, dcos_client=client)
+
+    assert list(states) == ['agent-1']
+    assert client.max_in_flight == 2
+    assert client.timeouts == {3}
+    assert master.task('app.2').directory() == '/sandbox/agent-1'
+    with pytest.raises(DCOSException, match='agent-10 is unreachable'):
+        master.slave('agent-10').state()
+
+    # Known states and unreachable agents are not fetched again.
+    assert master.prefetch_agent_states(dcos_client=client) == states
+
+
+class FakeFileClient(object):
+    """Serves files/read.json like Mesos, returning at most `page` bytes per call."""
+
+    def __init__(self, content, page=7):
+        self.content = content
+        self.page = page
+        self.reads = []
+
+    def master_file_read(self, path, length, offset):
+        if offset == -1:
+            return {'data': '', 'offset': len(self.content)}
+        self.reads.append((offset, length))
+        length = len(self.content) if length == -1 else length
+        return {'data': self.content[offset:offset + min(length, self.page)], 'offset': offset}
+
+
+def test_mesos_file_read():
+    content = ''.join('line {}\n'.format(i) for i in range(100))
+    client = FakeFileClient(content)
+    mesos_file = mesos.MesosFile('/var/log/file', dcos_client=client, chunk_size=16, concurrency=4)
+
+    assert mesos_file.read(10) == content[:10]
+    assert mesos_file.tell() == 10
+    assert mesos_file.read() == content[10:]
+    assert mesos_file.read() == ''
+
+    mesos_file.seek(-5, os.SEEK_END)
+    assert mesos_file.read(100) == content[-5:]
+
+
+def test_mesos_file_readinto():
+    content = 'x' * 50
+    mesos_file = mesos.MesosFile('/var/log/file', dcos_client=FakeFileClient(content), chunk_size=16)
+
+    buffer = bytearray(64)
+    assert mesos_file.readinto(buffer) == 50
+    assert bytes(buffer[:50]) == content.encode()
+
+
+def test_mesos_file_iteration():
+    content = ''.join('line {}\n'.format(i) for i in range(100)) + 'last'
+    mesos_file = mesos.MesosFile('/var/log/file', dcos_client=FakeFileClient(content), chunk_size=16)
+
+    assert b''.join(mesos_file.chunks()).decode() == content
+    mesos_file.seek(0)
+    assert list(mesos_file) == content.splitlines(keepends=True)
+
+
+def test_mesos_file_host_path_is_computed_once():
+    class Task(object):
+        calls = 0
+
+        def slave(self):
+            return None
+
+        def directory(self):
+            Task.calls += 1
+            return '/sandbox/'
+
+        def executor(self):
+            return {}
+
+    client = FakeFileClient('x' * 100)
+    mesos_file = mesos.MesosFile('stdout', task=Task(), dcos_client=client, chunk_size=10)
+    mesos_file.read()
+    assert Task.calls == 1
+
+
+def test_mesos_file_follow_yields_new_lines():
+    client = FakeFileClient('first\nsecond\npart')
+    mesos_file = mesos.MesosFile('/var/log/file', dcos_client=client, chunk_size=16)
+    lines = mesos_file.follow(min_interval=0, max_interval=0)
+
+    assert next(lines) == 'first\n'
+    assert next(lines) == 'second\n'
+    client.content += 'ial\nthird\n'
+    assert next(lines) == 'partial\n'
+    assert next(lines) == 'third\n'
+
+    # Only the new data has been read.
+    offsets = [offset for offset, _ in client.reads]
+    assert offsets == sorted(offsets)
+    assert sum(len(client.content[offset:offset + client.page]) for offset in set(offsets)) == len(client.content)
+
+
+def test_mesos_file_follow_backs_off_while_idle():
+    client = FakeFileClient('line\n')
+    follower = mesos._FileFollower(mesos.MesosFile('/f', dcos_client=client), 0.1, 1)
+
+    assert follower.poll() == ['line\n']
+    assert follower.interval == 0.1
+    intervals = []
+    for _ in range(5):
+        assert follower.poll() == []
+        intervals.append(follower.interval)
+    assert intervals == [0.2, 0.4, 0.8, 1, 1]
+
+    client.content += 'more\n'
+    assert follower.poll() == ['more\n']
+    assert follower.interval == 0.1
+
+
+def test_file_poller_follows_many_files_on_one_thread():
+    clients = [FakeFileClient('') for _ in range(20)]
+    received = queue.Queue()
+    threads = set()
+
+    def on_line(index):
+        def callback(line):
+            threads.add(threading.current_thread())
+            received.put((index, line))
+        return callback
+
+    with mesos.FilePoller(min_interval=0.001, max_interval=0.01) as poller:
+        followed = [poller.follow(mesos.MesosFile('/f', dcos_client=client), on_line(i))
+                    for i, client in enumerate(clients)]
+        for i, client in enumerate(clients):
+            client.content += 'hello {}\n'.format(i)
+        lines = sorted(received.get(timeout=5) for _ in clients)
+        assert lines == [(i, 'hello {}\n'.format(i)) for i in range(20)]
+
+        followed[0].close()
+        clients[0].content += 'ignored\n'
+        clients[1].content += 'bye\n'
+        assert received.get(timeout=5) == (1, 'bye\n')
+
+    assert len(threads) == 1
+    assert received.empty()
@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urljoin
+
+import pytest
+
+from shakedown import http
+from shakedown.clients import mesos, recordio
+from shakedown.clients.mesosmirror import MesosStateMirror
+
+
+def _task(task_id, framework_id, state, agent_id='agent-1'):
+    return {
+        'name': task_id.split('.')[0],
+        'task_id': {'value': task_id},
+        'framework_id': {'value': framework_id},
+        'agent_id': {'value': agent_id},
+        'state': state,
+        'resources': [{'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 0.5}},
+                      {'name': 'ports', 'type': 'RANGES', 'ranges': {'range': [{'begin': 31000, 'end': 31001}]}}],
+        'labels': {'labels': [{'key': 'owner', 'value': 'test'}]},
+        'statuses': [{'task_id': {'value': task_id}, 'state': state, 'timestamp': 1.0}]
+    }
+
+
+def _status(task_id, state, timestamp):
+    return {'task_id': {'value': task_id}, 'state': state, 'timestamp': timestamp,
+            'container_status': {'container_id': {'value': task_id + '-container'}}}
+
+
+def _framework(framework_id, name):
+    return {'framework_info': {'id': {'value': framework_id}, 'name': name, 'user': 'root', 'role': '*'},
+            'active': True, 'connected': True}
+
+
+# A SUBSCRIBE stream as a Mesos master sends it: the state, then changes.
+CAPTURE = [
+    {'type': 'SUBSCRIBED', 'subscribed': {'heartbeat_interval_seconds': 15, 'get_state': {
+        'get_agents': {'agents': [{
+            'agent_info': {'id': {'value': 'agent-1'}, 'hostname': '10.0.0.1', 'port': 5051,
+                           'attributes': [{'name': 'rack', 'type': 'TEXT', 'text': {'value': 'a'}}]},
+            'pid': 'slave(1)@10.0.0.1:5051', 'active': True,
+            'total_resources': [
+                {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 4}},
+                {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 1}, 'reservations': [{'role': 'public'}]},
+                {'name': 'ports', 'type': 'RANGES', 'ranges': {'range': [{'begin': 1, 'end': 5}]}}]}]},
+        'get_frameworks': {'frameworks': [_framework('marathon-id', 'marathon')], 'completed_frameworks': []},
+        'get_tasks': {
+            'tasks': [_task('app.1', 'marathon-id', 'TASK_RUNNING')],
+            'unreachable_tasks': [_task('app.3', 'marathon-id', 'TASK_UNREACHABLE')],
+            'completed_tasks': [_task('app.0', 'marathon-id', 'TASK_FINISHED')]}}}},
+    {'type': 'HEARTBEAT'},
+    {'type': 'AGENT_ADDED', 'agent_added': {'agent': {
+        'agent_info': {'id': {'value': 'agent-2'}, 'hostname': '10.0.0.2'}, 'pid': 'slave(1)@10.0.0.2:5051'}}},
+    {'type': 'FRAMEWORK_ADDED', 'framework_added': {'framework': _framework('kafka-id', 'kafka')}},
+    {'type': 'TASK_ADDED', 'task_added': {'task': _task('app.2', 'marathon-id', 'TASK_STAGING', 'agent-2')}},
+    {'type': 'TASK_UPDATED', 'task_updated': {
+        'framework_id': {'value': 'marathon-id'}, 'state': 'TASK_RUNNING',
+        'status': _status('app.2', 'TASK_RUNNING', 2.0)}},
+    # agent-2 is partitioned away and comes back.
+    {'type': 'TASK_UPDATED', 'task_updated': {
+        'framework_id': {'value': 'marathon-id'}, 'state': 'TASK_UNREACHABLE',
+        'status': _status('app.2', 'TASK_UNREACHABLE', 2.5)}},
+    {'type': 'TASK_UPDATED', 'task_updated': {
+        'framework_id': {'value': 'marathon-id'}, 'state': 'TASK_RUNNING',
+        'status': _status('app.2', 'TASK_RUNNING', 2.6)}},
+    {'type': 'TASK_UPDATED', 'task_updated': {
+        'framework_id': {'value': 'marathon-id'}, 'state': 'TASK_KILLED',
+        'status': _status('app.1', 'TASK_KILLED', 3.0)}},
+    {'type': 'TASK_ADDED', 'task_added': {'task': _task('broker.1', 'kafka-id', 'TASK_RUNNING')}},
+    {'type': 'FRAMEWORK_REMOVED', 'framework_removed': {'framework_info': {'id': {'value': 'kafka-id'}}}},
+]
+
+
+class FakeMasterHandler(BaseHTTPRequestHandler):
+    """Replays the capture on SUBSCRIBE and keeps the stream open."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        assert body == {'type': 'SUBSCRIBE'}
+        self.server.subscriptions += 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/recordio')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        encoder = recordio.Encoder(lambda s: json.dumps(s).encode('utf-8'))
+        for event in CAPTURE:
+            record = encoder.encode(event)
+            # Records split across chunks.
+            self._chunk(record[:7])
+            self._chunk(record[7:])
+        self.server.done.wait(5)
+        self._chunk(b'')
+        self.close_connection = True
+
+    def _chunk(self, data):
+        self.wfile.write('{:x}\r\n'.format(len(data)).encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeClient(object):
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def master_url(self, path):
+        return urljoin(self.base_url, path)
+
+
+@pytest.fixture
+def master(monkeypatch):
+    monkeypatch.setattr(http, 'dcos_acs_token', lambda: 'token')
+    monkeypatch.setattr(http, '_is_request_to_dcos', lambda url, toml_config=None: False)
+    monkeypatch.setattr(http, '_verify_ssl', lambda url, verify=None: None)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeMasterHandler)
+    server.subscriptions = 0
+    server.done = threading.Event()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server, FakeClient('http://127.0.0.1:{}/mesos/'.format(server.server_port))
+    server.done.set()
+    http.close_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+def _wait_for_events(mirror, count):
+    deadline = time.time() + 5
+    while mirror.events < count and time.time() < deadline:
+        time.sleep(0.01)
+    assert mirror.events == count
+
+
+def test_mirror_applies_the_subscribe_stream(master):
+    server, client = master
+    with MesosStateMirror(client) as mirror:
+        assert mirror.wait_synced(5)
+        _wait_for_events(mirror, len(CAPTURE))
+        state = mirror.master()
+
+        assert [task['id'] for task in state.tasks()] == ['app.2']
+        running = state.task('app.2')
+        assert running['state'] == 'TASK_RUNNING'
+        assert running['slave_id'] == 'agent-2'
+        assert running['resources'] == {'cpus': 0.5, 'ports': '[31000-31001]'}
+        assert running['labels'] == [{'key': 'owner', 'value': 'test'}]
+        assert [status['state'] for status in running['statuses']] == \
+            ['TASK_STAGING', 'TASK_RUNNING', 'TASK_UNREACHABLE', 'TASK_RUNNING']
+        marathon = state.state()['frameworks'][0]
+        assert [task['id'] for task in marathon['unreachable_tasks']] == ['app.3']
+        assert running['statuses'][-1]['container_status']['container_id']['value'] == 'app.2-container'
+
+        completed = sorted(task['id'] for task in state.tasks(completed=True))
+        assert completed == ['app.0', 'app.1', 'broker.1']
+        assert state.task('app.1', completed=True)['state'] == 'TASK_KILLED'
+
+        assert state.framework_by_name('marathon')['id'] == 'marathon-id'
+        assert state.framework_by_name('kafka') is None
+        assert state.framework_by_name('kafka', completed=True)['id'] == 'kafka-id'
+
+        agent = state.slave('agent-1')
+        assert agent.http_url() == 'http://10.0.0.1:5051'
+        assert agent['attributes'] == {'rack': 'a'}
+        assert agent['resources'] == {'cpus': 5, 'ports': '[1-5]'}
+        assert agent['reserved_resources'] == {'public': {'cpus': 1}}
+        assert [s['id'] for s in state.slaves()] == ['agent-1', 'agent-2']
+
+        # Reads between events share one Master, mesos.get_master() too.
+        assert mirror.master() is state
+        assert mesos.get_master(client) is state
+        assert server.subscriptions == 1
+
+    assert not mirror.synced
+
+
+def test_states_are_not_changed_by_later_events(master):
+    _, client = master
+    mirror = MesosStateMirror(client)
+    mirror.apply(CAPTURE[:1])
+    before = mirror.master(timeout=0)
+
+    mirror.apply(CAPTURE[1:])
+    after = mirror.master(timeout=0)
+
+    assert after is not before
+    assert before.task('app.1')['state'] == 'TASK_RUNNING'
+    assert [task['id'] for task in before.tasks()] == ['app.1']
+    assert after.task('app.1', completed=True)['state'] == 'TASK_KILLED'
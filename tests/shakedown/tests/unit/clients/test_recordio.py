@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from shakedown.clients import recordio
+from shakedown.errors import DCOSException
+
+
+def _encoder():
+    return recordio.Encoder(lambda s: bytes(json.dumps(s), "UTF-8"))
+
+
+def _decoder():
+    return recordio.Decoder(lambda s: json.loads(s.decode("UTF-8")))
+
+
+def test_decode_round_trip():
+    messages = [{'type': 'DATA', 'data': 'x' * n} for n in (0, 1, 10, 70000)]
+    data = b''.join(_encoder().encode(m) for m in messages)
+
+    assert _decoder().decode(data) == messages
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1024])
+def test_decode_split_across_chunks(chunk_size):
+    messages = [{'seq': i, 'data': 'y' * i * 13} for i in range(20)]
+    data = b''.join(_encoder().encode(m) for m in messages)
+
+    decoder = _decoder()
+    records = []
+    for i in range(0, len(data), chunk_size):
+        records.extend(decoder.decode(data[i:i + chunk_size]))
+
+    assert records == messages
+    assert len(decoder.buffer) == 0
+
+
+def test_decode_zero_length_record():
+    decoder = recordio.Decoder(lambda s: s)
+
+    assert decoder.decode(b'0\n3\nabc') == [b'', b'abc']
+
+
+def test_decode_invalid_header():
+    decoder = _decoder()
+
+    with pytest.raises(DCOSException):
+        decoder.decode(b'abc\n')
+    assert decoder.state == recordio.Decoder.FAILED
+
+    with pytest.raises(DCOSException):
+        decoder.decode(b'1\na')
+
+
+def test_decode_requires_bytes():
+    with pytest.raises(DCOSException):
+        _decoder().decode('5\nhello')
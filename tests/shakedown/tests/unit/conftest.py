@@ -0,0 +1,3 @@
+# Importing shakedown.http first resolves the import cycle between
+# shakedown.dcos and shakedown.clients for all unit tests.
+from shakedown import http  # NOQA F401
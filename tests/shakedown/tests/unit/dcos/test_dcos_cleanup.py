@@ -0,0 +1,109 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from shakedown.dcos import cleanup, service
+from shakedown.errors import DCOSHTTPException
+
+
+def _error(status):
+    response = requests.Response()
+    response.status_code = status
+    response._content = b'conflict'
+    return DCOSHTTPException(response)
+
+
+def _reserved(name, value, persistence=None):
+    resource = {'name': name, 'type': 'SCALAR', 'scalar': {'value': value}, 'role': 'db-role'}
+    if persistence is not None:
+        resource['disk'] = {'persistence': {'id': persistence}, 'volume': {'mode': 'RW', 'container_path': 'data'},
+                            'source': {'type': 'MOUNT'}}
+    return resource
+
+
+def _agent(agent_id, role='db-role'):
+    return {'id': agent_id, 'reserved_resources_full': {role: [
+        _reserved('cpus', 1.0), _reserved('mem', 256.0), _reserved('disk', 1024.0, persistence=agent_id + '-vol')]}}
+
+
+@pytest.fixture
+def master(monkeypatch):
+    """Records the posted operations and answers with the queued errors."""
+
+    class FakeMaster(object):
+        def __init__(self):
+            self.posts = []
+            self.errors = {}
+            self.sleeps = []
+            self.lock = threading.Lock()
+
+        def post(self, url, data=None):
+            with self.lock:
+                self.posts.append((url.rsplit('/', 1)[-1], data['slaveId'], data))
+                errors = self.errors.get((url.rsplit('/', 1)[-1], data['slaveId']))
+                if errors:
+                    raise _error(errors.pop(0))
+
+    fake = FakeMaster()
+    monkeypatch.setattr(cleanup, 'master_url', lambda: 'http://master/mesos/master/')
+    monkeypatch.setattr(cleanup.http, 'post', fake.post)
+    monkeypatch.setattr(cleanup.time, 'sleep', fake.sleeps.append)
+    return fake
+
+
+def test_free_role_destroys_then_unreserves_every_agent(master, monkeypatch):
+    agents = [_agent('agent-{}'.format(i)) for i in range(20)] + [{'id': 'empty', 'reserved_resources_full': {}}]
+    monkeypatch.setattr(cleanup, 'dcos_agents_state', lambda: {'slaves': agents})
+
+    report = cleanup.free_role('db-role', concurrency=4)
+
+    assert report
+    assert report.agents == 20
+    assert report.freed() == {'volumes': 20, 'cpus': 20.0, 'mem': 5120.0, 'disk': 20480.0}
+    assert 'empty' not in [agent_id for _, agent_id, _ in master.posts]
+    for agent in agents[:-1]:
+        operations = [(operation, data) for operation, agent_id, data in master.posts if agent_id == agent['id']]
+        assert [operation for operation, _ in operations] == ['destroy-volumes', 'unreserve']
+        assert json.loads(operations[0][1]['volumes'])[0]['disk']['persistence']['id'] == agent['id'] + '-vol'
+        # The volume is unreserved as the plain reserved disk it left behind.
+        disk = json.loads(operations[1][1]['resources'])[2]
+        assert disk['disk'] == {'source': {'type': 'MOUNT'}}
+
+
+def test_conflicts_are_retried_with_backoff(master):
+    master.errors[('destroy-volumes', 'agent-1')] = [409, 409, 409]
+
+    report = cleanup.free_role('db-role', agents=[_agent('agent-1')])
+
+    assert report
+    assert [result.attempts for result in report.results] == [4, 1]
+    assert master.sleeps == [1, 2, 4]
+
+
+def test_failures_are_reported_per_agent(master):
+    master.errors[('destroy-volumes', 'agent-1')] = [409] * (cleanup.CLEANUP_CONFLICT_RETRIES + 1)
+    master.errors[('unreserve', 'agent-2')] = [500]
+
+    report = cleanup.free_role('db-role', agents=[_agent('agent-1'), _agent('agent-2'), _agent('agent-3')])
+
+    assert not report
+    failures = sorted((result.agent_id, result.operation, result.error) for result in report.failures())
+    assert failures == [('agent-1', 'destroy-volumes', 'HTTP 409: conflict'),
+                        ('agent-2', 'unreserve', 'HTTP 500: conflict')]
+    # The resources of agent-1 are not unreserved while its volume exists.
+    assert ('unreserve', 'agent-1') not in [(operation, agent_id) for operation, agent_id, _ in master.posts]
+    assert report.freed() == {'volumes': 2, 'cpus': 1.0, 'mem': 256.0, 'disk': 1024.0}
+    assert '2 operations failed' in str(report)
+    assert max(master.sleeps) == cleanup.CLEANUP_MAX_BACKOFF
+
+
+def test_service_functions_keep_their_results(master, monkeypatch):
+    monkeypatch.setattr(cleanup, 'dcos_agents_state', lambda: None)
+    assert not service.destroy_volumes('db-role')
+    assert not service.unreserve_resources('db-role')
+
+    assert service.destroy_volume(_agent('agent-1'), 'db-role')
+    master.errors[('unreserve', 'agent-1')] = [400]
+    assert not service.unreserve_resource(_agent('agent-1'), 'db-role')
@@ -0,0 +1,88 @@
+import pytest
+
+from shakedown.dcos import cluster
+from shakedown.dcos.cluster import Resources, ResourceSnapshot
+
+
+def _agent(agent_id, total, used, reserved=None):
+    return {
+        'id': agent_id,
+        'hostname': agent_id + '.example.com',
+        'resources': total,
+        'used_resources': used,
+        'offered_resources': {'cpus': 0, 'mem': 0, 'disk': 0, 'gpus': 0},
+        'unreserved_resources': total,
+        'reserved_resources': reserved or {}
+    }
+
+
+SUMMARY = {
+    'slaves': [
+        _agent('agent-1',
+               {'cpus': 4, 'mem': 8192, 'disk': 1000, 'gpus': 0, 'ports': '[1025-2180, 2182-3887]'},
+               {'cpus': 1.5, 'mem': 1024, 'disk': 0, 'gpus': 0, 'ports': '[1025-1025]'}),
+        _agent('agent-2',
+               {'cpus': 2, 'mem': 16384, 'disk': 500, 'gpus': 1, 'ports': '[31000-32000]'},
+               {'cpus': 0.3, 'mem': 0, 'disk': 0, 'gpus': 0},
+               {'slave_public': {'cpus': 1, 'mem': 512, 'disk': 0, 'gpus': 0, 'ports': '[80-80, 443-443]'}}),
+        {'id': 'agent-3', 'resources': {'cpus': 1}, 'used_resources': {}, 'reserved_resources': {}},
+    ]
+}
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.fetches = 0
+
+    def get_state_summary(self):
+        self.fetches += 1
+        return SUMMARY
+
+
+def test_totals():
+    snapshot = ResourceSnapshot(SUMMARY)
+
+    assert snapshot.total() == Resources(7, 24576, 1500, 1, 1156 + 1706 + 1001)
+    assert snapshot.total('used_resources') == Resources(1.8, 1024, 0, 0, 1)
+    assert snapshot.available() == snapshot.total() - snapshot.total('used_resources')
+    assert snapshot.reserved() == Resources(1, 512, 0, 0, 2)
+    assert snapshot.reserved('slave_public') == snapshot.reserved()
+    assert snapshot.reserved('other') == Resources()
+    assert snapshot.by_role('*') == snapshot.total() - snapshot.reserved()
+    assert snapshot.roles == ['slave_public']
+
+
+def test_module_functions_fetch_once(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(cluster, 'DCOSClient', lambda: client)
+
+    assert cluster.available_resources().cpus == pytest.approx(5.2)
+    assert cluster.get_resources_by_role().mem == 24064
+    assert cluster.get_reserved_resources('slave_public').ports == 2
+    assert client.fetches == 3
+
+
+def test_fit_checks():
+    snapshot = ResourceSnapshot(SUMMARY)
+
+    # agent-1 has 2.5 cpus left, agent-2 1.7 and agent-3 1.
+    assert snapshot.max_tasks(Resources(cpus=0.1)) == 25 + 17 + 10
+    # Memory limits agent-1 to one task, cpus agent-2 to three. agent-3 has no memory.
+    assert snapshot.max_tasks(Resources(cpus=0.5, mem=4096)) == 1 + 3
+    assert snapshot.max_tasks(Resources(gpus=1)) == 1
+    assert snapshot.fits(4, Resources(cpus=0.5, mem=4096))
+    assert not snapshot.fits(5, Resources(cpus=0.5, mem=4096))
+    with pytest.raises(ValueError):
+        snapshot.max_tasks(Resources())
+
+
+def test_resources_comparisons():
+    small = Resources(1, 128)
+    large = Resources(2, 256, 10)
+
+    assert small < large and small <= large
+    assert large > small and large >= small
+    assert not (Resources(1, 512) < Resources(2, 256))
+    assert not (Resources(1, 512) > Resources(2, 256))
+    assert cluster.resources_needed(8, 1, 2) == Resources(8, 16)
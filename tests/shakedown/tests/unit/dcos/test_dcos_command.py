@@ -1,5 +1,9 @@
-from shakedown import connection_cache
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
 from shakedown.dcos import command
+from shakedown.dcos.command import connection_cache
 
 
 class MockConnection:
@@ -115,3 +119,127 @@ def test_connection_cache_none():
     assert 'local-me' in f.get_cache()
     f('local2', 'me', 'key')
     assert len(f.get_cache()) == 2
+
+
+class MockSession:
+
+    def __init__(self, host, failure=False):
+        self.host = host
+        self.failure = failure
+        self.command = None
+        self.closed = False
+        self.close_called = False
+
+    def exec_command(self, command):
+        self.command = command
+        # the command finished and the channel was closed by the remote side.
+        self.closed = True
+
+    def recv_exit_status(self):
+        return 1 if self.failure else 0
+
+    def recv_ready(self):
+        return False
+
+    def close(self):
+        self.close_called = True
+
+
+def test_run_command_on_hosts(monkeypatch):
+    """Test that a command runs on every host once and reports each result."""
+    sessions = []
+
+    class Connection(MockConnection):
+        def open_session(self):
+            session = MockSession(self.h, failure=self.h == 'bad')
+            sessions.append(session)
+            return session
+
+    monkeypatch.setattr(command, '_get_connection', lambda h, u, k: Connection(h, u, k))
+    monkeypatch.setattr(command.time, 'sleep', lambda s: None)
+
+    results = list(command.run_command_on_hosts(['a', 'b', 'bad', 'a'], lambda h: 'echo ' + h, noisy=False))
+
+    assert sorted((host, success) for host, success, _ in results) == [('a', True), ('b', True), ('bad', False)]
+    assert sorted(s.command for s in sessions) == ['echo a', 'echo b', 'echo bad']
+    assert all(s.close_called for s in sessions)
+
+
+def test_run_command_on_hosts_without_connection(monkeypatch):
+    """Test that an unreachable host is reported instead of aborting the fan-out."""
+    monkeypatch.setattr(command, '_get_connection', lambda h, u, k: None)
+
+    results = list(command.run_command_on_hosts(['a'], 'true', noisy=False))
+
+    assert len(results) == 1
+    host, success, output = results[0]
+    assert host == 'a' and not success
+    assert 'Unable to open an SSH session' in output
+
+
+def test_connection_cache_evicts_least_recently_used():
+    """Test that the cache does not grow beyond its maximum size."""
+    @connection_cache(max_size=2, keepalive_interval=0)
+    def f(host, user, key_path):
+        return MockConnection(host, user, key_path)
+
+    f('a', 'me', 'key')
+    f('b', 'me', 'key')
+    f('a', 'me', 'key')
+    f('c', 'me', 'key')
+
+    assert list(f.get_cache()) == ['a-me', 'c-me']
+    assert f.metrics() == {'opens': 3, 'reuses': 1, 'evictions': 1, 'failures': 0}
+
+
+def test_connection_cache_evicts_idle_connections():
+    """Test that unused connections are closed unless their host has running sessions."""
+    now = 0
+    busy = set()
+
+    @connection_cache(idle_timeout=10, keepalive_interval=0, in_use=lambda h: h in busy, clock=lambda: now)
+    def f(host, user, key_path):
+        return MockConnection(host, user, key_path)
+
+    f('a', 'me', 'key')
+    f('b', 'me', 'key')
+    busy.add('b')
+    now = 11
+    f('c', 'me', 'key')
+
+    assert list(f.get_cache()) == ['b-me', 'c-me']
+    assert f.metrics()['evictions'] == 1
+
+
+def test_connection_cache_connects_once_per_key():
+    """Test that concurrent callers for the same host share a single connection."""
+    connects = []
+    started = threading.Event()
+
+    @connection_cache(keepalive_interval=0)
+    def f(host, user, key_path):
+        connects.append(host)
+        started.wait(1)
+        return MockConnection(host, user, key_path)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(f, 'local', 'me', 'key') for _ in range(8)]
+        started.set()
+        conns = {id(future.result()) for future in futures}
+
+    assert connects == ['local']
+    assert len(conns) == 1
+    assert f.metrics()['opens'] == 1
+
+
+def test_connection_cache_locks_do_not_grow_with_hosts():
+    """Test that connecting to many hosts does not add a lock per host."""
+    @connection_cache(max_size=2, keepalive_interval=0)
+    def f(host, user, key_path):
+        return MockConnection(host, user, key_path)
+
+    for i in range(100):
+        f('host-{}'.format(i), 'me', 'key')
+
+    assert len(f.get_cache()) == 2
+    assert len(f.pool._key_locks) == command.SSH_POOL_CONNECT_LOCKS
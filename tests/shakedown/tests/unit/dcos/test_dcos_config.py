@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from dcos import config
+
+
+@pytest.fixture
+def config_path(tmpdir, monkeypatch):
+    monkeypatch.setenv('DCOS_DIR', str(tmpdir))
+    monkeypatch.delenv('DCOS_CONFIG', raising=False)
+    monkeypatch.delenv('DCOS_CLUSTER', raising=False)
+    path = tmpdir.join('clusters', 'cluster-id', 'dcos.toml')
+    path.write('[core]\ndcos_url = "https://one"\n\n[cluster]\nname = "test"\n', ensure=True)
+    path.chmod(0o600)
+    config.invalidate_cache()
+    yield str(path)
+    config.invalidate_cache()
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+    loads = config.toml.loads
+
+    def counting_loads(s):
+        calls.append(s)
+        return loads(s)
+
+    monkeypatch.setattr(config.toml, 'loads', counting_loads)
+    return calls
+
+
+def test_get_config_is_cached_until_the_file_changes(config_path, parses):
+    first = config.get_config()
+    assert config.get_config() is first
+    assert config.get_config_val('core.dcos_url') == 'https://one'
+    # The attached cluster is resolved through the cached config, too.
+    assert len(parses) == 1
+
+    with open(config_path, 'a') as f:
+        f.write('\n[package]\ncosmos_url = "https://cosmos"\n')
+    assert config.get_config_val('package.cosmos_url') == 'https://cosmos'
+    assert len(parses) == 2
+
+
+def test_mutable_config_is_not_shared(config_path, parses):
+    immutable = config.get_config()
+    mutable = config.get_config(mutable=True)
+    mutable['core.dcos_url'] = 'https://two'
+
+    assert immutable['core.dcos_url'] == 'https://one'
+    assert config.get_config(mutable=True)['core.dcos_url'] == 'https://one'
+
+
+def test_save_invalidates_the_cache(config_path):
+    assert config.get_config()['core.dcos_url'] == 'https://one'
+    stat = os.stat(config_path)
+
+    toml_config = config.get_config(mutable=True)
+    toml_config['core.dcos_url'] = 'https://two'
+    config.save(toml_config)
+    # Same size and modification time as before.
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(config_path).st_size == stat.st_size
+
+    assert config.get_config()['core.dcos_url'] == 'https://two'
+
+
+def test_toml_resolves_dotted_paths():
+    toml_config = config.Toml({'core': {'dcos_url': 'https://one', 'nested': {'key': 1}}})
+
+    assert toml_config['core.dcos_url'] == 'https://one'
+    assert toml_config['core.nested.key'] == 1
+    assert isinstance(toml_config['core'], config.Toml)
+    assert toml_config['core']['nested.key'] == 1
+    assert toml_config['core'] is toml_config['core']
+    assert 'core.missing' not in toml_config
+    assert toml_config.get('core.dcos_url.missing') is None
+    with pytest.raises(KeyError):
+        toml_config['missing']
+    assert sorted(toml_config.property_items()) == [('core.dcos_url', 'https://one'), ('core.nested.key', 1)]
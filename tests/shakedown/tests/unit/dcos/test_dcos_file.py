@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from shakedown.dcos import command, file
+
+
+class MockSCPClient:
+
+    transfers = []
+
+    def __init__(self, transport, progress=None):
+        self.transport = transport
+        self.progress = progress
+
+    def put(self, file_path, remote_path):
+        if file_path == 'missing':
+            raise OSError('No such file')
+        self.transfers.append((self.transport, 'put', file_path, remote_path))
+        self.progress(file_path, 100, 100)
+
+    def get(self, remote_path, file_path):
+        self.transfers.append((self.transport, 'get', file_path, remote_path))
+        self.progress(remote_path, 50, 50)
+
+    def close(self):
+        pass
+
+
+def mock_scp(monkeypatch, connect):
+    MockSCPClient.transfers = []
+    connections = []
+
+    def get_connection(host, username, key_path):
+        connections.append(host)
+        return connect(host)
+
+    monkeypatch.setattr(file.scp, 'SCPClient', MockSCPClient)
+    monkeypatch.setattr(file, '_get_connection', get_connection)
+    return connections
+
+
+def test_copy_file_reuses_cached_transport(monkeypatch):
+    mock_scp(monkeypatch, lambda host: 'transport-' + host)
+
+    assert file.copy_file('a', 'local.txt', 'remote.txt')
+    assert MockSCPClient.transfers == [('transport-a', 'put', 'local.txt', 'remote.txt')]
+
+
+def test_copy_files_reports_per_host(monkeypatch):
+    connections = mock_scp(monkeypatch, lambda host: 'transport-' + host)
+
+    reports = file.copy_files({'a': ['one', 'two', ('three', '/tmp')], 'b': ['missing'], 'c': []})
+
+    assert sorted(connections) == ['a', 'b']
+    assert sorted(t[2:] for t in MockSCPClient.transfers if t[0] == 'transport-a') == \
+        [('one', '.'), ('three', '/tmp'), ('two', '.')]
+    assert reports['a']['files'] == 3
+    assert reports['a']['bytes'] == 300
+    assert reports['a']['failed'] == []
+    assert reports['b']['files'] == 0
+    assert reports['b']['failed'] == ['missing']
+    assert 'c' not in reports
+
+
+def test_copy_files_get_without_connection(monkeypatch):
+    mock_scp(monkeypatch, lambda host: None if host == 'down' else 'transport-' + host)
+
+    reports = file.copy_files({'up': ['sandbox.tar.gz'], 'down': ['sandbox.tar.gz']}, action='get')
+
+    assert MockSCPClient.transfers == [('transport-up', 'get', '.', 'sandbox.tar.gz')]
+    assert reports['up']['bytes'] == 50
+    assert reports['down']['failed'] == ['sandbox.tar.gz']
+
+
+def test_copy_files_reports_connection_errors_per_host(monkeypatch):
+    def connect(host):
+        if host == 'bad':
+            raise ValueError('No valid key supplied')
+        return 'transport-' + host
+
+    mock_scp(monkeypatch, connect)
+
+    reports = file.copy_files({'good': ['one'], 'bad': ['one', 'two']})
+
+    assert MockSCPClient.transfers == [('transport-good', 'put', 'one', '.')]
+    assert reports['good']['files'] == 1
+    assert reports['bad']['files'] == 0
+    assert sorted(reports['bad']['failed']) == ['one', 'two']
+    assert file._session_slot('bad').active == 0
+
+
+def test_copy_files_pins_host_for_whole_batch(monkeypatch):
+    held = []
+
+    def connect(host):
+        slot = file._session_slot(host)
+        held.append((slot.pinned, slot.active))
+        return 'transport-' + host
+
+    mock_scp(monkeypatch, connect)
+    put = MockSCPClient.put
+
+    def put_and_record(self, file_path, remote_path):
+        slot = file._session_slot('held')
+        held.append((slot.pinned, slot.active))
+        put(self, file_path, remote_path)
+
+    monkeypatch.setattr(MockSCPClient, 'put', put_and_record)
+
+    reports = file.copy_files({'held': ['one', 'two', 'three']}, channels_per_host=1)
+
+    assert reports['held']['files'] == 3
+    assert held == [(1, 0), (1, 1), (1, 1), (1, 1)]
+    assert (file._session_slot('held').pinned, file._session_slot('held').active) == (0, 0)
+
+
+def test_concurrent_batches_to_one_host_do_not_block(monkeypatch):
+    mock_scp(monkeypatch, lambda host: 'transport-' + host)
+    batches = command.SSH_MAX_SESSIONS_PER_HOST * 2
+
+    with ThreadPoolExecutor(max_workers=batches) as executor:
+        futures = [executor.submit(file.copy_files, {'busy': ['one', 'two']}) for _ in range(batches)]
+        reports = [future.result(timeout=10) for future in futures]
+
+    assert all(report['busy']['files'] == 2 for report in reports)
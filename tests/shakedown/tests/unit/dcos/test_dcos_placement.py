@@ -0,0 +1,113 @@
+import pytest
+
+from shakedown.dcos import placement
+from shakedown.dcos.cluster import ResourceSnapshot
+from shakedown.errors import DCOSException
+
+
+def _agent(number, zone, rack, cpus=4, mem=4096, public=False):
+    total = {'cpus': cpus, 'mem': mem, 'disk': 1000, 'gpus': 0, 'ports': '[31000-32000]'}
+    reserved = {'slave_public': total} if public else {}
+    unreserved = {'cpus': 0, 'mem': 0, 'disk': 0, 'gpus': 0} if public else total
+    return {
+        'id': 'agent-{}'.format(number),
+        'hostname': '10.0.0.{}'.format(number),
+        'attributes': {'rack': rack, 'public_ip': 'true' if public else 'false'},
+        'domain': {'fault_domain': {'region': {'name': 'us-east'}, 'zone': {'name': zone}}},
+        'resources': total,
+        'used_resources': {'cpus': 0, 'mem': 0, 'disk': 0, 'gpus': 0},
+        'unreserved_resources': unreserved,
+        'reserved_resources': reserved
+    }
+
+
+SNAPSHOT = ResourceSnapshot({'slaves': [
+    _agent(1, 'a', 'r1'),
+    _agent(2, 'a', 'r1'),
+    _agent(3, 'b', 'r2', cpus=1),
+    _agent(4, 'b', 'r2', public=True),
+]})
+
+
+def _app(instances=1, cpus=1, mem=128, **fields):
+    return dict({'id': '/app', 'instances': instances, 'cpus': cpus, 'mem': mem}, **fields)
+
+
+def test_resources_only():
+    result = placement.check(_app(instances=9, acceptedResourceRoles=['*']), snapshot=SNAPSHOT)
+
+    assert result
+    assert result.hosts == {'10.0.0.1': 4, '10.0.0.2': 4, '10.0.0.3': 1}
+    assert not placement.check(_app(instances=10, acceptedResourceRoles=['*']), snapshot=SNAPSHOT)
+    assert placement.check(_app(instances=13, acceptedResourceRoles=['*', 'slave_public']), snapshot=SNAPSHOT)
+
+
+def test_unique_hostname():
+    app = _app(instances=4, constraints=[['hostname', 'UNIQUE']], acceptedResourceRoles=['*'])
+    result = placement.check(app, snapshot=SNAPSHOT)
+
+    assert not result
+    assert result.placed == 3
+    assert placement.check(app, instances=3, snapshot=SNAPSHOT)
+
+
+def test_default_roles_exclude_public_agents():
+    app = _app(instances=4, constraints=[['hostname', 'UNIQUE']])
+    result = placement.check(app, snapshot=SNAPSHOT)
+
+    assert not result
+    assert '10.0.0.4' not in result.hosts
+    assert placement.check(_app(instances=9), snapshot=SNAPSHOT)
+    assert not placement.check(_app(instances=10), snapshot=SNAPSHOT)
+
+    app['acceptedResourceRoles'] = ['*', 'slave_public']
+    assert placement.check(app, snapshot=SNAPSHOT)
+
+
+def test_pinned_and_public():
+    pinned = _app(instances=2, constraints=[['hostname', 'LIKE', '10.0.0.3']])
+    assert not placement.check(pinned, snapshot=SNAPSHOT)
+    assert placement.check(pinned, instances=1, snapshot=SNAPSHOT).hosts == {'10.0.0.3': 1}
+
+    public = _app(instances=4, acceptedResourceRoles=['slave_public'])
+    assert placement.check(public, snapshot=SNAPSHOT).hosts == {'10.0.0.4': 4}
+
+    not_public = _app(instances=12, constraints=[['public_ip', 'UNLIKE', 'true']])
+    assert not placement.check(not_public, snapshot=SNAPSHOT)
+
+
+def test_grouping_constraints():
+    per_zone = _app(instances=4, constraints=[['@zone', 'MAX_PER', '2']], acceptedResourceRoles=['*', 'slave_public'])
+    assert placement.check(per_zone, snapshot=SNAPSHOT)
+    assert not placement.check(per_zone, instances=5, snapshot=SNAPSHOT)
+
+    # All instances on one rack: r1 holds 8.
+    clustered = _app(instances=8, constraints=[['rack', 'CLUSTER']])
+    assert set(placement.check(clustered, snapshot=SNAPSHOT).hosts) == {'10.0.0.1', '10.0.0.2'}
+    assert not placement.check(clustered, instances=9, snapshot=SNAPSHOT)
+
+
+def test_fixed_host_ports():
+    app = _app(instances=3, cpus=0.1, portDefinitions=[{'port': 8080}], requirePorts=True)
+    assert placement.check(app, snapshot=SNAPSHOT)
+    assert not placement.check(app, instances=5, snapshot=SNAPSHOT)
+    app['requirePorts'] = False
+    assert placement.check(app, instances=5, snapshot=SNAPSHOT)
+
+
+def test_pod():
+    pod = {
+        'id': '/pod',
+        'scaling': {'kind': 'fixed', 'instances': 2},
+        'containers': [{'name': 'c1', 'resources': {'cpus': 1.9, 'mem': 64}},
+                       {'name': 'c2', 'resources': {'cpus': 1.9, 'mem': 64}}],
+        'scheduling': {'placement': {'constraints': [{'fieldName': 'rack', 'operator': 'IS', 'value': 'r1'}]}}
+    }
+    requirement = placement.Requirement.from_pod(pod)
+    assert requirement.resources.cpus == pytest.approx(3.9)
+    assert requirement.resources.disk == 10
+
+    assert placement.check(pod, snapshot=SNAPSHOT)
+    with pytest.raises(DCOSException) as e:
+        placement.assert_feasible(pod, instances=3, snapshot=SNAPSHOT)
+    assert '2 of 3 instances of /pod fit' in str(e.value)
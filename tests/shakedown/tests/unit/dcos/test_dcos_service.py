@@ -0,0 +1,80 @@
+import pytest
+import requests
+
+from shakedown.dcos import service
+from shakedown.dcos.service import TaskReplacementTracker
+from shakedown.errors import DCOSException, DCOSHTTPException
+
+
+@pytest.fixture
+def polls(monkeypatch):
+    """Serves a sequence of task ID lists, one per poll."""
+
+    sequence = []
+
+    def get_service_task_ids(service_name, task_predicate=None):
+        return sequence.pop(0)
+
+    monkeypatch.setattr(service, 'get_service_task_ids', get_service_task_ids)
+    return sequence
+
+
+def test_tracker_follows_a_rolling_restart(polls):
+    old = ['app.{}'.format(i) for i in range(5000)]
+    polls.extend([
+        old,
+        old[2000:] + ['new.{}'.format(i) for i in range(2000)],
+        ['new.{}'.format(i) for i in range(4999)],
+        ['new.{}'.format(i) for i in range(5000)],
+    ])
+    tracker = TaskReplacementTracker('marathon', old)
+
+    assert not tracker.all_replaced()
+    assert (tracker.replaced, tracker.remaining) == (0, 5000)
+
+    assert not tracker.all_replaced()
+    assert (tracker.replaced, tracker.remaining, tracker.new_tasks) == (2000, 3000, 2000)
+    assert tracker.rate > 0
+    assert '2000/5000 replaced, 3000 remaining' in tracker.progress()
+
+    # All old tasks are gone, but not all new ones are there yet.
+    assert not tracker.all_replaced()
+    assert tracker.all_replaced()
+
+
+def test_empty_poll_does_not_count_as_replacements(polls):
+    polls.extend([[], ['app.1', 'app.2', 'app.3'], ['app.3', 'app.4']])
+    tracker = TaskReplacementTracker('marathon', ['app.1', 'app.2'])
+
+    # The framework was briefly inactive.
+    assert not tracker.all_replaced()
+    assert not tracker.all_replaced()
+    assert (tracker.replaced, tracker.remaining, tracker.new_tasks) == (0, 2, 1)
+    assert tracker.all_replaced()
+
+
+def test_failed_polls_do_not_count_as_replacements(polls, monkeypatch):
+    def fail(service_name, task_predicate=None):
+        raise DCOSHTTPException(requests.Response())
+
+    tracker = TaskReplacementTracker('marathon', ['app.1', 'app.2'])
+    monkeypatch.setattr(service, 'get_service_task_ids', fail)
+    assert not tracker.all_replaced()
+    assert not tracker.any_missing()
+    assert tracker.remaining == 2
+
+
+def test_predicates(polls):
+    polls.extend([['app.1', 'app.2'], ['app.2', 'app.3'], ['app.3', 'app.4'], ['app.3']])
+
+    assert not service.tasks_missing_predicate('marathon', ['app.1', 'app.2'])
+    assert service.tasks_missing_predicate('marathon', ['app.1', 'app.2'])
+    assert service.tasks_all_replaced_predicate('marathon', ['app.1', 'app.2'])
+    assert not service.tasks_all_replaced_predicate('marathon', ['app.1', 'app.2'])
+
+
+def test_wait_for_service_tasks_all_unchanged_reports_missing_tasks(polls):
+    polls.extend([['app.1', 'app.2'], ['app.2']])
+
+    with pytest.raises(DCOSException, match=r"\['app.1'\]"):
+        service.wait_for_service_tasks_all_unchanged('marathon', ['app.1', 'app.2'], timeout_sec=5)
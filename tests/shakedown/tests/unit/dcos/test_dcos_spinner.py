@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from shakedown.dcos import spinner
+from shakedown.dcos.spinner import TimeoutExpired
+
+
+class RecordingWakeUp(object):
+    """Latches wake-ups like an event subscription and records waits."""
+
+    def __init__(self):
+        self.timeouts = []
+        self._woken = threading.Event()
+
+    def wake(self):
+        self._woken.set()
+
+    def wait(self, timeout):
+        self.timeouts.append(timeout)
+        woken = self._woken.wait(timeout)
+        self._woken.clear()
+        return woken
+
+
+def test_sleep_is_cut_short_by_event():
+    event = threading.Event()
+    threading.Timer(0.05, event.set).start()
+
+    start = time.time()
+    spinner._sleep(10, event)
+
+    assert time.time() - start < 5
+
+
+def test_sleep_without_wake_on_sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(spinner.time_module, 'sleep', sleeps.append)
+
+    spinner._sleep(3)
+
+    assert sleeps == [3]
+
+
+def test_wait_for_rechecks_on_wake_up():
+    wake_on = RecordingWakeUp()
+    checks = []
+
+    def predicate():
+        checks.append(1)
+        if len(checks) == 1:
+            threading.Timer(0.05, wake_on.wake).start()
+        return len(checks) == 2
+
+    start = time.time()
+    assert spinner.wait_for(predicate, timeout_seconds=30, sleep_seconds=10, wake_on=wake_on)
+
+    assert time.time() - start < 5
+    assert wake_on.timeouts == [10]
+
+
+def test_missed_wake_up_latches():
+    wake_on = RecordingWakeUp()
+    checks = []
+
+    def predicate():
+        checks.append(1)
+        # The wake-up arrives while the predicate runs, before anyone waits.
+        wake_on.wake()
+        return len(checks) == 2
+
+    start = time.time()
+    assert spinner.wait_for(predicate, timeout_seconds=30, sleep_seconds=10, wake_on=wake_on)
+
+    assert time.time() - start < 5
+    assert len(checks) == 2
+
+
+def test_wake_ups_do_not_extend_timeout():
+    event = threading.Event()
+    event.set()
+    checks = []
+
+    def predicate():
+        checks.append(1)
+        return False
+
+    start = time.time()
+    with pytest.raises(TimeoutExpired):
+        spinner.wait_for(predicate, timeout_seconds=0.3, sleep_seconds=10, wake_on=event)
+
+    assert 0.3 <= time.time() - start < 5
+    assert len(checks) > 1
+
+
+def test_timeout_is_kept_without_wake_ups():
+    wake_on = RecordingWakeUp()
+
+    start = time.time()
+    with pytest.raises(TimeoutExpired):
+        spinner.wait_for(lambda: False, timeout_seconds=0.3, sleep_seconds=0.1, wake_on=wake_on)
+
+    assert time.time() - start >= 0.3
+    assert all(timeout == 0.1 for timeout in wake_on.timeouts)
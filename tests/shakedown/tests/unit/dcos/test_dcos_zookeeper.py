@@ -0,0 +1,121 @@
+import binascii
+import threading
+
+import pytest
+import requests
+
+from shakedown.dcos import zookeeper
+from shakedown.errors import DCOSHTTPException
+
+
+class FakeExhibitor(object):
+    """Serves a tree of znodes the way the Exhibitor explorer API does."""
+
+    def __init__(self, tree):
+        self.tree = dict(tree)
+        self.deleted = []
+        self.failing = set()
+        self.lock = threading.Lock()
+
+    def children(self, path):
+        prefix = path.rstrip('/') + '/'
+        return [{'title': key[len(prefix):], 'key': key, 'isFolder': True} for key in sorted(self.tree)
+                if key.startswith(prefix) and '/' not in key[len(prefix):]]
+
+    def data(self, path):
+        raw = self.tree.get(path, b'')
+        hexed = binascii.hexlify(raw).decode('ascii')
+        return {'bytes': ' '.join(hexed[i:i + 2] for i in range(0, len(hexed), 2)),
+                'str': raw.decode('utf-8', 'replace'), 'stat': ''}
+
+    def delete(self, node_name):
+        path = '/' + node_name
+        with self.lock:
+            if path in self.failing:
+                response = requests.Response()
+                response.status_code = 500
+                response.request = requests.Request('DELETE', 'http://exhibitor/znode/' + node_name).prepare()
+                raise DCOSHTTPException(response)
+            assert not self.children(path), 'deleted {} before its children'.format(path)
+            del self.tree[path]
+            self.deleted.append(path)
+        return True
+
+
+def _marathon_state(apps):
+    tree = {'/marathon': b'', '/marathon/state': b'', '/marathon/state/apps': b''}
+    for i in range(apps):
+        tree['/marathon/state/apps/app-{}'.format(i)] = b''
+        tree['/marathon/state/apps/app-{}/v1'.format(i)] = '{{"id": "/app-{}"}}'.format(i).encode('utf-8')
+    tree['/marathon/state/group'] = b'\x00\x01\xff'
+    return tree
+
+
+@pytest.fixture
+def exhibitor(monkeypatch):
+    fake = FakeExhibitor(_marathon_state(50))
+    monkeypatch.setattr(zookeeper, 'get_zk_node_children', fake.children)
+    monkeypatch.setattr(zookeeper, 'get_zk_node_data', fake.data)
+    monkeypatch.setattr(zookeeper, 'delete_zk_node', fake.delete)
+    return fake
+
+
+def test_walk_is_breadth_first(exhibitor):
+    nodes = list(zookeeper.walk_zk_tree('marathon/state/', concurrency=4))
+
+    paths = sorted(path for path in exhibitor.tree if path.startswith('/marathon/state'))
+    assert sorted(node['path'] for node in nodes) == paths
+    depths = [node['depth'] for node in nodes]
+    assert depths == sorted(depths)
+    group = [node for node in nodes if node['path'] == '/marathon/state/group'][0]
+    assert (group['data'], group['size'], group['children']) == ('0001ff', 3, [])
+
+
+def test_snapshots_are_diffed(exhibitor, tmpdir):
+    before = str(tmpdir.join('before.jsonl.gz'))
+    after = str(tmpdir.join('after.jsonl.gz'))
+
+    assert zookeeper.snapshot_zk_tree('/marathon/state', before) == {'nodes': 103, 'bytes': 3 + 16 * 10 + 17 * 40}
+    first = next(zookeeper.read_zk_snapshot(before))
+    assert (first['path'], first['children']) == ('/marathon/state', 2)
+
+    del exhibitor.tree['/marathon/state/apps/app-0/v1']
+    exhibitor.tree['/marathon/state/apps/app-1/v1'] = b'{}'
+    exhibitor.tree['/marathon/state/deployments'] = b''
+    zookeeper.snapshot_zk_tree('/marathon/state', after)
+
+    diff = zookeeper.diff_zk_snapshots(before, after)
+    assert diff['nodes'] == [103, 103]
+    assert diff['added'] == ['/marathon/state/deployments']
+    assert diff['removed'] == ['/marathon/state/apps/app-0/v1']
+    assert diff['changed'] == ['/marathon/state/apps/app-1/v1']
+    assert diff['subtrees']['/marathon/state/group'] == [3, 3]
+    assert diff['subtrees']['/marathon/state/apps'] == [840, 840 - 16 - 16 + 2]
+
+
+def test_failed_snapshots_leave_no_file(exhibitor, tmpdir, monkeypatch):
+    def broken(path):
+        raise DCOSHTTPException(requests.Response())
+
+    monkeypatch.setattr(zookeeper, 'get_zk_node_data', broken)
+    with pytest.raises(DCOSHTTPException):
+        zookeeper.snapshot_zk_tree('/marathon', str(tmpdir.join('snapshot.jsonl.gz')))
+    assert tmpdir.listdir() == []
+
+
+def test_trees_are_deleted_bottom_up(exhibitor):
+    assert zookeeper.delete_zk_tree('/marathon/state/apps', concurrency=8)
+
+    assert len(exhibitor.deleted) == 101
+    assert exhibitor.deleted[-1] == '/marathon/state/apps'
+    assert sorted(exhibitor.tree) == ['/marathon', '/marathon/state', '/marathon/state/group']
+
+
+def test_ancestors_of_failed_nodes_are_kept(exhibitor):
+    exhibitor.failing.add('/marathon/state/apps/app-3/v1')
+
+    assert not zookeeper.delete_zk_tree('/marathon/state/apps')
+
+    assert '/marathon/state/apps/app-3' not in exhibitor.deleted
+    assert '/marathon/state/apps/app-4/v1' in exhibitor.deleted
+    assert '/marathon/state/apps' in exhibitor.tree
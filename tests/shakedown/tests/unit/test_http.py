@@ -0,0 +1,136 @@
+import base64
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+from shakedown import http
+from shakedown.clients import authentication
+from shakedown.clients.authentication import TokenProvider
+from shakedown.errors import DCOSAuthenticationException
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{}/'.format(server.server_port)
+    http.close_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_is_shared_per_cluster(server_url):
+    assert http.session(server_url + 'v2/apps') is http.session(server_url + 'v2/deployments')
+    assert http.session(server_url) is not http.session('https://other.example.com/')
+
+
+def test_session_reuses_connections(server_url):
+    http.close_sessions()
+    for _ in range(5):
+        assert http.session(server_url).get(server_url + 'v2/apps').status_code == 200
+
+    stats = http.pool_stats()
+    assert stats['requests'] == 5
+    assert stats['misses'] == 1
+    assert stats['hits'] == 4
+
+
+def jwt(subject):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('utf-8').rstrip('=')
+    return '.'.join([encode({'alg': 'RS256'}), encode({'uid': subject, 'exp': time.time() + 3600}), 'signature'])
+
+
+class AuthHandler(BaseHTTPRequestHandler):
+    """Accepts only the token in `server.valid_token`."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        token = self.headers['Authorization']
+        self.server.tokens.append(token)
+        self.send_response(200 if token == 'token=' + self.server.valid_token else 401)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cluster(monkeypatch, tmpdir):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), AuthHandler)
+    server.tokens = []
+    server.valid_token = server.login_token = jwt('new')
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:{}/'.format(server.server_port)
+
+    # The persisted token of an earlier run is no longer accepted.
+    server.revoked_token = jwt('revoked')
+    cache_file = tmpdir.join('tokens.json')
+    cache_file.write(json.dumps({url: server.revoked_token}))
+    server.logins = 0
+
+    def login(current_token=None):
+        server.logins += 1
+        return server.login_token
+
+    provider = TokenProvider(login, cache_file=str(cache_file), cluster_url=url)
+    monkeypatch.setattr(authentication, '_provider', provider)
+    monkeypatch.setattr(http, '_is_request_to_dcos', lambda url, toml_config=None: True)
+    monkeypatch.setattr(http, '_verify_ssl', lambda url, verify=None: None)
+    yield server, url, cache_file
+    provider.invalidate()
+    http.close_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+def test_rejected_token_is_replaced(cluster):
+    server, url, cache_file = cluster
+
+    assert http.get(url + 'v2/apps').status_code == 200
+    assert http.get(url + 'v2/apps').status_code == 200
+
+    assert server.tokens == ['token=' + token for token in
+                             (server.revoked_token, server.valid_token, server.valid_token)]
+    assert server.logins == 1
+    assert json.loads(cache_file.read()) == {url: server.valid_token}
+
+
+def test_request_is_retried_once(cluster):
+    server, url, cache_file = cluster
+    server.valid_token = 'never'
+
+    with pytest.raises(DCOSAuthenticationException):
+        http.get(url + 'v2/apps')
+
+    assert len(server.tokens) == 2
+    assert server.logins == 1
@@ -0,0 +1,59 @@
+import urllib.request
+
+from shakedown import http, metrics
+from test_http import server_url  # NOQA F401 fixture
+
+
+def test_exposition():
+    registry = metrics.Registry()
+    requests = registry.histogram('requests_seconds', 'Latency.', ('method',), buckets=(0.1, 1))
+    requests.observe(0.05, 'GET')
+    requests.observe(0.5, 'GET')
+    requests.observe(5, 'GET')
+    registry.counter('bytes', 'Bytes "sent".').inc(amount=10)
+
+    assert registry.exposition() == '\n'.join([
+        '# HELP bytes Bytes "sent".',
+        '# TYPE bytes counter',
+        'bytes_total 10',
+        '# HELP requests_seconds Latency.',
+        '# TYPE requests_seconds histogram',
+        'requests_seconds_bucket{method="GET",le="0.1"} 1',
+        'requests_seconds_bucket{method="GET",le="1.0"} 2',
+        'requests_seconds_bucket{method="GET",le="+Inf"} 3',
+        'requests_seconds_sum{method="GET"} 5.55',
+        'requests_seconds_count{method="GET"} 3',
+    ]) + '\n'
+
+
+def test_endpoint_template():
+    assert metrics.endpoint_template('https://cluster/service/marathon/v2/apps/a/b/tasks?embed=x') == \
+        '/service/marathon/v2/apps/{id}/tasks'
+    assert metrics.endpoint_template('https://cluster/slave/8a3b-4c5d-S1/api/v1') == '/slave/{id}/api/v1'
+    assert metrics.endpoint_template('http://10.0.0.1:8080/v2/deployments') == '/v2/deployments'
+
+
+def test_http_requests_are_measured(server_url, monkeypatch):  # NOQA F811
+    monkeypatch.setattr(http, '_verify_ssl', lambda url, verify=None: None)
+    endpoint = metrics.endpoint_template(server_url + 'v2/apps')
+    before = metrics.HTTP_REQUEST_DURATION.count('GET', endpoint, '200')
+
+    for _ in range(3):
+        http._request('get', server_url + 'v2/apps')
+
+    assert metrics.HTTP_REQUEST_DURATION.count('GET', endpoint, '200') == before + 3
+    assert metrics.HTTP_RESPONSE_BYTES.value('GET', endpoint) >= 6
+
+
+def test_http_server():
+    registry = metrics.Registry()
+    registry.counter('scrapes', 'Scrapes.').inc()
+    server = metrics.start_http_server(registry=registry)
+    try:
+        url = 'http://127.0.0.1:{}/metrics'.format(server.server_port)
+        with urllib.request.urlopen(url) as response:
+            assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+            assert 'scrapes_total 1' in response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
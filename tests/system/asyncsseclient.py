@@ -3,9 +3,18 @@ Server Side Events (SSE) async client for Python.
 
 Provides a generator of SSE received through an existing HTTP response.
 """
+import json
 import logging
+import re
 
-_FIELD_SEPARATOR = ':'
+_FIELD_SEPARATOR = b':'
+_COMMENT = ord(_FIELD_SEPARATOR)
+
+# An empty line terminates an event. Lines end with CRLF, LF or CR.
+_EVENT_DELIMITER = re.compile(b'\r\n\r\n|\n\n|\r\r')
+
+# Longest delimiter minus one: a delimiter may straddle two chunks.
+_DELIMITER_OVERLAP = 3
 
 
 class SSEClient(object):
@@ -26,96 +35,184 @@ class SSEClient(object):
         self._event_stream = event_stream
         self._char_enc = char_enc
 
+    def _chunks(self):
+        # aiohttp.StreamReader.iter_any yields whatever has been received
+        # without splitting it into lines first.
+        if hasattr(self._event_stream, 'iter_any'):
+            return self._event_stream.iter_any()
+        return self._event_stream
+
     async def _read(self):
         """Read the incoming event source stream and yield event chunks.
 
         Unfortunately it is possible for some servers to decide to break an
         event into multiple HTTP chunks in the response. It is thus necessary
         to correctly stitch together consecutive response chunks and find the
-        SSE delimiter (empty new line) to yield full, correct event chunks."""
-        data = b''
-        async for line in self._event_stream:
-            data += line
-            if data.endswith((b'\r\r', b'\n\n', b'\r\n\r\n')):
-                yield data
-                data = b''
-        if data:
-            yield data
-
-    async def events(self):
-        async for chunk in self._read():
-            event = Event()
-            # Split before decoding so splitlines() only uses \r and \n
-            for line in chunk.splitlines():
-                # Decode the line.
-                line = line.decode(self._char_enc)
-
-                # Lines starting with a separator are comments and are to be
-                # ignored.
-                if not line.strip() or line.startswith(_FIELD_SEPARATOR):
-                    continue
-
-                data = line.split(_FIELD_SEPARATOR, 1)
-                field = data[0]
+        SSE delimiter (empty new line) to yield full, correct event chunks.
+
+        Received bytes are appended to a single buffer which is only scanned
+        from where the previous scan stopped. All events completed by one
+        received chunk are yielded together as a list."""
+        buffer = bytearray()
+        scan_from = 0
+        # Most servers, Marathon included, only use LF. Fall back to the
+        # slower regular expression once a CR has been seen.
+        saw_cr = False
+        async for chunk in self._chunks():
+            saw_cr = saw_cr or b'\r' in chunk
+            buffer += chunk
+            events = []
+            start = 0
+            if saw_cr:
+                match = _EVENT_DELIMITER.search(buffer, scan_from)
+                while match is not None:
+                    events.append(bytes(buffer[start:match.end()]))
+                    start = match.end()
+                    match = _EVENT_DELIMITER.search(buffer, start)
+            else:
+                end = buffer.find(b'\n\n', scan_from)
+                while end != -1:
+                    events.append(bytes(buffer[start:end + 2]))
+                    start = end + 2
+                    end = buffer.find(b'\n\n', start)
+            if start:
+                del buffer[:start]
+            scan_from = max(len(buffer) - _DELIMITER_OVERLAP, 0)
+            if events:
+                yield events
+        if buffer:
+            yield [bytes(buffer)]
+
+    def _parse(self, chunk):
+        """Parse a single event chunk.
+
+        :param chunk: the raw event including its terminating empty line
+        :type chunk: bytes
+        :returns: the event or None if the chunk holds no or only empty data
+        :rtype: Event | None
+        """
+        event_id = None
+        event_name = None
+        retry = None
+        data = []
+        # Split before decoding so splitlines() only uses \r and \n
+        for line in chunk.splitlines():
+            # Lines starting with a separator are comments and are to be
+            # ignored.
+            if not line or line[0] == _COMMENT:
+                continue
 
+            field, _, value = line.partition(_FIELD_SEPARATOR)
+
+            # From the spec:
+            # "If value starts with a single U+0020 SPACE character,
+            # remove it from value."
+            if value[:1] == b' ':
+                value = value[1:]
+
+            # The data field may come over multiple lines and their values
+            # are concatenated with each other.
+            if field == b'data':
+                data.append(value)
+            elif field == b'event':
+                event_name = value
+            elif field == b'id':
+                event_id = value
+            elif field == b'retry':
+                retry = value
+            elif line.strip():
                 # Ignore unknown fields.
-                if field not in event.__dict__:
-                    self._logger.debug('Saw invalid field %s while parsing '
-                                       'Server Side Event', field)
-                    continue
+                self._logger.debug('Saw invalid field %s while parsing '
+                                   'Server Side Event', field)
+
+        # Events with no data are not dispatched.
+        payload = b'\n'.join(data)
+        if not payload:
+            return None
+
+        # Empty event names default to 'message'
+        event_name = event_name.decode(self._char_enc) if event_name else 'message'
+        if event_id is not None:
+            event_id = event_id.decode(self._char_enc)
+        if retry is not None:
+            retry = retry.decode(self._char_enc)
+        return Event(event_id, event_name, payload, retry, self._char_enc)
+
+    async def events(self, event_types=None):
+        """Yield the events of the stream.
+
+        :param event_types: if given, only events named like one of these
+                            are yielded. Other events are dropped before
+                            their data is decoded.
+        :type event_types: [str] | None
+        """
+        if event_types is not None:
+            event_types = frozenset(event_types)
 
-                if len(data) > 1:
-                    # From the spec:
-                    # "If value starts with a single U+0020 SPACE character,
-                    # remove it from value."
-                    if data[1].startswith(' '):
-                        value = data[1][1:]
-                    else:
-                        value = data[1]
-                else:
-                    # If no value is present after the separator,
-                    # assume an empty value.
-                    value = ''
-
-                # The data field may come over multiple lines and their values
-                # are concatenated with each other.
-                if field == 'data':
-                    event.__dict__[field] += value + '\n'
-                else:
-                    event.__dict__[field] = value
-
-            # Events with no data are not dispatched.
-            if not event.data:
-                continue
+        async for chunks in self._read():
+            for chunk in chunks:
+                event = self._parse(chunk)
+                if event is None:
+                    continue
+                if event_types is not None and event.event not in event_types:
+                    continue
 
-            # If the data field ends with a newline, remove it.
-            if event.data.endswith('\n'):
-                event.data = event.data[0:-1]
+                # Dispatch the event
+                self._logger.debug('Dispatching %s...', event)
+                yield event
 
-            # Empty event names default to 'message'
-            event.event = event.event or 'message'
 
-            # Dispatch the event
-            self._logger.debug('Dispatching %s...', event)
-            yield event
+class Event(object):
+    """Representation of an event from the event stream.
 
+    The data is kept as received and only decoded when `data` or `json()`
+    is accessed.
+    """
 
-class Event(object):
-    """Representation of an event from the event stream."""
+    __slots__ = ('id', 'event', 'retry', '_raw', '_data', '_char_enc')
 
-    def __init__(self, id=None, event='message', data='', retry=None):
+    def __init__(self, id=None, event='message', data='', retry=None, char_enc='utf-8'):
         self.id = id
         self.event = event
-        self.data = data
         self.retry = retry
+        self._char_enc = char_enc
+        if isinstance(data, str):
+            self._raw = None
+            self._data = data
+        else:
+            self._raw = data
+            self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._raw.decode(self._char_enc)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._raw = None
+        self._data = value
+
+    def json(self):
+        """Decode the data of the event as JSON.
+
+        :rtype: dict
+        """
+        if self._raw is not None:
+            return json.loads(self._raw.decode(self._char_enc))
+        return json.loads(self._data)
+
+    def _size(self):
+        return len(self._raw) if self._raw is not None else len(self._data)
 
     def __str__(self):
         s = '{0} event'.format(self.event)
         if self.id:
             s += ' #{0}'.format(self.id)
-        if self.data:
-            s += ', {0} byte{1}'.format(len(self.data),
-                                        's' if len(self.data) else '')
+        size = self._size()
+        if size:
+            s += ', {0} byte{1}'.format(size, 's' if size > 1 else '')
         else:
             s += ', no data'
         if self.retry:
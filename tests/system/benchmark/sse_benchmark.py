@@ -0,0 +1,78 @@
+"""Throughput benchmark for the asyncsseclient parser.
+
+Replays a recorded Marathon event stream through `SSEClient` in chunks the
+size of those returned by `aiohttp.StreamReader.iter_any` and reports how many
+events per second are parsed, with and without filtering by event type. The
+recording must contain `status_update_event` events for the filtering scenario.
+
+A stream can be recorded from a cluster with
+
+  curl -H 'Accept: text/event-stream' $DCOS_URL/service/marathon/v2/events > events.txt
+
+Usage: python benchmark/sse_benchmark.py [events.txt]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from asyncsseclient import SSEClient # NOQA E402
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '../../../docs/docs/rest-api/public/api/v2/examples/events.txt')
+STREAM_SIZE = 32 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+ROUNDS = 3
+
+
+class ReplayedStream(object):
+    """Mimics the part of aiohttp.StreamReader used by SSEClient."""
+
+    def __init__(self, data):
+        self._data = data
+
+    async def iter_any(self):
+        for offset in range(0, len(self._data), CHUNK_SIZE):
+            yield self._data[offset:offset + CHUNK_SIZE]
+
+
+def _stream(path):
+    with open(path, 'rb') as f:
+        recording = f.read().strip(b'\r\n') + b'\n\n'
+    return recording * max(STREAM_SIZE // len(recording), 1)
+
+
+async def _consume(data, event_types, decode):
+    count = 0
+    async for event in SSEClient(ReplayedStream(data)).events(event_types):
+        if decode:
+            event.json()
+        count += 1
+    return count
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_RECORDING
+    data = _stream(path)
+    loop = asyncio.get_event_loop()
+    scenarios = [
+        ('all, raw', None, False),
+        ('all, json', None, True),
+        ('status updates, json', ['status_update_event'], True),
+    ]
+    print('{:>20} {:>10} {:>12} {:>10}'.format('scenario', 'events', 'events/s', 'MB/s'))
+    for name, event_types, decode in scenarios:
+        best = None
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            count = loop.run_until_complete(_consume(data, event_types, decode))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        assert count > 0, 'No {} events in {}'.format(name, path)
+        print('{:>20} {:>10} {:>12.0f} {:>10.1f}'.format(name, count, count / best, len(data) / best / (1 << 20)))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ import uuid
 import retrying
 import requests
 import logging
+import marathon_events
 
 from datetime import timedelta
 from json.decoder import JSONDecodeError
@@ -20,7 +21,7 @@ from shakedown.dcos.agent import get_private_agents
 from shakedown.dcos.cluster import ee_version
 from shakedown.dcos.command import (attached_cli, run_command, run_command_on_agent, run_command_on_master,
                                     run_dcos_command)
-from shakedown.dcos.file import copy_file_to_agent
+from shakedown.dcos.file import copy_files
 from shakedown.dcos.marathon import marathon_on_marathon
 from shakedown.dcos.master import get_all_master_ips
 from shakedown.dcos.package import install_package_and_wait, package_installed
@@ -407,12 +408,9 @@ def copy_docker_credentials_file(agents, file_name='docker.tar.gz'):
     # Upload docker.tar.gz to all private agents
     try:
         logger.info('Uploading tarball with docker credentials to all private agents...')
-        for agent in agents:
-            logger.info("Copying docker credentials to {}".format(agent))
-            copy_file_to_agent(agent, file_name)
-    except Exception as e:
-        logger.info('Failed to upload {} to agent: {}'.format(file_name, agent))
-        raise e
+        reports = copy_files({agent: [file_name] for agent in agents})
+        failed = [agent for agent, report in reports.items() if report['failed']]
+        assert not failed, "Failed to upload {} to agents: {}".format(file_name, ', '.join(failed))
     finally:
         os.remove(file_name)
 
@@ -699,10 +697,18 @@ def deployments_for(service_id=None, deployment_id=None):
         return deployments
 
 
+# Polling interval in milliseconds of deployment_wait while Marathon events are received.
+DEPLOYMENT_EVENT_FALLBACK_WAIT = 10000
+
+
 def deployment_wait(service_id=None, deployment_id=None, wait_fixed=2000, max_attempts=60):
     """ Wait for a specific app/pod to deploy successfully. If no app/pod Id passed, wait for all
         current deployments to succeed. This inner matcher will retry fetching deployments
         after `wait_fixed` milliseconds but give up after `max_attempts` tries.
+
+        Deployments are refetched as soon as Marathon reports a finished deployment on its
+        event stream. While that stream is connected, polling every `wait_fixed` milliseconds
+        is relaxed to DEPLOYMENT_EVENT_FALLBACK_WAIT. The overall budget stays the same.
     """
     assert not all([service_id, deployment_id]), "Use either deployment_id or service_id, but not both."
 
@@ -713,8 +719,15 @@ def deployment_wait(service_id=None, deployment_id=None, wait_fixed=2000, max_at
     else:
         logger.info('Waiting for all current deployments to finish')
 
-    assert_that(lambda: deployments_for(service_id, deployment_id),
-                eventually(has_len(0), wait_fixed=wait_fixed, max_attempts=max_attempts))
+    def is_awaited_deployment(event):
+        return deployment_id is None or event.get('id') == deployment_id
+
+    watcher = marathon_events.event_watcher()
+    with watcher.subscribe(marathon_events.DEPLOYMENT_EVENT_TYPES, is_awaited_deployment) as wake_on:
+        poll_interval = DEPLOYMENT_EVENT_FALLBACK_WAIT if wake_on.is_connected() else wait_fixed
+        assert_that(lambda: deployments_for(service_id, deployment_id),
+                    eventually(has_len(0), wait_fixed=min(poll_interval, wait_fixed * max_attempts),
+                               max_delay=wait_fixed * max_attempts, wake_on=wake_on))
 
 
 @retrying.retry(wait_fixed=1000, stop_max_attempt_number=60, retry_on_exception=ignore_exception)
@@ -1,6 +1,30 @@
 import logging
 import logging.config
+import os
+
+from deployment_latency import DeploymentLatencyRecorder
+
+# Path of the deployment latency report. Deployments are only recorded if set.
+DEPLOYMENT_LATENCY_REPORT = os.environ.get('DEPLOYMENT_LATENCY_REPORT')
+
+_latency_recorder = None
 
 
 def pytest_configure(config):
+    global _latency_recorder
     logging.config.fileConfig('logging.conf')
+    if DEPLOYMENT_LATENCY_REPORT:
+        _latency_recorder = DeploymentLatencyRecorder()
+
+
+def pytest_runtest_setup(item):
+    # Recording starts with the first test, so that pytest runs without a
+    # cluster, e.g. with --collect-only.
+    if _latency_recorder is not None:
+        _latency_recorder.start()
+
+
+def pytest_unconfigure(config):
+    if _latency_recorder is not None:
+        _latency_recorder.stop()
+        _latency_recorder.write_report(DEPLOYMENT_LATENCY_REPORT)
@@ -0,0 +1,281 @@
+"""
+Deployment latency instrumentation.
+
+Records the milestones of every Marathon deployment of a test run from the
+event stream and reports percentiles of the time from the API submission to
+each milestone:
+
+    deployment_info  Marathon computed the deployment plan
+    first_staging    the first task of the deployment is staging
+    first_running    the first task is running
+    last_running     the last task before the deployment finished is running
+    healthy          the last health check of the deployment passed
+    finished         deployment_success or deployment_failed
+
+All timestamps are the ones of the Marathon events, so the clock of the test
+runner does not matter. The submission is the `api_post_event` of an app of
+the deployment, or `deployment_info` if there is none, e.g. for restarts.
+
+Set DEPLOYMENT_LATENCY_REPORT to a file path to record a test run, see
+conftest.py. The report is JSON and can be compared between Marathon
+releases.
+"""
+import datetime
+import json
+import logging
+import threading
+import time
+
+from marathon_events import MarathonEventWatcher
+
+logger = logging.getLogger(__name__)
+
+LATENCY_EVENT_TYPES = (
+    'api_post_event', 'deployment_info', 'status_update_event', 'health_status_changed_event',
+    'instance_health_changed_event', 'deployment_success', 'deployment_failed')
+
+PHASES = ('deployment_info', 'first_staging', 'first_running', 'last_running', 'healthy', 'finished')
+
+PERCENTILES = (50, 90, 99)
+
+# An API submission only counts for a deployment which starts within this
+# many seconds. Submissions which changed nothing start no deployment.
+SUBMISSION_WINDOW = 60
+
+# Deployment kinds by the first action of their plan.
+DEPLOYMENT_KINDS = {
+    'StartApplication': 'start',
+    'StartPod': 'start',
+    'ScaleApplication': 'scale',
+    'ScalePod': 'scale',
+    'RestartApplication': 'restart',
+    'RestartPod': 'restart',
+    'StopApplication': 'stop',
+    'StopPod': 'stop',
+}
+
+
+def parse_timestamp(timestamp):
+    """Converts the timestamp of a Marathon event to seconds since the epoch.
+
+    :param timestamp: e.g. "2014-03-01T23:29:30.158Z"
+    :type timestamp: str
+    :rtype: float
+    """
+    if timestamp is None:
+        return time.time()
+    parsed = datetime.datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%fZ')
+    return parsed.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def percentile(values, p):
+    """Computes the p-th percentile by linear interpolation between the
+    closest ranks.
+
+    :param values: sorted values
+    :type values: [float]
+    :param p: percentile between 0 and 100
+    :type p: float
+    :rtype: float
+    """
+    if not values:
+        return None
+    rank = (len(values) - 1) * p / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def _plan_actions(event):
+    """:returns: the (action, run spec id) pairs of a deployment plan, in order
+       :rtype: [(str, str)]
+    """
+    actions = []
+    for step in event.get('plan', {}).get('steps', []):
+        # Steps hold either a single action or a list of them.
+        for action in step.get('actions', [step]):
+            run_spec = action.get('app') or action.get('pod')
+            if run_spec is not None:
+                actions.append((action.get('action') or action.get('type'), run_spec))
+    return actions
+
+
+class Deployment(object):
+    """Milestones of one deployment.
+
+    :param deployment_id: ID of the deployment plan
+    :type deployment_id: str
+    :param kind: start, scale, restart, stop or other
+    :type kind: str
+    :param run_specs: IDs of the apps and pods of the deployment
+    :type run_specs: [str]
+    :param submitted: time of the API submission
+    :type submitted: float
+    """
+
+    def __init__(self, deployment_id, kind, run_specs, submitted):
+        self.id = deployment_id
+        self.kind = kind
+        self.run_specs = run_specs
+        self.submitted = submitted
+        self.milestones = {}
+        self.status = None
+
+    def reach(self, milestone, timestamp, first=True):
+        """Records a milestone. The first time is kept unless `first` is False."""
+
+        if not first or milestone not in self.milestones:
+            self.milestones[milestone] = timestamp
+
+    def latencies(self):
+        """:returns: seconds from the submission to each milestone reached
+           :rtype: {str: float}
+        """
+        return {phase: self.milestones[phase] - self.submitted for phase in PHASES if phase in self.milestones}
+
+    def to_json(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'runSpecs': self.run_specs,
+            'status': self.status,
+            'latencies': self.latencies()
+        }
+
+
+class DeploymentLatencyRecorder(object):
+    """Builds the milestones of all deployments from Marathon events.
+
+    `record` can be fed events from any source. `start` subscribes it to
+    the event stream of a Marathon.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._submissions = {}
+        self._active = {}
+        self._deployments = {}
+        self._watcher = None
+
+    def start(self, marathon_name='marathon'):
+        """Starts recording the events of a Marathon on a background thread.
+        Calling it again is a no-op.
+
+        :param marathon_name: service name of the Marathon
+        :type marathon_name: str
+        """
+
+        if self._watcher is not None:
+            return
+        self._watcher = MarathonEventWatcher(marathon_name, LATENCY_EVENT_TYPES)
+        self._watcher.add_listener(self.record)
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def record(self, event):
+        """Updates the deployments with a decoded Marathon event.
+
+        :param event: the decoded Marathon event
+        :type event: dict
+        """
+
+        event_type = event.get('eventType')
+        timestamp = parse_timestamp(event.get('timestamp'))
+        with self._lock:
+            if event_type == 'api_post_event':
+                app_id = (event.get('appDefinition') or {}).get('id')
+                if app_id is not None:
+                    self._submissions[app_id] = timestamp
+            elif event_type == 'deployment_info':
+                self._deployment_info(event, timestamp)
+            elif event_type == 'status_update_event':
+                deployment = self._active.get(event.get('appId'))
+                if deployment is not None:
+                    if event.get('taskStatus') == 'TASK_STAGING':
+                        deployment.reach('first_staging', timestamp)
+                    elif event.get('taskStatus') == 'TASK_RUNNING':
+                        deployment.reach('first_running', timestamp)
+                        deployment.reach('last_running', timestamp, first=False)
+            elif event_type in ('health_status_changed_event', 'instance_health_changed_event'):
+                run_spec = event.get('appId') or event.get('runSpecId')
+                deployment = self._active.get(run_spec)
+                if deployment is not None and (event.get('alive') or event.get('healthy')):
+                    deployment.reach('healthy', timestamp, first=False)
+            elif event_type in ('deployment_success', 'deployment_failed'):
+                deployment = self._deployments.get(event.get('id'))
+                if deployment is not None:
+                    deployment.reach('finished', timestamp)
+                    deployment.status = 'success' if event_type == 'deployment_success' else 'failed'
+                    for run_spec in deployment.run_specs:
+                        if self._active.get(run_spec) is deployment:
+                            del self._active[run_spec]
+
+    def _deployment_info(self, event, timestamp):
+        plan = event.get('plan') or {}
+        deployment_id = plan.get('id')
+        if deployment_id is None:
+            return
+
+        deployment = self._deployments.get(deployment_id)
+        if deployment is None:
+            actions = _plan_actions(event) or _plan_actions({'plan': {'steps': [event.get('currentStep') or {}]}})
+            run_specs = sorted({run_spec for _, run_spec in actions})
+            kind = DEPLOYMENT_KINDS.get(actions[0][0], 'other') if actions else 'other'
+            submissions = [self._submissions.pop(run_spec) for run_spec in run_specs if run_spec in self._submissions]
+            submitted = min([submission for submission in submissions
+                             if 0 <= timestamp - submission <= SUBMISSION_WINDOW] or [timestamp])
+            deployment = Deployment(deployment_id, kind, run_specs, submitted)
+            self._deployments[deployment_id] = deployment
+            for run_spec in run_specs:
+                self._active[run_spec] = deployment
+        deployment.reach('deployment_info', timestamp)
+
+    def report(self):
+        """Computes the latency percentiles per deployment kind and phase.
+
+        :returns: the JSON report
+        :rtype: dict
+        """
+
+        with self._lock:
+            deployments = [deployment.to_json() for deployment in self._deployments.values()]
+
+        phases = {}
+        for deployment in deployments:
+            for phase, latency in deployment['latencies'].items():
+                phases.setdefault(deployment['kind'], {}).setdefault(phase, []).append(latency)
+
+        summary = {}
+        for kind, latencies in phases.items():
+            summary[kind] = {}
+            for phase in PHASES:
+                values = sorted(latencies.get(phase, []))
+                if not values:
+                    continue
+                stats = {'count': len(values), 'max': values[-1]}
+                for p in PERCENTILES:
+                    stats['p{}'.format(p)] = percentile(values, p)
+                summary[kind][phase] = stats
+
+        return {
+            'deployments': len(deployments),
+            'failed': sum(1 for deployment in deployments if deployment['status'] == 'failed'),
+            'unfinished': sum(1 for deployment in deployments if deployment['status'] is None),
+            'phases': summary,
+            'details': deployments
+        }
+
+    def write_report(self, path):
+        """Writes the JSON report to a file.
+
+        :param path: the file path
+        :type path: str
+        """
+
+        report = self.report()
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True)
+        logger.info('Wrote latencies of %d deployments to %s', report['deployments'], path)
@@ -1,6 +1,5 @@
 import aiohttp
 import common
-import json
 import os.path
 import pytest
 import ssl
@@ -12,8 +11,8 @@ from shakedown.dcos import cluster
 from shakedown.clients import dcos_url_path
 from shakedown.clients.authentication import dcos_acs_token
 from shakedown.dcos.agent import get_agents, get_private_agents
-from shakedown.dcos.command import run_command_on_agent
-from shakedown.dcos.file import copy_file_from_agent
+from shakedown.dcos.command import run_command_on_hosts
+from shakedown.dcos.file import copy_files
 from shakedown.dcos.marathon import marathon_on_marathon
 from shakedown.dcos.security import add_user, set_user_permission, remove_user, remove_user_permission
 from asyncsseclient import SSEClient
@@ -87,7 +86,7 @@ async def sse_events():
             async def internal_generator():
                 client = SSEClient(response.content)
                 async for event in client.events():
-                    yield json.loads(event.data)
+                    yield event.json()
 
             yield internal_generator()
 
@@ -109,11 +108,11 @@ def user_billy():
 def docker_ipv6_network_fixture():
     agents = get_agents()
     network_cmd = f"sudo docker network create --driver=bridge --ipv6 --subnet=fd01::/64 mesos-docker-ipv6-test"
-    for agent in agents:
-        run_command_on_agent(agent, network_cmd)
+    for _ in run_command_on_hosts(agents, network_cmd):
+        pass
     yield
-    for agent in agents:
-        run_command_on_agent(agent, f"sudo docker network rm mesos-docker-ipv6-test")
+    for _ in run_command_on_hosts(agents, f"sudo docker network rm mesos-docker-ipv6-test"):
+        pass
 
 
 @pytest.fixture(autouse=True, scope='session')
@@ -129,13 +128,18 @@ def archive_sandboxes():
     # Nothing to setup
     yield
     logger.info('>>> Archiving Mesos sandboxes')
-    # We tarball the sandboxes from all the agents first and download them afterwards
-    for agent in get_private_agents():
-        file_name = 'sandbox_{}.tar.gz'.format(agent.replace(".", "_"))
-        cmd = 'sudo tar --exclude=provisioner -zcf {} /var/lib/mesos/slave'.format(file_name)
-        status, output = run_command_on_agent(agent, cmd)  # NOQA
+    # We tarball the sandboxes on all the agents concurrently and download them afterwards.
+    def sandbox_file_name(agent):
+        return 'sandbox_{}.tar.gz'.format(agent.replace(".", "_"))
 
+    def tar_cmd(agent):
+        return 'sudo tar --exclude=provisioner -zcf {} /var/lib/mesos/slave'.format(sandbox_file_name(agent))
+
+    archived = dict()
+    for agent, status, output in run_command_on_hosts(get_private_agents(), tar_cmd, noisy=False):
         if status:
-            copy_file_from_agent(agent, file_name)
+            archived[agent] = [sandbox_file_name(agent)]
         else:
             logger.warning('Failed to tarball the sandbox from the agent={}, output={}'.format(agent, output))
+
+    copy_files(archived, action='get')
@@ -0,0 +1,275 @@
+"""
+Background subscription to the Marathon event stream.
+
+Waits can use an `EventSubscription` as the `wake_on` argument of
+`shakedown.dcos.spinner.wait_for` or the `eventually` matcher. The waiting
+predicate is then re-evaluated as soon as a matching event arrives instead of
+after a fixed sleep. Polling remains as a fallback, e.g. while the event
+stream is not connected.
+"""
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+
+import aiohttp
+# Importing shakedown.http first resolves the import cycle between
+# shakedown.dcos and shakedown.clients, conftest imports this module first.
+from shakedown import http  # NOQA F401
+from shakedown.clients import dcos_url_path
+from shakedown.clients.authentication import dcos_acs_token
+
+from asyncsseclient import SSEClient
+
+logger = logging.getLogger(__name__)
+
+DEPLOYMENT_EVENT_TYPES = ('deployment_success', 'deployment_failed')
+TASK_EVENT_TYPES = ('status_update_event', 'instance_changed_event')
+WAKE_EVENT_TYPES = DEPLOYMENT_EVENT_TYPES + TASK_EVENT_TYPES
+
+# Bounds of the delay between two reconnection attempts, in seconds.
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 30
+
+# Seconds stop() waits for the background thread to end.
+STOP_TIMEOUT = 10
+
+
+class EventSubscription(object):
+    """Wakes a waiter when an event of one of `event_types` arrives.
+
+    An event that arrives while nobody waits is remembered, so a wake-up
+    between two checks of a predicate is never lost.
+
+    :param watcher: the watcher this subscription belongs to
+    :type watcher: MarathonEventWatcher
+    :param event_types: Marathon event types to wake on
+    :type event_types: [str]
+    :param predicate: optional filter on the decoded event
+    :type predicate: function | None
+    """
+
+    def __init__(self, watcher, event_types, predicate=None):
+        self._watcher = watcher
+        self._event_types = frozenset(event_types)
+        self._predicate = predicate
+        self._woken = threading.Event()
+
+    def offer(self, event):
+        """Signals waiters if `event` matches this subscription.
+
+        :param event: the decoded Marathon event
+        :type event: dict
+        """
+
+        if event.get('eventType') not in self._event_types:
+            return
+        if self._predicate is None or self._predicate(event):
+            self._woken.set()
+
+    def wait(self, timeout):
+        """Blocks until a matching event arrived or `timeout` seconds passed.
+
+        :param timeout: maximum time to wait in seconds
+        :type timeout: float
+        :returns: True if woken by an event, False on timeout
+        :rtype: bool
+        """
+
+        woken = self._woken.wait(timeout)
+        self._woken.clear()
+        return woken
+
+    def is_connected(self):
+        """:returns: whether events are currently being received
+           :rtype: bool
+        """
+
+        return self._watcher.is_connected()
+
+    def close(self):
+        self._watcher.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+
+class MarathonEventWatcher(object):
+    """Consumes `/v2/events` of a Marathon on a background thread and
+    dispatches the events to subscriptions.
+
+    The stream is opened once and shared by all subscriptions. It is
+    reopened with an exponential backoff if it fails.
+
+    :param marathon_name: service name of the Marathon to watch
+    :type marathon_name: str
+    :param event_types: event types requested from Marathon
+    :type event_types: [str]
+    """
+
+    def __init__(self, marathon_name='marathon', event_types=WAKE_EVENT_TYPES):
+        self._marathon_name = marathon_name
+        self._event_types = event_types
+        self._subscriptions = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._loop = None
+        self._task = None
+        self._thread = None
+
+    def start(self):
+        """Starts the background thread. Calling it again is a no-op."""
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            # The loop and task exist before the thread runs, so that stop()
+            # can always cancel the task.
+            self._loop = asyncio.new_event_loop()
+            self._task = self._loop.create_task(self._consume_forever())
+            self._thread = threading.Thread(target=self._run, args=(self._loop, self._task), name='marathon-events')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Closes the event stream and stops the background thread.
+
+        :param timeout: seconds to wait for the thread to stop
+        :type timeout: float
+        """
+
+        with self._lock:
+            thread, self._thread = self._thread, None
+            loop, task = self._loop, self._task
+        if thread is None:
+            return
+        try:
+            loop.call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            # The loop is closed already.
+            pass
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning('Marathon event watcher did not stop within %s seconds', timeout)
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def subscribe(self, event_types, predicate=None):
+        """Registers a new subscription and starts the watcher if needed.
+
+        :param event_types: Marathon event types to wake on
+        :type event_types: [str]
+        :param predicate: optional filter on the decoded event
+        :type predicate: function | None
+        :rtype: EventSubscription
+        """
+
+        subscription = EventSubscription(self, event_types, predicate)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def add_listener(self, listener):
+        """Registers a function which is called with every decoded event on
+        the watcher thread, and starts the watcher if needed.
+
+        :param listener: function taking the decoded event
+        :type listener: function
+        """
+
+        with self._lock:
+            self._listeners.append(listener)
+        self.start()
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def dispatch(self, event):
+        """Offers a decoded event to all current subscriptions and listeners.
+
+        :param event: the decoded Marathon event
+        :type event: dict
+        """
+
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            listeners = list(self._listeners)
+        for subscription in subscriptions:
+            subscription.offer(event)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception('Listener failed on Marathon event %s', event.get('eventType'))
+
+    def _run(self, loop, task):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connected.clear()
+            loop.close()
+
+    async def _consume_forever(self):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                await self._consume()
+                delay = RECONNECT_MIN_DELAY
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Event stream of %s failed', self._marathon_name)
+            self._connected.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _consume(self):
+        # fixtures imports common which depends on this module.
+        from fixtures import get_ssl_context
+
+        # The URL is only resolved here, so that a watcher can be created
+        # without a cluster configuration.
+        url = dcos_url_path('service/{}/v2/events'.format(self._marathon_name))
+        headers = {'Authorization': 'token={}'.format(dcos_acs_token()),
+                   'Accept': 'text/event-stream'}
+        params = [('event_type', event_type) for event_type in self._event_types]
+
+        ssl_context = get_ssl_context()
+        verify_ssl = ssl_context is not None
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+        async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+            async with session.get(url, params=params, verify_ssl=verify_ssl,
+                                   ssl_context=ssl_context) as response:
+                response.raise_for_status()
+                logger.info('Subscribed to Marathon events at %s', url)
+                self._connected.set()
+                async for event in SSEClient(response.content).events(self._event_types):
+                    self.dispatch(event.json())
+
+
+@lru_cache()
+def event_watcher(marathon_name='marathon'):
+    """Returns the process wide event watcher of a Marathon.
+
+    :param marathon_name: service name of the Marathon to watch
+    :type marathon_name: str
+    :rtype: MarathonEventWatcher
+    """
+
+    return MarathonEventWatcher(marathon_name)
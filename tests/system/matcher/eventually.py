@@ -6,19 +6,35 @@ from precisely.results import unmatched
 
 class Eventually(Matcher):
 
-    def __init__(self, matcher, wait_fixed, max_attempts):
+    def __init__(self, matcher, wait_fixed, max_attempts, wake_on=None, max_delay=None):
         self._matcher = matcher
         self._wait_fixed = wait_fixed
         self._max_attempts = max_attempts
+        self._wake_on = wake_on
+        self._max_delay = max_delay
+
+    def _retry_options(self):
+        if self._wake_on is None and self._max_delay is None:
+            return {'wait_fixed': self._wait_fixed, 'stop_max_attempt_number': self._max_attempts}
+
+        # Wake-ups do not count against the budget, so stop on elapsed time.
+        max_delay = self._max_delay or self._wait_fixed * self._max_attempts
+        if self._wake_on is None:
+            return {'wait_fixed': self._wait_fixed, 'stop_max_delay': max_delay}
+
+        def wait_or_wake(attempt_number, delay_since_first_attempt):
+            self._wake_on.wait(self._wait_fixed / 1000)
+            return 0
+
+        return {'wait_func': wait_or_wake, 'stop_max_delay': max_delay}
 
     def match(self, item):
         assert callable(item), "The actual value is not callable."
 
         @retrying.retry(
-                wait_fixed=self._wait_fixed,
-                stop_max_attempt_number=self._max_attempts,
                 retry_on_exception=common.ignore_exception,
-                retry_on_result=lambda r: r.is_match is not True)
+                retry_on_result=lambda r: r.is_match is not True,
+                **self._retry_options())
         def try_match():
             actual = item()
             return self._matcher.match(actual)
@@ -33,12 +49,17 @@ class Eventually(Matcher):
         return "eventually {}".format(self._matcher.describe())
 
 
-def eventually(matcher, wait_fixed=1000, max_attempts=3):
+def eventually(matcher, wait_fixed=1000, max_attempts=3, wake_on=None, max_delay=None):
     """Retry match if it failed.
 
     This matcher will retry the inner match after `wait_fixed` milliseconds but
     give up after `max_attempts` tries.
 
+    If `wake_on` is given, e.g. a `marathon_events.EventSubscription`, the match
+    is retried as soon as `wake_on.wait()` returns and `wait_fixed` is only the
+    fallback polling interval. The matcher then gives up after `max_delay`
+    milliseconds, which defaults to `wait_fixed * max_attempts`.
+
     The provided value has to be a callable:
 
     start = time.time()
@@ -47,4 +68,4 @@ def eventually(matcher, wait_fixed=1000, max_attempts=3):
     This will assert that the delta between the start and now are eventuallyer greater
     than two.
     """
-    return Eventually(matcher, wait_fixed, max_attempts)
+    return Eventually(matcher, wait_fixed, max_attempts, wake_on, max_delay)
@@ -0,0 +1,75 @@
+"""Unit tests of the SSE parser. They need no cluster."""
+import asyncio
+
+import pytest
+
+from asyncsseclient import SSEClient
+
+STREAM = (b': connected\n'
+          b'event: event_stream_attached\n'
+          b'data: {"remoteAddress": "10.0.0.1"}\n'
+          b'\n'
+          b'id: 7\n'
+          b'retry: 1000\n'
+          b'event: status_update_event\n'
+          b'data: {"taskStatus":\n'
+          b'data:  "TASK_RUNNING"}\n'
+          b'\n'
+          b': keep-alive\n'
+          b'\n'
+          b'data: plain\n'
+          b'\n')
+
+
+class ChunkedStream(object):
+    """Mimics the part of aiohttp.StreamReader used by SSEClient."""
+
+    def __init__(self, data, chunk_size=None):
+        self._data = data
+        self._chunk_size = chunk_size or max(len(data), 1)
+
+    async def iter_any(self):
+        for offset in range(0, len(self._data), self._chunk_size):
+            yield self._data[offset:offset + self._chunk_size]
+
+
+def _events(data, chunk_size=None, event_types=None):
+    async def collect():
+        client = SSEClient(ChunkedStream(data, chunk_size))
+        return [(event.id, event.event, event.data, event.retry) async for event in client.events(event_types)]
+    return asyncio.get_event_loop().run_until_complete(collect())
+
+
+EXPECTED = [
+    (None, 'event_stream_attached', '{"remoteAddress": "10.0.0.1"}', None),
+    ('7', 'status_update_event', '{"taskStatus":\n "TASK_RUNNING"}', '1000'),
+    (None, 'message', 'plain', None),
+]
+
+
+@pytest.mark.parametrize('line_end', [b'\n', b'\r\n', b'\r'])
+@pytest.mark.parametrize('chunk_size', [None, 1, 2, 3, 5, 64])
+def test_line_endings_and_chunks(line_end, chunk_size):
+    # Small chunks split lines as well as the delimiters between events.
+    assert _events(STREAM.replace(b'\n', line_end), chunk_size) == EXPECTED
+
+
+def test_multi_line_data_is_decoded_as_json():
+    async def first():
+        async for event in SSEClient(ChunkedStream(STREAM, 7)).events(['status_update_event']):
+            return event.json()
+    assert asyncio.get_event_loop().run_until_complete(first()) == {'taskStatus': 'TASK_RUNNING'}
+
+
+def test_events_are_filtered_by_type():
+    assert _events(STREAM, 4, ['status_update_event']) == [EXPECTED[1]]
+    assert _events(STREAM, event_types=['deployment_success']) == []
+
+
+def test_events_without_data_are_not_dispatched():
+    stream = b'event: a\n\ndata\n\ndata:\n\n: comment\ndata: x\n\n'
+    assert _events(stream, 3) == [(None, 'message', 'x', None)]
+
+
+def test_event_at_end_of_stream():
+    assert _events(b'data: last\n', 2) == [(None, 'message', 'last', None)]
@@ -0,0 +1,108 @@
+"""Unit tests of the deployment latency recorder. They need no cluster."""
+import datetime
+import json
+
+import pytest
+
+from deployment_latency import DeploymentLatencyRecorder, parse_timestamp, percentile
+
+START = 1500000000
+
+
+def _timestamp(seconds):
+    moment = datetime.datetime.fromtimestamp(START + seconds, datetime.timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _event(event_type, seconds, **fields):
+    return dict(fields, eventType=event_type, timestamp=_timestamp(seconds))
+
+
+def _deployment_info(deployment_id, action, run_spec, seconds):
+    plan = {'id': deployment_id, 'steps': [{'actions': [{'action': action, 'app': run_spec}]}]}
+    return _event('deployment_info', seconds, plan=plan)
+
+
+def _start_app(recorder, deployment_id, app_id, offset, latencies):
+    """Feeds the events of a deployment starting an app, `latencies` are the
+    offsets of deployment_info, staging, two running tasks, healthy and
+    finished from the submission.
+    """
+    info, staging, first_running, last_running, healthy, finished = [offset + latency for latency in latencies]
+    events = [
+        _event('api_post_event', offset, appDefinition={'id': app_id}),
+        _deployment_info(deployment_id, 'StartApplication', app_id, info),
+        _event('status_update_event', staging, appId=app_id, taskStatus='TASK_STAGING'),
+        _event('status_update_event', first_running, appId=app_id, taskStatus='TASK_RUNNING'),
+        _event('status_update_event', last_running, appId=app_id, taskStatus='TASK_RUNNING'),
+        _event('health_status_changed_event', healthy, appId=app_id, alive=True),
+        _event('deployment_success', finished, id=deployment_id),
+    ]
+    for event in events:
+        recorder.record(event)
+
+
+def test_parse_timestamp():
+    assert parse_timestamp('2017-07-14T02:40:00.000Z') == START
+    assert parse_timestamp(_timestamp(1.5)) == pytest.approx(START + 1.5)
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3], 99) == 3
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile(list(range(11)), 90) == pytest.approx(9)
+    assert percentile(list(range(11)), 100) == 10
+
+
+def test_milestones_of_a_deployment():
+    recorder = DeploymentLatencyRecorder()
+    _start_app(recorder, 'deployment-1', '/app', 0, [1, 2, 3, 4, 5, 6])
+    # Events after the deployment finished are not attributed to it.
+    recorder.record(_event('status_update_event', 20, appId='/app', taskStatus='TASK_RUNNING'))
+
+    report = recorder.report()
+    assert report['details'] == [{
+        'id': 'deployment-1',
+        'kind': 'start',
+        'runSpecs': ['/app'],
+        'status': 'success',
+        'latencies': {'deployment_info': 1, 'first_staging': 2, 'first_running': 3, 'last_running': 4,
+                      'healthy': 5, 'finished': 6}
+    }]
+
+
+def test_deployment_without_submission():
+    recorder = DeploymentLatencyRecorder()
+    # A submission outside the window did not start this deployment.
+    recorder.record(_event('api_post_event', 0, appDefinition={'id': '/app'}))
+    recorder.record(_deployment_info('restart-1', 'RestartApplication', '/app', 100))
+    recorder.record(_event('deployment_failed', 110, id='restart-1'))
+    recorder.record(_deployment_info('scale-1', 'ScaleApplication', '/other', 120))
+
+    report = recorder.report()
+    assert (report['deployments'], report['failed'], report['unfinished']) == (2, 1, 1)
+    assert report['phases']['restart']['finished']['max'] == 10
+    assert report['phases']['restart']['deployment_info']['p50'] == 0
+    assert 'finished' not in report['phases']['scale']
+
+
+def test_report_percentiles(tmpdir):
+    recorder = DeploymentLatencyRecorder()
+    for i in range(1, 11):
+        _start_app(recorder, 'deployment-{}'.format(i), '/app-{}'.format(i), i * 100,
+                   [0.5, 1, 1, 2, 3, i])
+
+    report = recorder.report()
+    finished = report['phases']['start']['finished']
+    assert finished['count'] == 10
+    assert finished['max'] == 10
+    assert finished['p50'] == pytest.approx(5.5)
+    assert finished['p90'] == pytest.approx(9.1)
+    assert finished['p99'] == pytest.approx(9.91)
+    assert report['phases']['start']['healthy']['p99'] == 3
+
+    path = str(tmpdir.join('latency.json'))
+    recorder.write_report(path)
+    with open(path) as report_file:
+        assert json.load(report_file) == report